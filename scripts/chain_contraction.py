@@ -0,0 +1,195 @@
+"""
+chain_contraction.py
+
+Degree-2 chain contraction of the routing graph.
+
+swissTNE splits track into many short segments joined by nodes that only
+connect two neighbours. Such a node never offers a routing choice, so every
+maximal chain of them is replaced by one super-edge between the junctions at
+its ends. The super-edge weighs the sum of its segments and remembers the
+SUMO edge IDs it stands for; paths found on the contracted graph are expanded
+back to the original edge sequence, so results are identical to routing on
+the full graph.
+
+A node is contracted only if it has exactly two distinct neighbours, traffic
+can pass through it in every direction it can be entered from, and it is not
+in `keep` (the stop nodes used as route endpoints must stay addressable).
+
+Used by:
+    - parse_gtfs_to_route_edge_map.py (--contract-chains)
+    - diagnostics/benchmark_chain_contraction.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import time
+import logging
+import numpy as np
+
+from routing_graph import RoutingGraph
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Contracted graph
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ContractedGraph:
+    """
+    RoutingGraph over super-edges plus their expansion to SUMO edge IDs.
+    Offers the same queries as RoutingGraph, so it can be handed to PathCache.
+    """
+
+    def __init__(self, graph, expansion, base_nodes, base_edges):
+        self.graph = graph
+        self.expansion = expansion
+        self.base_nodes = base_nodes
+        self.base_edges = base_edges
+
+    def __contains__(self, node_id):
+        return node_id in self.graph
+
+    def node_index(self, node_id):
+        return self.graph.node_index(node_id)
+
+    def number_of_nodes(self):
+        return self.graph.number_of_nodes()
+
+    def number_of_edges(self):
+        return self.graph.number_of_edges()
+
+    def _expand(self, super_edges):
+        edges = []
+        for super_edge in super_edges:
+            edges.extend(self.expansion[int(super_edge)])
+        return edges
+
+    def shortest_path_edges(self, source, target):
+        """Same contract as RoutingGraph.shortest_path_edges, in original SUMO edge IDs."""
+        return self._expand(self.graph.shortest_path_edges(source, target))
+
+    def shortest_paths_from(self, source, targets):
+        """Same contract as RoutingGraph.shortest_paths_from, in original SUMO edge IDs."""
+        return {
+            target: self._expand(path) if path is not None else None
+            for target, path in self.graph.shortest_paths_from(source, targets).items()
+        }
+
+    def reduction_summary(self):
+        node_share = 100 * (1 - self.number_of_nodes() / self.base_nodes) if self.base_nodes else 0.0
+        edge_share = 100 * (1 - self.number_of_edges() / self.base_edges) if self.base_edges else 0.0
+        return (
+            f"{self.base_nodes:,} → {self.number_of_nodes():,} nodes (-{node_share:.1f}%), "
+            f"{self.base_edges:,} → {self.number_of_edges():,} edges (-{edge_share:.1f}%)"
+        )
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Contraction
+# ─────────────────────────────────────────────────────────────────────────────
+
+def contractible_nodes(graph, keep=()):
+    """
+    Boolean mask over node indices: exactly two distinct neighbours a and b,
+    and an arc a → v exists iff v → b does (likewise b → v iff v → a).
+    """
+    n = graph.number_of_nodes()
+    sources = np.repeat(np.arange(n), np.diff(graph.offsets))
+    targets = np.asarray(graph.targets, dtype=np.int64)
+    no_loop = sources != targets
+
+    neighbours = [set() for _ in range(n)]
+    outgoing = [set() for _ in range(n)]
+    incoming = [set() for _ in range(n)]
+    for u, v in zip(sources[no_loop].tolist(), targets[no_loop].tolist()):
+        neighbours[u].add(v)
+        neighbours[v].add(u)
+        outgoing[u].add(v)
+        incoming[v].add(u)
+
+    mask = np.zeros(n, dtype=bool)
+    for v in range(n):
+        if len(neighbours[v]) != 2 or v in keep:
+            continue
+        a, b = neighbours[v]
+        mask[v] = (a in incoming[v]) == (b in outgoing[v]) and (b in incoming[v]) == (a in outgoing[v])
+    # Self-loops would be swallowed by a chain, so their nodes stay
+    mask[sources[~no_loop]] = False
+    return mask
+
+def contract_degree2_chains(graph, keep=()):
+    """
+    Contracts every maximal degree-2 chain of a RoutingGraph.
+
+    Args:
+        graph (RoutingGraph): the full graph; its weight setting is preserved
+            (super-edges weigh the sum of their segments' weights).
+        keep (iterable): node IDs that must not be contracted (route endpoints).
+
+    Returns:
+        ContractedGraph
+    """
+    start = time.time()
+    keep_index = {graph.node_index(node_id) for node_id in keep if node_id in graph}
+    mask = contractible_nodes(graph, keep_index)
+
+    offsets = graph.offsets.tolist()
+    targets = graph.targets.tolist()
+    weights = graph.edge_weights().tolist()
+    edge_index = graph.edge_index.tolist()
+
+    def next_arc(prev, v):
+        """The arc leaving chain node v away from prev (its only other neighbour)."""
+        for pos in range(offsets[v], offsets[v + 1]):
+            if targets[pos] != prev:
+                return pos
+        return None
+
+    super_from, super_to, super_weight, expansion = [], [], [], []
+
+    def walk(first_pos, u):
+        """Follows one arc from u through contractible nodes to the next kept node."""
+        pos, prev = first_pos, u
+        positions = [pos]
+        weight = weights[pos]
+        v = targets[pos]
+        while mask[v] and v != u:
+            visited[v] = True
+            pos = next_arc(prev, v)
+            prev, v = v, targets[pos]
+            positions.append(pos)
+            weight += weights[pos]
+        super_from.append(u)
+        super_to.append(v)
+        super_weight.append(weight)
+        expansion.append(tuple(graph.edge_ids[edge_index[p]] for p in positions))
+
+    visited = np.zeros(len(mask), dtype=bool)
+    anchors = np.flatnonzero(~mask).tolist()
+    for u in anchors:
+        for pos in range(offsets[u], offsets[u + 1]):
+            walk(pos, u)
+
+    # Chain nodes never reached from a kept node form isolated rings: keep one node per ring
+    for v in np.flatnonzero(mask & ~visited).tolist():
+        if visited[v]:
+            continue
+        mask[v] = False
+        visited[v] = True
+        for pos in range(offsets[v], offsets[v + 1]):
+            walk(pos, v)
+
+    # Parallel super-edges: "length" weighting keeps the lightest one per node pair
+    node_ids = np.asarray(graph.node_ids, dtype=str)
+    contracted = RoutingGraph.from_arrays(
+        np.arange(len(super_weight)).astype(str),
+        node_ids[np.asarray(super_from, dtype=np.int64)],
+        node_ids[np.asarray(super_to, dtype=np.int64)],
+        np.asarray(super_weight, dtype=np.float64),
+        weight="length",
+    )
+    if graph.uses_astar():
+        kept = np.flatnonzero(~mask)
+        contracted.set_node_coordinates(node_ids[kept], graph.node_x[kept], graph.node_y[kept])
+
+    result = ContractedGraph(contracted, expansion, graph.number_of_nodes(), graph.number_of_edges())
+    logging.info(f"🪢 Contracted degree-2 chains in {time.time() - start:.1f} seconds: {result.reduction_summary()}")
+    return result
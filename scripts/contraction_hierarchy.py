@@ -0,0 +1,444 @@
+"""
+contraction_hierarchy.py
+
+Contraction hierarchy (CH) over the routing graph for repeated
+station-to-station queries on the same network.
+
+Preprocessing contracts the nodes one by one in order of importance (edge
+difference with lazy updates). Whenever removing a node would destroy a
+shortest path between two of its neighbours, a shortcut arc remembering the
+contracted "middle" node is inserted; bounded local witness searches decide
+whether a shortcut is needed. A query is then a bidirectional Dijkstra that
+only walks upward in the hierarchy, touching a few hundred nodes instead of
+the whole network, and shortcuts are unpacked recursively back into SUMO
+edge IDs.
+
+The hierarchy is stored as plain .npy arrays in `<net_file>.ch/` and reused
+while the net file (size, mtime, SHA-1) and the weighting are unchanged.
+ContractionHierarchy answers the same queries as RoutingGraph
+(shortest_path_edges, shortest_paths_from, `in`), so it can be handed to
+PathCache unchanged.
+
+Run directly to (re)build the hierarchy for the default network:
+    python scripts/contraction_hierarchy.py
+
+Used by:
+    - parse_gtfs_to_route_edge_map.py (--ch)
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import json
+import time
+import heapq
+import math
+import shutil
+import logging
+import numpy as np
+
+from routing_graph import RoutingGraph, NoPathError
+from file_hash import file_sha1
+from net_snapshot import load_net_snapshot
+
+CH_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+SUMO_NET_FILE = "SUMO/input/april_2025_swiss.net.xml"
+
+WITNESS_MAX_SETTLED = 64   # witness searches give up (and keep the shortcut) after this many nodes
+
+ARRAY_NAMES = [
+    "node_id", "edge_id", "rank",
+    "up_offsets", "up_targets", "up_weight", "up_middle", "up_edge",
+    "down_offsets", "down_sources", "down_weight", "down_middle", "down_edge",
+]
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Preprocessing
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _witness_search(out_adj, source, excluded, targets, limit):
+    """Bounded Dijkstra from source that ignores `excluded`; returns the tentative distances."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    remaining = set(targets)
+    settled = 0
+    while heap and remaining and settled < WITNESS_MAX_SETTLED:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > limit:
+            break
+        remaining.discard(u)
+        settled += 1
+        for w, (weight, _) in out_adj[u].items():
+            if w == excluded:
+                continue
+            nd = d + weight
+            if nd < dist.get(w, math.inf):
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+def _shortcuts_for(v, out_adj, in_adj):
+    """Shortcuts (u, w, weight) needed to preserve shortest paths through v when it is contracted."""
+    outgoing = out_adj[v]
+    if not outgoing:
+        return []
+    max_out = max(weight for weight, _ in outgoing.values())
+
+    shortcuts = []
+    for u, (w_uv, _) in in_adj[v].items():
+        targets = [w for w in outgoing if w != u]
+        if not targets:
+            continue
+        dist = _witness_search(out_adj, u, v, targets, w_uv + max_out)
+        for w in targets:
+            via = w_uv + outgoing[w][0]
+            if via < dist.get(w, math.inf):
+                shortcuts.append((u, w, via))
+    return shortcuts
+
+def _csr(n, rows, columns):
+    """Groups arc tuples by row into CSR arrays (offsets + one array per column)."""
+    rows = np.asarray(rows, dtype=np.int64)
+    order = np.argsort(rows, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+    return offsets, [np.asarray(column)[order] for column in columns]
+
+def build_contraction_hierarchy(graph):
+    """
+    Contracts every node of a RoutingGraph and returns the ContractionHierarchy.
+    Arc weights are the graph's own weights (graph.edge_weights()).
+    """
+    n = graph.number_of_nodes()
+    logging.info(f"🏗️ Contracting {n:,} nodes / {graph.number_of_edges():,} edges...")
+    start = time.time()
+
+    # Live (uncontracted) adjacency: out_adj[u][w] = (weight, middle); middle -1 = original edge
+    weights = graph.edge_weights()
+    out_adj = [dict() for _ in range(n)]
+    in_adj = [dict() for _ in range(n)]
+    original_edge = {}
+    sources = np.repeat(np.arange(n), np.diff(graph.offsets))
+    for u, w, weight, edge in zip(sources.tolist(), graph.targets.tolist(), weights.tolist(), graph.edge_index.tolist()):
+        if u == w:
+            continue
+        out_adj[u][w] = (weight, -1)
+        in_adj[w][u] = (weight, -1)
+        original_edge[(u, w)] = edge
+
+    contracted_neighbours = [0] * n
+
+    def priority(v):
+        shortcuts = _shortcuts_for(v, out_adj, in_adj)
+        return len(shortcuts) - len(out_adj[v]) - len(in_adj[v]) + contracted_neighbours[v], shortcuts
+
+    heap = [(priority(v)[0], v) for v in range(n)]
+    heapq.heapify(heap)
+
+    rank = np.zeros(n, dtype=np.int64)
+    up_rows, up_cols = [], []      # arcs v → w with rank[w] > rank[v]
+    down_rows, down_cols = [], []  # arcs u → v with rank[u] > rank[v], grouped by v
+    n_shortcuts = 0
+    next_rank = 0
+
+    while heap:
+        _, v = heapq.heappop(heap)
+        # Lazy update: re-evaluate and postpone v if it is no longer the cheapest
+        current, shortcuts = priority(v)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        rank[v] = next_rank
+        next_rank += 1
+
+        for w, (weight, middle) in out_adj[v].items():
+            up_rows.append(v)
+            up_cols.append((w, weight, middle, original_edge.get((v, w), -1) if middle < 0 else -1))
+            del in_adj[w][v]
+            contracted_neighbours[w] += 1
+        for u, (weight, middle) in in_adj[v].items():
+            down_rows.append(v)
+            down_cols.append((u, weight, middle, original_edge.get((u, v), -1) if middle < 0 else -1))
+            del out_adj[u][v]
+            contracted_neighbours[u] += 1
+
+        for u, w, weight in shortcuts:
+            existing = out_adj[u].get(w)
+            if existing is None or weight < existing[0]:
+                out_adj[u][w] = (weight, v)
+                in_adj[w][u] = (weight, v)
+                n_shortcuts += 1
+
+        out_adj[v] = {}
+        in_adj[v] = {}
+
+    up_offsets, (up_targets, up_weight, up_middle, up_edge) = _csr(
+        n, up_rows, zip(*up_cols) if up_cols else [[], [], [], []]
+    )
+    down_offsets, (down_sources, down_weight, down_middle, down_edge) = _csr(
+        n, down_rows, zip(*down_cols) if down_cols else [[], [], [], []]
+    )
+
+    logging.info(
+        f"✅ Contraction hierarchy built in {time.time() - start:.1f} seconds "
+        f"({n_shortcuts:,} shortcuts, {len(up_rows) + len(down_rows):,} arcs)."
+    )
+    return ContractionHierarchy({
+        "node_id": np.asarray(graph.node_ids, dtype=str),
+        "edge_id": np.asarray(graph.edge_ids, dtype=str),
+        "rank": rank,
+        "up_offsets": up_offsets,
+        "up_targets": up_targets.astype(np.int64),
+        "up_weight": up_weight.astype(np.float64),
+        "up_middle": up_middle.astype(np.int64),
+        "up_edge": up_edge.astype(np.int64),
+        "down_offsets": down_offsets,
+        "down_sources": down_sources.astype(np.int64),
+        "down_weight": down_weight.astype(np.float64),
+        "down_middle": down_middle.astype(np.int64),
+        "down_edge": down_edge.astype(np.int64),
+    })
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Queries
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ContractionHierarchy:
+    """
+    Query side of a contraction hierarchy.
+
+    Upward arcs of node `v` span `up_offsets[v]:up_offsets[v + 1]` (v → up_targets);
+    incoming arcs from higher-ranked nodes span `down_offsets[v]:down_offsets[v + 1]`
+    (down_sources → v). `*_middle` is the contracted node of a shortcut (-1 for
+    original edges), `*_edge` the index into edge_id of an original edge.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.node_ids = arrays["node_id"].tolist()
+        self.edge_ids = arrays["edge_id"].tolist()
+        self._node_lookup = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self._up = self._rows(arrays["up_offsets"], arrays["up_targets"], arrays["up_weight"])
+        self._down = self._rows(arrays["down_offsets"], arrays["down_sources"], arrays["down_weight"])
+        self._arcs = None
+        self._unpacked = {}
+
+    @staticmethod
+    def _rows(offsets, neighbours, weights):
+        offsets = offsets.tolist()
+        pairs = list(zip(neighbours.tolist(), weights.tolist()))
+        return [pairs[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+    def __contains__(self, node_id):
+        return node_id in self._node_lookup
+
+    def node_index(self, node_id):
+        return self._node_lookup[node_id]
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def _arc_table(self):
+        """(a, b) → (middle, edge) for every hierarchy arc, built on first unpack."""
+        if self._arcs is None:
+            a = self.arrays
+            up_sources = np.repeat(np.arange(len(self.node_ids)), np.diff(a["up_offsets"]))
+            down_targets = np.repeat(np.arange(len(self.node_ids)), np.diff(a["down_offsets"]))
+            self._arcs = {}
+            for keys_a, keys_b, middles, edges in (
+                (up_sources, a["up_targets"], a["up_middle"], a["up_edge"]),
+                (a["down_sources"], down_targets, a["down_middle"], a["down_edge"]),
+            ):
+                self._arcs.update(zip(zip(keys_a.tolist(), keys_b.tolist()), zip(middles.tolist(), edges.tolist())))
+        return self._arcs
+
+    def _unpack(self, a, b):
+        """Original edge IDs of hierarchy arc a → b. Unpacked arcs are memoized, so repeated queries reuse them."""
+        memo = self._unpacked
+        if (a, b) in memo:
+            return memo[(a, b)]
+        arcs = self._arc_table()
+        stack = [(a, b)]
+        while stack:
+            key = stack[-1]
+            if key in memo:
+                stack.pop()
+                continue
+            middle, edge = arcs[key]
+            if middle < 0:
+                memo[key] = (self.edge_ids[edge],)
+                stack.pop()
+                continue
+            first, second = (key[0], middle), (middle, key[1])
+            missing = [half for half in (second, first) if half not in memo]
+            if missing:
+                stack.extend(missing)
+                continue
+            memo[key] = memo[first] + memo[second]
+            stack.pop()
+        return memo[(a, b)]
+
+    def _query(self, s, t):
+        """Bidirectional upward Dijkstra. Returns the node path in hierarchy arcs, or None."""
+        dist_f, dist_b = {s: 0.0}, {t: 0.0}
+        pred_f, pred_b = {s: -1}, {t: -1}
+        heap_f, heap_b = [(0.0, s)], [(0.0, t)]
+        best, meet = math.inf, -1
+
+        while heap_f or heap_b:
+            if heap_f and heap_f[0][0] >= best:
+                heap_f = []
+            if heap_b and heap_b[0][0] >= best:
+                heap_b = []
+            for heap, dist, pred, other, rows in (
+                (heap_f, dist_f, pred_f, dist_b, self._up),
+                (heap_b, dist_b, pred_b, dist_f, self._down),
+            ):
+                if not heap:
+                    continue
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                if u in other and d + other[u] < best:
+                    best, meet = d + other[u], u
+                for v, weight in rows[u]:
+                    nd = d + weight
+                    if nd < dist.get(v, math.inf):
+                        dist[v] = nd
+                        pred[v] = u
+                        heapq.heappush(heap, (nd, v))
+
+        if meet < 0:
+            return None
+
+        forward = [meet]
+        while pred_f[forward[-1]] >= 0:
+            forward.append(pred_f[forward[-1]])
+        forward.reverse()
+        backward = [meet]
+        while pred_b[backward[-1]] >= 0:
+            backward.append(pred_b[backward[-1]])
+        return forward + backward[1:]
+
+    def shortest_path_edges(self, source, target):
+        """
+        Returns the SUMO edge IDs of a shortest path from source to target.
+
+        Raises KeyError for unknown node IDs and NoPathError if the target is
+        not reachable from the source.
+        """
+        s, t = self.node_index(source), self.node_index(target)
+        if s == t:
+            return []
+        node_path = self._query(s, t)
+        if node_path is None:
+            raise NoPathError(f"No path between {source} and {target}")
+        edges = []
+        for u, w in zip(node_path[:-1], node_path[1:]):
+            edges.extend(self._unpack(u, w))
+        return edges
+
+    def shortest_paths_from(self, source, targets):
+        """
+        Same contract as RoutingGraph.shortest_paths_from.
+
+        Returns:
+            dict: target → list of edge IDs, or None if unreachable
+        """
+        self.node_index(source)
+        paths = {}
+        for target in targets:
+            try:
+                paths[target] = self.shortest_path_edges(source, target)
+            except NoPathError:
+                paths[target] = None
+        return paths
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Persistence
+# ─────────────────────────────────────────────────────────────────────────────
+
+def ch_dir_for(net_file):
+    return f"{net_file}.ch"
+
+def _read_manifest(ch_dir):
+    try:
+        with open(os.path.join(ch_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(ch_dir, manifest):
+    with open(os.path.join(ch_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def _is_current(net_file, ch_dir, manifest, weight):
+    if not manifest or manifest.get("version") != CH_VERSION or manifest.get("weight") != weight:
+        return False
+
+    stat = os.stat(net_file)
+    if manifest["size"] != stat.st_size:
+        return False
+    if manifest["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    if manifest["sha1"] == file_sha1(net_file):
+        manifest["mtime_ns"] = stat.st_mtime_ns
+        _write_manifest(ch_dir, manifest)
+        return True
+    return False
+
+def save_contraction_hierarchy(ch, net_file, weight, ch_dir=None):
+    ch_dir = ch_dir or ch_dir_for(net_file)
+    tmp_dir = f"{ch_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), ch.arrays[name])
+
+    stat = os.stat(net_file)
+    _write_manifest(tmp_dir, {
+        "version": CH_VERSION,
+        "net_file": os.path.abspath(net_file),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": file_sha1(net_file),
+        "weight": weight,
+        "nodes": len(ch.node_ids),
+        "arcs": int(len(ch.arrays["up_targets"]) + len(ch.arrays["down_sources"])),
+    })
+
+    shutil.rmtree(ch_dir, ignore_errors=True)
+    os.replace(tmp_dir, ch_dir)
+    logging.info(f"💾 Contraction hierarchy written to {ch_dir}")
+    return ch_dir
+
+def load_contraction_hierarchy(net_file, weight="length", graph=None, rebuild=False):
+    """
+    Returns the ContractionHierarchy of net_file, building and saving it first
+    if missing or stale. `graph` (a RoutingGraph with the same weighting) is
+    reused for the build if given; otherwise it is loaded from the net snapshot.
+    """
+    ch_dir = ch_dir_for(net_file)
+    if rebuild or not _is_current(net_file, ch_dir, _read_manifest(ch_dir), weight):
+        if graph is None or graph.weight != weight:
+            graph = RoutingGraph.from_net_snapshot(load_net_snapshot(net_file), weight=weight, with_coordinates=False)
+        save_contraction_hierarchy(build_contraction_hierarchy(graph), net_file, weight, ch_dir)
+
+    start = time.time()
+    ch = ContractionHierarchy({name: np.load(os.path.join(ch_dir, f"{name}.npy")) for name in ARRAY_NAMES})
+    logging.info(f"⚡ Loaded contraction hierarchy from {ch_dir} in {time.time() - start:.2f} seconds.")
+    return ch
+
+# ─────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    load_contraction_hierarchy(SUMO_NET_FILE, rebuild=True)
@@ -1,13 +1,16 @@
 import os
+import sys
 import pandas as pd
 import logging
-import ast
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table
 
 # ------------------------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------------------------
-ROUTES_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_with_metadata.csv"
-OUTPUT_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\zurich_origin_routes.csv"
+ROUTES_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_with_metadata.parquet"
+OUTPUT_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\zurich_origin_routes.parquet"
 
 # ------------------------------------------------------------------------------
 # Logging setup
@@ -21,9 +24,9 @@ logging.basicConfig(
 # Main logic
 # ------------------------------------------------------------------------------
 def main():
-    logging.info("🔍 Loading routes_with_metadata.csv...")
+    logging.info("🔍 Loading routes_with_metadata.parquet...")
     try:
-        df = pd.read_csv(ROUTES_PATH, sep=';')
+        df = read_route_table(ROUTES_PATH)
         logging.info(f"✅ Loaded file with shape: {df.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load CSV file: {e}")
@@ -32,11 +35,8 @@ def main():
     # Total number of routes
     total_routes = len(df)
 
-    # Safely parse 'stops' column from string to list
-    df['stops'] = df['stops'].apply(ast.literal_eval)
-
     # Find route with most stops
-    df['num_stops'] = df['stops'].apply(len)
+    df['num_stops'] = df['stops'].map(len)
     max_row = df.loc[df['num_stops'].idxmax()]
     max_trip_id = max_row['trip_id']
     max_stop_count = max_row['num_stops']
@@ -45,7 +45,7 @@ def main():
     zurich_df = df[df['trip_name'].str.startswith("Zürich HB-")].copy()
 
     # Save filtered result
-    zurich_df.to_csv(OUTPUT_PATH, sep=';', index=False)
+    write_route_table(zurich_df, OUTPUT_PATH)
     logging.info(f"💾 Saved {len(zurich_df)} Zürich-origin routes to: {OUTPUT_PATH}")
 
     # Print results
@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from routing_graph import RoutingGraph, NoPathError
+from chain_contraction import contract_degree2_chains
+from net_snapshot import load_net_snapshot
+
+# ------------------------------------------------------------------------------
+# Logging setup
+# ------------------------------------------------------------------------------
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# ------------------------------------------------------------------------------
+# Benchmark settings (synthetic network: junction grid whose links are chains
+# of short track segments, like swissTNE bn_edge)
+# ------------------------------------------------------------------------------
+GRID_SIZE = 60               # junctions per side
+SEGMENTS_PER_LINK = 10       # track segments between two junctions
+LINK_PROBABILITY = 0.6
+N_STOP_NODES = 2_000
+N_PAIRS = 500
+SEED = 42
+
+# ------------------------------------------------------------------------------
+# Inputs
+# ------------------------------------------------------------------------------
+def make_rail_network(rng):
+    """Returns (edge_ids, from_nodes, to_nodes, lengths, node_ids, x, y) with both directions per segment."""
+    n_junctions = GRID_SIZE * GRID_SIZE
+    jx = (np.arange(n_junctions) % GRID_SIZE) * 5000.0 + rng.normal(0, 300, n_junctions)
+    jy = (np.arange(n_junctions) // GRID_SIZE) * 5000.0 + rng.normal(0, 300, n_junctions)
+
+    links = []
+    for step in (1, GRID_SIZE):
+        a = np.arange(n_junctions)
+        b = a + step
+        valid = (b < n_junctions) & ((step == GRID_SIZE) | (a % GRID_SIZE != GRID_SIZE - 1))
+        keep = rng.random(valid.sum()) < LINK_PROBABILITY
+        links += list(zip(a[valid][keep].tolist(), b[valid][keep].tolist()))
+
+    x, y = list(jx), list(jy)
+    from_nodes, to_nodes = [], []
+    for a, b in links:
+        chain = [a]
+        for k in range(1, SEGMENTS_PER_LINK):
+            f = k / SEGMENTS_PER_LINK
+            x.append(jx[a] * (1 - f) + jx[b] * f)
+            y.append(jy[a] * (1 - f) + jy[b] * f)
+            chain.append(len(x) - 1)
+        chain.append(b)
+        for u, v in zip(chain[:-1], chain[1:]):
+            from_nodes += [u, v]
+            to_nodes += [v, u]
+
+    x, y = np.array(x), np.array(y)
+    from_nodes, to_nodes = np.array(from_nodes), np.array(to_nodes)
+    lengths = np.hypot(x[from_nodes] - x[to_nodes], y[from_nodes] - y[to_nodes]) * rng.uniform(1.0, 1.1, len(from_nodes))
+    node_ids = np.array([f"n{i}" for i in range(len(x))])
+    edge_ids = [f"e{i}" for i in range(len(from_nodes))]
+    return edge_ids, node_ids[from_nodes], node_ids[to_nodes], lengths, node_ids, x, y
+
+def load_network(net_file, weight, with_coordinates):
+    net = load_net_snapshot(net_file)
+    return RoutingGraph.from_net_snapshot(net, weight=weight, with_coordinates=with_coordinates)
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+def time_queries(graph, pairs):
+    paths = []
+    start = time.perf_counter()
+    for source, target in pairs:
+        try:
+            paths.append(graph.shortest_path_edges(source, target))
+        except NoPathError:
+            paths.append(None)
+    return paths, (time.perf_counter() - start) / len(pairs)
+
+def run_benchmark(net_file=None):
+    rng = np.random.default_rng(SEED)
+    synthetic = None if net_file else make_rail_network(rng)
+
+    rows = []
+    for weight, with_coordinates in [("hops", False), ("length", False), ("length", True)]:
+        if synthetic:
+            edge_ids, from_nodes, to_nodes, lengths, node_ids, x, y = synthetic
+            graph = RoutingGraph.from_arrays(edge_ids, from_nodes, to_nodes, lengths, weight=weight)
+            if with_coordinates:
+                graph.set_node_coordinates(node_ids, x, y)
+        else:
+            graph = load_network(net_file, weight, with_coordinates)
+
+        stop_nodes = [graph.node_ids[i] for i in rng.choice(graph.number_of_nodes(), N_STOP_NODES, replace=False)]
+        pairs = [(stop_nodes[i], stop_nodes[j]) for i, j in rng.integers(len(stop_nodes), size=(N_PAIRS, 2)) if i != j]
+
+        start = time.perf_counter()
+        contracted = contract_degree2_chains(graph, keep=stop_nodes)
+        contract_s = time.perf_counter() - start
+
+        full_paths, full_s = time_queries(graph, pairs)
+        contracted_paths, contracted_s = time_queries(contracted, pairs)
+
+        weight_of = dict(zip(np.asarray(graph.edge_ids)[graph.edge_index], graph.length))
+        cost = len if weight == "hops" else (lambda path: round(sum(weight_of[e] for e in path), 3))
+        for full, short in zip(full_paths, contracted_paths):
+            if (full is None) != (short is None) or (full is not None and cost(full) != cost(short)):
+                raise AssertionError("Contracted routing differs from routing on the full graph")
+
+        mode = "A*" if graph.uses_astar() else ("BFS" if weight == "hops" else "Dijkstra")
+        rows.append({
+            'weight': weight,
+            'search': mode,
+            'nodes': f"{graph.number_of_nodes():,} → {contracted.number_of_nodes():,}",
+            'edges': f"{graph.number_of_edges():,} → {contracted.number_of_edges():,}",
+            'contract_s': round(contract_s, 2),
+            'full_ms/pair': round(full_s * 1e3, 3),
+            'contracted_ms/pair': round(contracted_s * 1e3, 3),
+            'speedup': round(full_s / contracted_s, 1),
+        })
+        logging.info(f"⏱️ {weight}/{mode}: {full_s * 1e3:.2f} ms → {contracted_s * 1e3:.2f} ms per pair")
+
+    print("\n📊 Degree-2 chain contraction benchmark:\n")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+# ------------------------------------------------------------------------------
+# Execute
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark routing on the chain-contracted graph.")
+    parser.add_argument("--net-file", help="Use a real .net.xml instead of the synthetic network")
+    args = parser.parse_args()
+    run_benchmark(args.net_file)
@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "preprocessing"))
+from route_table import stops_from_arrays
+from filter_and_enrich_routes import build_stop_name_index, attach_trip_names
+
+# ------------------------------------------------------------------------------
+# Logging setup
+# ------------------------------------------------------------------------------
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+# ------------------------------------------------------------------------------
+# Benchmark settings (synthetic data, roughly Swiss GTFS scale)
+# ------------------------------------------------------------------------------
+N_STOPS = 30_000
+ROUTE_SIZES = [10_000, 100_000, 1_000_000]
+LEGACY_SAMPLE = 2_000          # the per-route scan is only timed on a sample and extrapolated
+STOPS_PER_ROUTE = (2, 40)
+SEED = 42
+
+# ------------------------------------------------------------------------------
+# Synthetic inputs
+# ------------------------------------------------------------------------------
+def make_stops_df(rng, n_stops):
+    stop_ids = 8_500_000 + rng.choice(100_000, size=n_stops, replace=False)
+    return pd.DataFrame({
+        'stop_id': stop_ids,
+        'logical_stop_name': [f"Stop {i}" for i in range(n_stops)],
+    })
+
+def make_routes_df(rng, stops_df, n_routes):
+    lengths = rng.integers(*STOPS_PER_ROUTE, size=n_routes)
+    offsets = np.zeros(n_routes + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = stops_df['stop_id'].astype(str).to_numpy(dtype=object)[rng.integers(len(stops_df), size=offsets[-1])]
+    return pd.DataFrame({
+        'trip_id': [f"trip_{i}" for i in range(n_routes)],
+        'stops': stops_from_arrays(offsets, values),
+    })
+
+# ------------------------------------------------------------------------------
+# Implementations
+# ------------------------------------------------------------------------------
+def legacy_trip_names(routes_df, stops_df):
+    """Previous behaviour: two full-column scans of stops_df per route."""
+    names = []
+    for stops in routes_df['stops']:
+        origin_name = stops_df.loc[stops_df['stop_id'] == int(stops[0]), 'logical_stop_name'].values[0]
+        dest_name = stops_df.loc[stops_df['stop_id'] == int(stops[-1]), 'logical_stop_name'].values[0]
+        names.append(f"{origin_name}-{dest_name}")
+    return names
+
+def indexed_trip_names(routes_df, stops_df):
+    return attach_trip_names(routes_df, build_stop_name_index(stops_df))['trip_name'].tolist()
+
+# ------------------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------------------
+def run_benchmark():
+    rng = np.random.default_rng(SEED)
+    stops_df = make_stops_df(rng, N_STOPS)
+    logging.info(f"🧪 Synthetic stop table: {len(stops_df):,} stops")
+
+    rows = []
+    for n_routes in ROUTE_SIZES:
+        routes_df = make_routes_df(rng, stops_df, n_routes)
+
+        start = time.perf_counter()
+        indexed = indexed_trip_names(routes_df, stops_df)
+        indexed_s = time.perf_counter() - start
+
+        sample_df = routes_df.head(LEGACY_SAMPLE)
+        start = time.perf_counter()
+        legacy = legacy_trip_names(sample_df, stops_df)
+        legacy_s = (time.perf_counter() - start) * n_routes / len(sample_df)
+
+        if legacy != indexed[:len(sample_df)]:
+            raise AssertionError("Indexed trip names differ from the legacy lookup")
+
+        rows.append({
+            'routes': n_routes,
+            'indexed_s': round(indexed_s, 3),
+            'legacy_s_extrapolated': round(legacy_s, 1),
+            'speedup': round(legacy_s / indexed_s, 1),
+        })
+        logging.info(f"⏱️ {n_routes:,} routes: indexed {indexed_s:.3f}s vs legacy ~{legacy_s:.1f}s")
+
+    print("\n📊 Trip name enrichment benchmark:\n")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+# ------------------------------------------------------------------------------
+# Execute
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+    run_benchmark()
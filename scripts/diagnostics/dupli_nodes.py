@@ -1,11 +1,17 @@
+import os
+import sys
 import pandas as pd
 
-mapping = pd.read_csv("data/Swiss/interim/stop_mappings/stop_id_to_node_id.csv")
-stop_times = pd.read_csv("data/Swiss/raw/gtfs/stop_times.txt")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gtfs_feed import load_stop_times
 
-trip_groups = stop_times.groupby("trip_id")
+mapping = pd.read_csv("data/Swiss/interim/stop_mappings/stop_id_to_node_id.csv", dtype={"stop_id": str})
+stop_times = load_stop_times("data/Swiss/raw/gtfs", columns=["trip_id", "stop_id", "stop_sequence"])
+stop_times["stop_id"] = stop_times["stop_id"].astype(str)
+
+trip_groups = stop_times.groupby("trip_id", observed=True)
 for trip_id, group in trip_groups:
-    stop_ids = group.sort_values("stop_sequence")["stop_id"].tolist()
+    stop_ids = group["stop_id"].tolist()  # cache rows are sorted by stop_sequence
     node_ids = [mapping.set_index("stop_id").get("node_id").get(sid, None) for sid in stop_ids]
     unique_nodes = set(node_ids)
     if len(unique_nodes) == 1 and None not in unique_nodes:
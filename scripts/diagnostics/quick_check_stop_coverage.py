@@ -1,7 +1,12 @@
 # quick_check_stop_coverage.py
+import os
+import sys
 import pandas as pd
 
-gtfs_stops = pd.read_csv("data/Swiss/raw/gtfs/stop_times.txt")["stop_id"].nunique()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gtfs_feed import load_stop_times
+
+gtfs_stops = load_stop_times("data/Swiss/raw/gtfs", columns=["stop_id"])["stop_id"].nunique()
 mapped_stops = pd.read_csv("data/Swiss/interim/stop_mappings/stop_id_to_node_id.csv")["stop_id"].nunique()
 
 print(f"🧮 GTFS stop IDs in stop_times.txt:       {gtfs_stops:,}")
@@ -1,10 +1,13 @@
 import os
+import sys
 import logging
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
-from sklearn.neighbors import BallTree
-import numpy as np
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from projection import WGS84, LV95, transform_xy
+from stop_node_matcher import StopNodeMatcher
 
 # ────────────────────────────────────────────────────────────────────────────────
 # CONFIG
@@ -13,6 +16,7 @@ import numpy as np
 STOP_NODE_MAPPING = "data/Swiss/interim/stop_mappings/stop_id_to_node_id.csv"
 GTFS_STOPS = "data/Swiss/raw/gtfs/stops.txt"
 HALTESTELLEN = "data/Swiss/raw/haltestellen_2025.csv"
+RAIL_NODES = "data/Swiss/processed/rail_nodes_named.csv"
 OUTPUT_REFINED_MAPPING = "data/Swiss/interim/stop_mappings/stop_id_to_node_id_refined.csv"
 OUTPUT_GEOJSON = "output/diagnostics/gtfs_stop_node_mapping_debug.geojson"
 OUTPUT_CSV = "output/diagnostics/gtfs_stop_node_mapping_debug.csv"
@@ -32,8 +36,8 @@ gtfs = pd.read_csv(GTFS_STOPS)
 gtfs = gtfs.dropna(subset=["stop_lat", "stop_lon"])
 gtfs["stop_lat"] = gtfs["stop_lat"].astype(float)
 gtfs["stop_lon"] = gtfs["stop_lon"].astype(float)
-gtfs["geometry"] = gtfs.apply(lambda row: Point(row["stop_lon"], row["stop_lat"]), axis=1)
-gtfs_gdf = gpd.GeoDataFrame(gtfs, geometry="geometry", crs="EPSG:4326").to_crs(epsg=2056)
+x, y = transform_xy(gtfs["stop_lon"], gtfs["stop_lat"], WGS84, LV95)
+gtfs["geometry"] = shapely.points(x, y)
 
 logging.info("📥 Loading stop-to-node mapping...")
 mapping = pd.read_csv(STOP_NODE_MAPPING)
@@ -62,6 +66,18 @@ merged["in_haltestellen"] = merged["stop_id"].isin(halt["stop_id"])
 match_rate = merged["in_haltestellen"].mean() * 100
 logging.info(f"📊 GTFS→Haltestellen Match Rate: {match_rate:.2f}%")
 
+# ────────────────────────────────────────────────────────────────────────────────
+# STEP 2b — RUNNER-UP CANDIDATES (AMBIGUOUS MATCHES)
+# ────────────────────────────────────────────────────────────────────────────────
+
+logging.info("🔍 Looking up runner-up nodes for every stop...")
+matcher = StopNodeMatcher.from_node_table(RAIL_NODES)
+candidates = matcher.match_stops(gtfs, k=2)
+runner_up = candidates[candidates["rank"] == 2].set_index("stop_id")
+merged["second_node_id"] = merged["stop_id"].map(runner_up["node_id"])
+merged["second_distance_m"] = merged["stop_id"].map(runner_up["distance_m"])
+merged["distance_gap_m"] = merged["second_distance_m"] - merged["distance_m"]
+
 # ────────────────────────────────────────────────────────────────────────────────
 # STEP 3 — DEBUG EXPORTS FOR VISUAL INSPECTION
 # ────────────────────────────────────────────────────────────────────────────────
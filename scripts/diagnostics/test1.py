@@ -1,7 +1,11 @@
 import os
+import sys
 import logging
+import numpy as np
 import pandas as pd
-import ast
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, route_stop_arrays
 
 # ------------------------------------------------------------------------------
 # Logging setup
@@ -15,7 +19,7 @@ logging.basicConfig(
 # File paths (LOCAL ONLY)
 # ------------------------------------------------------------------------------
 BASE_PATH = r"D:\PhD\prog_report_2025_June_project"
-CLEAN_ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_fully_covered_by_sumo.csv")
+CLEAN_ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_fully_covered_by_sumo.parquet")
 SUMO_STOP_FILE = os.path.join(BASE_PATH, "data", "Swiss", "processed", "simpler_network", "simple_stops_edges_cleaned.csv")
 
 # ------------------------------------------------------------------------------
@@ -36,19 +40,14 @@ def compare_abbreviations(route_file: str, sumo_file: str):
 
     # --- Load routes ---
     try:
-        df_routes = pd.read_csv(route_file, sep=';', encoding='utf-8')
+        df_routes = read_route_table(route_file)
         logging.info(f"✅ Loaded route file with shape: {df_routes.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load route file: {e}")
         return
 
-    route_abbrs = set()
-    for row in df_routes['stops']:
-        try:
-            stops = ast.literal_eval(row)
-            route_abbrs.update([abbr.strip() for abbr in stops])
-        except Exception:
-            continue
+    _, stop_values = route_stop_arrays(df_routes)
+    route_abbrs = set(pd.Series(np.unique(stop_values.astype(str))).str.strip())
 
     # --- Load SUMO stop node abbreviations ---
     try:
@@ -2,17 +2,20 @@
 validate_stop_node_ids.py
 
 Checks how many node_ids in stop_id_to_node_id.csv exist in the compiled SUMO network.
-Parses <junction> elements in .net.xml instead of <node>.
+Reads <junction> elements of .net.xml (instead of <node>) from its binary snapshot.
 
 Author: Onur Deniz
 Updated: 2025-05-09
 """
 
-import xml.etree.ElementTree as ET
 import pandas as pd
 import time
 import logging
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from net_snapshot import load_net_snapshot
 
 # === Configuration ===
 NET_FILE = "SUMO/input/april_2025_swiss.net.xml"
@@ -26,16 +29,10 @@ logging.basicConfig(
 )
 
 def main():
-    logging.info("📥 Reading SUMO .net.xml...")
+    logging.info("📥 Loading SUMO network snapshot...")
     start = time.time()
-    tree = ET.parse(NET_FILE)
-    root = tree.getroot()
-
-    sumo_nodes = {
-        elem.attrib["id"]
-        for elem in root.findall("junction")
-        if "id" in elem.attrib
-    }
+    net = load_net_snapshot(NET_FILE)
+    sumo_nodes = set(net.junction_id[net.junction_mask()].tolist())
     logging.info(f"✅ Loaded {len(sumo_nodes):,} nodes from SUMO in {time.time() - start:.1f} seconds.")
 
     logging.info("📥 Reading mapped stop-node file...")
@@ -2,20 +2,24 @@
 visualize_routes.py
 
 Visualizes random train routes from route_edge_map.csv on a 2D plot
-using SUMO edge geometry data (from rail_edges_named.csv).
-
-Handles both 2D and 3D WKT geometries (LINESTRING and LINESTRING Z).
+using SUMO edge geometry data (from rail_edges_named.parquet, or the legacy
+WKT .csv). Z values are dropped; all edge vertices are extracted in one
+vectorized shapely call.
 Skips trips with missing or malformed edge sequences.
 
 Author: Onur Deniz
 Date: 2025-05
 """
 
+import os
+import sys
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import random
-import re
-import os
+import shapely
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geo_table import read_geo_table
 
 # ────────────────────────────────────────────────────────────────────────────────
 # CONFIGURATION
@@ -28,29 +32,15 @@ N_PLOTS = 5  # Number of random routes to plot
 SAVE_PNG = True  # Set to True to save PNGs instead of only showing them
 
 # ────────────────────────────────────────────────────────────────────────────────
-# GEOMETRY PARSER
+# GEOMETRY
 # ────────────────────────────────────────────────────────────────────────────────
 
-MAX_WARNINGS = 10
-parse_fail_count = 0
-
-def parse_linestring(wkt_str):
-    global parse_fail_count
-    try:
-        match = re.search(r"LINESTRING\s+Z?\s*\((.*?)\)", wkt_str)
-        coords_str = match.group(1)
-        coords = []
-        for point in coords_str.split(","):
-            parts = point.strip().split()
-            if len(parts) >= 2:
-                x, y = map(float, parts[:2])  # discard Z if present
-                coords.append((x, y))
-        return coords
-    except Exception as e:
-        parse_fail_count += 1
-        if parse_fail_count <= MAX_WARNINGS:
-            print(f"⚠️ Failed to parse geometry (#{parse_fail_count}): {wkt_str[:100]}... → {e}")
-        return []
+def build_edge_coords_map(edge_ids, geometries):
+    """Maps edge_id → (n, 2) vertex array, extracted for all edges at once."""
+    coords, index = shapely.get_coordinates(geometries, return_index=True)
+    offsets = np.zeros(len(geometries) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(index, minlength=len(geometries)), out=offsets[1:])
+    return dict(zip(edge_ids, np.split(coords, offsets[1:-1])))
 
 # ────────────────────────────────────────────────────────────────────────────────
 # PLOTTING
@@ -61,9 +51,8 @@ def plot_route(edge_sequence, trip_id, edge_coords_map, save_folder=None):
     for edge_id in edge_sequence:
         if edge_id in edge_coords_map:
             coords = edge_coords_map[edge_id]
-            if coords:
-                xs, ys = zip(*coords)
-                plt.plot(xs, ys, linewidth=2)
+            if len(coords):
+                plt.plot(coords[:, 0], coords[:, 1], linewidth=2)
     plt.title(f"Route for Trip ID: {trip_id}")
     plt.axis('equal')
     plt.grid(True)
@@ -83,12 +72,11 @@ def plot_route(edge_sequence, trip_id, edge_coords_map, save_folder=None):
 
 def main():
     print("📥 Loading edge geometries...")
-    edges_df = pd.read_csv(EDGE_GEOMETRY_FILE)
+    edges_df = read_geo_table(EDGE_GEOMETRY_FILE, columns=["edge_id", "geometry"])
     routes_df = pd.read_csv(ROUTE_EDGE_MAP_FILE)
 
-    edges_df = edges_df.dropna(subset=["geometry"])
-    edges_df["edge_coords"] = edges_df["geometry"].apply(parse_linestring)
-    edge_coords_map = dict(zip(edges_df["edge_id"], edges_df["edge_coords"]))
+    edges_df = edges_df[edges_df["geometry"].notna()]
+    edge_coords_map = build_edge_coords_map(edges_df["edge_id"].to_numpy(), edges_df["geometry"].to_numpy())
 
     sample = routes_df.sample(n=N_PLOTS)
 
@@ -0,0 +1,155 @@
+"""
+edge_snapper.py
+
+Snaps points (GTFS stops, haltestellen) onto rail edges instead of nodes.
+All edge polylines are indexed once in a shapely STRtree; every point is then
+resolved in a single bulk `query_nearest` call, and its position along the
+matched edge is computed with one vectorized `line_locate_point`. A stop lying
+mid-edge therefore stays mid-edge instead of being pulled to a junction.
+
+Edge ids are sanitized exactly like write_sumo_edges.py does (sumo_ids), so the
+result (edge id, lane id, lane position) can be used directly for SUMO
+<trainStop> and <stop> elements.
+
+The edge is chosen on the swissTNE geometry, but SUMO positions are measured
+along the lane netconvert builds. With the compiled network passed in (as a
+net snapshot), each point is projected onto that edge's shape from the
+.net.xml and the fraction travelled is scaled to the lane length. Without it,
+or for edges missing from the net, the position along the swissTNE geometry
+is used and clamped to its length — an approximation that friendlyPos lets
+SUMO correct.
+
+Used by:
+    - generate_train_stops.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import shapely
+
+from geo_table import read_geo_table
+from projection import WGS84, LV95, transform_xy
+from sumo_ids import sanitize_edge_id
+
+EDGE_CRS = LV95
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SUMO lanes
+# ─────────────────────────────────────────────────────────────────────────────
+
+def lane_positions(net, edge_ids, points):
+    """
+    Positions of points along the first lane of the given SUMO edges.
+
+    Each point is projected onto its edge's shape from the net snapshot and
+    the fraction travelled is scaled to the lane length, so the result is in
+    SUMO lane coordinates even where netconvert changed the geometry.
+
+    Returns:
+        (lane_pos, lane_length): float arrays, NaN for edges not in the net
+        or without a usable shape/length.
+    """
+    net_index = {edge_id: i for i, edge_id in enumerate(np.asarray(net.edge_id).tolist())}
+    lane_pos = np.full(len(edge_ids), np.nan)
+    lane_length = np.full(len(edge_ids), np.nan)
+
+    unique_ids, inverse = np.unique(np.asarray(edge_ids, dtype=str), return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    groups = np.split(order, np.cumsum(np.bincount(inverse, minlength=len(unique_ids)))[:-1])
+    for edge_id, rows in zip(unique_ids.tolist(), groups):
+        i = net_index.get(edge_id)
+        if i is None:
+            continue
+        shape = np.asarray(net.edge_shape(i))
+        length = float(net.edge_length[i])
+        if len(shape) < 2 or not np.isfinite(length):
+            continue
+        fraction = shapely.line_locate_point(shapely.linestrings(shape), points[rows], normalized=True)
+        lane_pos[rows] = fraction * length
+        lane_length[rows] = length
+    return lane_pos, lane_length
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Snapper
+# ─────────────────────────────────────────────────────────────────────────────
+
+class EdgeSnapper:
+    """Nearest-edge lookup over rail edge polylines in the network CRS."""
+
+    def __init__(self, edge_ids, geometries):
+        geometries = np.asarray(geometries, dtype=object)
+        is_line = (shapely.get_type_id(geometries) == shapely.GeometryType.LINESTRING) & ~shapely.is_empty(geometries)
+        if not is_line.all():
+            logging.warning(f"⚠️ Ignoring {int((~is_line).sum()):,} edges without a usable LineString geometry.")
+
+        self.edge_ids = np.asarray(edge_ids, dtype=object)[is_line]
+        self.geometries = geometries[is_line]
+        self.lengths = shapely.length(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def from_edge_table(cls, edge_file):
+        """Loads rail_edges(_named) (.parquet sibling preferred) and indexes its geometries."""
+        edges = read_geo_table(edge_file, columns=["edge_id_human", "geometry"])
+        edge_ids = [sanitize_edge_id(edge_id) for edge_id in edges["edge_id_human"]]
+        snapper = cls(edge_ids, edges["geometry"].to_numpy())
+        logging.info(f"🌳 Indexed {len(snapper.edge_ids):,} edge geometries in an STRtree.")
+        return snapper
+
+    def snap(self, x, y, max_distance=None, net=None):
+        """
+        Snaps coordinates in the network CRS to their nearest edge.
+
+        Args:
+            net (NetSnapshot): compiled network; if given, lane_pos and
+                edge_length refer to the SUMO lane (see module docstring).
+
+        Returns:
+            pd.DataFrame: one row per snapped point with columns point_index
+            (position in x/y), edge_id, lane_id (first lane), lane_pos (metres
+            from the edge start), edge_length and distance_m. Points farther
+            than max_distance from every edge are left out; on ties the first
+            edge wins.
+        """
+        points = shapely.points(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        (point_index, edge_index), distances = self.tree.query_nearest(
+            points, max_distance=max_distance, return_distance=True, all_matches=False
+        )
+        lane_pos = shapely.line_locate_point(self.geometries[edge_index], points[point_index])
+        edge_length = self.lengths[edge_index]
+        edge_ids = self.edge_ids[edge_index]
+
+        if net is not None:
+            net_pos, net_length = lane_positions(net, edge_ids, points[point_index])
+            on_net = np.isfinite(net_pos)
+            if not on_net.all():
+                logging.warning(
+                    f"⚠️ {int((~on_net).sum()):,} snapped points lie on edges missing from the net; "
+                    "keeping their swissTNE positions."
+                )
+            lane_pos = np.where(on_net, net_pos, lane_pos)
+            edge_length = np.where(on_net, net_length, edge_length)
+
+        return pd.DataFrame({
+            "point_index": point_index,
+            "edge_id": edge_ids,
+            "lane_id": [f"{edge_id}_0" for edge_id in edge_ids],
+            "lane_pos": np.clip(lane_pos, 0.0, edge_length),
+            "edge_length": edge_length,
+            "distance_m": distances,
+        })
+
+    def snap_stops(self, stops_df, max_distance=None, net=None):
+        """
+        Projects GTFS-style stops (stop_lon/stop_lat, WGS84) to the network CRS
+        and snaps them. Returns snap() columns with stop_id instead of point_index.
+        """
+        stops = stops_df.dropna(subset=["stop_lat", "stop_lon"])
+        x, y = transform_xy(stops["stop_lon"].astype(float), stops["stop_lat"].astype(float), WGS84, EDGE_CRS)
+        snapped = self.snap(x, y, max_distance=max_distance, net=net)
+        snapped.insert(0, "stop_id", stops["stop_id"].to_numpy()[snapped["point_index"].to_numpy()])
+        return snapped.drop(columns="point_index")
@@ -3,7 +3,20 @@ extract_nodes_and_edges.py
 
 Phase 1 of the SUMO Swiss Network Pipeline (April 2025 edition).
 Extracts and projects raw railway nodes and edges from SwissTNE GeoPackage (LV95),
-and saves them to CSV files for SUMO conversion.
+and saves them as GeoParquet (WKB geometry) for SUMO conversion. The legacy
+WKT-in-CSV copies are still written while WRITE_LEGACY_CSV is enabled.
+
+Layers are read through pyogrio's Arrow path, loading only the columns used
+below. Both layers are read concurrently. A study area can be cut out at read
+time with --bbox (layer CRS) and/or an OGR SQL --where filter on the edge
+layer (bn_edge columns), e.g.
+
+    python scripts/extract_nodes_and_edges.py --bbox 2670000 1240000 2700000 1260000 \
+        --output-dir data/Swiss/processed/zurich/
+
+With a filter active, edges whose end nodes fall outside the box are dropped
+and only the end nodes of the remaining edges are kept, so the node and edge
+outputs always describe the same self-contained sub-network.
 
 Author: Onur Deniz
 Date: 2025-05
@@ -11,9 +24,13 @@ Date: 2025-05
 
 import geopandas as gpd
 import pandas as pd
+import argparse
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from geo_table import write_geo_table
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
@@ -23,6 +40,9 @@ OUTPUT_DIR = "data/Swiss/processed/"
 NODE_LAYER = "bn_node"
 EDGE_LAYER = "bn_edge"
 CRS_TARGET = 2056  # EPSG:2056 (LV95 / CH1903+)
+NODE_COLUMNS = ["object_id"]
+EDGE_COLUMNS = ["object_id", "from_node_object_id", "to_node_object_id", "m_length"]
+WRITE_LEGACY_CSV = True  # also emit rail_nodes.csv / rail_edges.csv for older scripts
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Logging setup
@@ -36,50 +56,104 @@ logging.basicConfig(
 # ─────────────────────────────────────────────────────────────────────────────
 # Helper: Load + Project GeoPackage Layer
 # ─────────────────────────────────────────────────────────────────────────────
-def load_and_project_layer(gpkg_path, layer_name, target_crs):
-    """Loads a layer from GeoPackage, reprojects to target CRS."""
+def load_and_project_layer(gpkg_path, layer_name, target_crs, columns=None, bbox=None, where=None):
+    """
+    Loads a layer from GeoPackage via pyogrio/Arrow, reprojects to target CRS.
+
+    Args:
+        columns (list): Attribute columns to read (geometry is always read).
+        bbox (tuple): (xmin, ymin, xmax, ymax) in the layer CRS, or None.
+        where (str): OGR SQL attribute filter, or None.
+    """
     try:
         logging.info(f"📂 Reading layer '{layer_name}' from {gpkg_path}...")
-        gdf = gpd.read_file(gpkg_path, layer=layer_name)
-        logging.info(f"✅ Loaded {len(gdf)} rows from '{layer_name}'")
+        gdf = gpd.read_file(
+            gpkg_path, layer=layer_name, engine="pyogrio", use_arrow=True,
+            columns=columns, bbox=bbox, where=where
+        )
+        logging.info(f"✅ Loaded {len(gdf):,} rows from '{layer_name}'")
         return gdf.to_crs(epsg=target_crs)
     except Exception as e:
         logging.error(f"❌ Failed to load layer '{layer_name}': {e}")
         sys.exit(1)
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Helper: Save layer as GeoParquet (+ legacy CSV)
+# ─────────────────────────────────────────────────────────────────────────────
+def save_layer(gdf, name, label, output_dir=OUTPUT_DIR):
+    # CSV first: readers fall back to the CSV whenever it is newer than the Parquet file
+    if WRITE_LEGACY_CSV:
+        csv_outfile = os.path.join(output_dir, f"{name}.csv")
+        gdf.to_csv(csv_outfile, index=False)
+        logging.info(f"💾 Saved {len(gdf):,} {label} → {csv_outfile}")
+
+    parquet_outfile = os.path.join(output_dir, f"{name}.parquet")
+    write_geo_table(gdf, parquet_outfile)
+    logging.info(f"💾 Saved {len(gdf):,} {label} → {parquet_outfile}")
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Main logic
 # ─────────────────────────────────────────────────────────────────────────────
-def main():
+def main(bbox=None, where=None, output_dir=OUTPUT_DIR):
     logging.info("🚆 Phase 1: Extracting nodes and edges from SwissTNE...")
+    if bbox or where:
+        logging.info(f"🗺️ Study area filter: bbox={bbox}, where={where}")
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
 
-    # ── Load and export nodes ────────────────────────────────────────────────
-    gdf_nodes = load_and_project_layer(INPUT_GPKG, NODE_LAYER, CRS_TARGET)
-    gdf_nodes["node_id"] = "n_" + gdf_nodes["object_id"].astype(str)
-    gdf_nodes["x"] = gdf_nodes.geometry.x
-    gdf_nodes["y"] = gdf_nodes.geometry.y
+    # ── Load both layers concurrently (the attribute filter names edge columns) ──
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        nodes_future = pool.submit(load_and_project_layer, INPUT_GPKG, NODE_LAYER, CRS_TARGET, NODE_COLUMNS, bbox)
+        edges_future = pool.submit(load_and_project_layer, INPUT_GPKG, EDGE_LAYER, CRS_TARGET, EDGE_COLUMNS, bbox, where)
+        gdf_nodes = nodes_future.result()
+        gdf_edges = edges_future.result()
 
-    node_cols = ["node_id", "object_id", "x", "y", "geometry"]
-    node_outfile = os.path.join(OUTPUT_DIR, "rail_nodes.csv")
-    gdf_nodes[node_cols].to_csv(node_outfile, index=False)
-    logging.info(f"💾 Saved {len(gdf_nodes):,} nodes → {node_outfile}")
+    gdf_nodes["node_id"] = "n_" + gdf_nodes["object_id"].astype(str)
 
-    # ── Load and export edges ────────────────────────────────────────────────
-    gdf_edges = load_and_project_layer(INPUT_GPKG, EDGE_LAYER, CRS_TARGET)
+    # ── Export edges ─────────────────────────────────────────────────────────
     gdf_edges["edge_id"] = "e_" + gdf_edges["object_id"].astype(str)
     gdf_edges["from_node"] = "n_" + gdf_edges["from_node_object_id"].astype(str)
     gdf_edges["to_node"] = "n_" + gdf_edges["to_node_object_id"].astype(str)
     gdf_edges["length"] = gdf_edges["m_length"]
 
+    if bbox or where:
+        # Edges crossing the study-area boundary reference nodes that were not read
+        inside = gdf_edges["from_node"].isin(gdf_nodes["node_id"]) & gdf_edges["to_node"].isin(gdf_nodes["node_id"])
+        logging.info(f"✂️ Dropping {(~inside).sum():,} edges with end nodes outside the study area")
+        gdf_edges = gdf_edges[inside]
+
     edge_cols = ["edge_id", "object_id", "from_node", "to_node", "length", "geometry"]
-    edge_outfile = os.path.join(OUTPUT_DIR, "rail_edges.csv")
-    gdf_edges[edge_cols].to_csv(edge_outfile, index=False)
-    logging.info(f"💾 Saved {len(gdf_edges):,} edges → {edge_outfile}")
+    save_layer(gdf_edges[edge_cols], "rail_edges", "edges", output_dir)
+
+    # ── Export nodes ─────────────────────────────────────────────────────────
+    if bbox or where:
+        # Only the end nodes of the selected edges, so both outputs agree
+        endpoint = gdf_nodes["node_id"].isin(gdf_edges["from_node"]) | gdf_nodes["node_id"].isin(gdf_edges["to_node"])
+        logging.info(f"✂️ Dropping {(~endpoint).sum():,} nodes that are not end nodes of a selected edge")
+        gdf_nodes = gdf_nodes[endpoint].copy()
+
+    gdf_nodes["x"] = gdf_nodes.geometry.x
+    gdf_nodes["y"] = gdf_nodes.geometry.y
+
+    node_cols = ["node_id", "object_id", "x", "y", "geometry"]
+    save_layer(gdf_nodes[node_cols], "rail_nodes", "nodes", output_dir)
 
     logging.info("✅ Phase 1 complete. Ready for Phase 2: write_sumo_nodes.py")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract SwissTNE rail nodes and edges.")
+    parser.add_argument(
+        "--bbox", type=float, nargs=4, metavar=("XMIN", "YMIN", "XMAX", "YMAX"),
+        help="Only read features intersecting this box (layer CRS)"
+    )
+    parser.add_argument(
+        "--where",
+        help="OGR SQL attribute filter on the edge layer (bn_edge columns); nodes follow the selected edges"
+    )
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help=f"Output folder (default: {OUTPUT_DIR})")
+    return parser.parse_args()
+
 # ─────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(tuple(args.bbox) if args.bbox else None, args.where, args.output_dir)
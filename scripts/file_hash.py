@@ -0,0 +1,25 @@
+"""
+file_hash.py
+
+Content hashing for the file-based caches and manifests of the pipeline.
+
+Used by:
+    - net_snapshot.py
+    - netconvert_build.py
+    - stop_node_matcher.py
+    - contraction_hierarchy.py
+    - run_pipeline.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import hashlib
+
+def file_sha1(path, chunk_size=1 << 20):
+    """SHA-1 hex digest of a file's content, read in chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -12,16 +12,23 @@ Input:
 
 Output:
     - SUMO/input/april_2025_swiss.net.xml
+    - SUMO/input/april_2025_swiss.net.xml.build.json (input hashes, build timings)
+
+netconvert is skipped when the inputs and options are unchanged since the
+last build; pass --force to rebuild anyway.
 
 Author: Onur Deniz
 Date: 2025-05
 """
 
 import os
+import argparse
 import subprocess
 import logging
 import sys
 
+from netconvert_build import run_netconvert
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
 # ─────────────────────────────────────────────────────────────────────────────
@@ -37,7 +44,7 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 # ─────────────────────────────────────────────────────────────────────────────
 # Main
 # ─────────────────────────────────────────────────────────────────────────────
-def main():
+def main(force=False):
     logging.info("🔧 Phase 5: Compiling SUMO network using netconvert...")
 
     node_file = os.path.join(INPUT_DIR, "april_2025_swiss.nod.xml")
@@ -50,29 +57,31 @@ def main():
             logging.error(f"❌ Required input missing: {f}")
             sys.exit(1)
 
-    # Construct netconvert command
-    cmd = [
-        SUMO_BIN,
-        f"--node-files={node_file}",
-        f"--edge-files={edge_file}",
-        f"--connection-files={con_file}",
-        f"--output-file={OUTPUT_FILE}",
-        "--no-turnarounds"
-    ]
-
-    logging.info("🔧 Executing netconvert command:")
-    logging.info(" ".join(cmd))
+    inputs = {
+        "node-files": node_file,
+        "edge-files": edge_file,
+        "connection-files": con_file,
+    }
 
     try:
-        subprocess.run(cmd, check=True)
-        if os.path.exists(OUTPUT_FILE):
+        result = run_netconvert(inputs, OUTPUT_FILE, ["--no-turnarounds"], binary=SUMO_BIN, force=force)
+        if result.skipped:
+            logging.info("🎉 Phase 5 complete (cached network reused).")
+        elif os.path.exists(OUTPUT_FILE):
             logging.info(f"✅ Network successfully compiled → {OUTPUT_FILE}")
             logging.info("🎉 Phase 5 complete. Ready for inspection or validation.")
         else:
             logging.error("❌ netconvert completed but .net.xml file was not created.")
+            sys.exit(1)
     except subprocess.CalledProcessError:
         logging.error("❌ netconvert execution failed!", exc_info=True)
+        sys.exit(1)
 
 # ─────────────────────────────────────────────────────────────────────────────
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compile the SUMO network with netconvert.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if inputs are unchanged")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
+    main(force=parse_args().force)
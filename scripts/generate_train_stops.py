@@ -0,0 +1,121 @@
+"""
+generate_train_stops.py
+
+Snaps every GTFS stop onto the nearest rail edge (see edge_snapper.py) and
+writes SUMO <trainStop> definitions plus the stop → edge/lane position table.
+
+Each trainStop covers PLATFORM_LENGTH metres centred on the snapped position,
+shifted as needed to stay on the lane. Positions are measured along the SUMO
+lanes of the compiled network when it exists (see edge_snapper.py); otherwise
+along the swissTNE geometry, which friendlyPos lets SUMO correct. Stops farther than MAX_SNAP_DISTANCE
+from any rail edge (bus, tram and boat stops) are dropped.
+
+Input:
+    - data/Swiss/raw/gtfs/stops.txt
+    - data/Swiss/processed/rail_edges_named.parquet (or the legacy .csv, if newer)
+    - SUMO/input/april_2025_swiss.net.xml (optional, for lane positions)
+Output:
+    - SUMO/input/april_2025_swiss.stops.add.xml
+    - data/Swiss/interim/stop_mappings/stop_id_to_edge.csv
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import time
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+from edge_snapper import EdgeSnapper
+from net_snapshot import load_net_snapshot
+from sumo_xml_writer import SumoXmlWriter
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────────────────────────────────────
+GTFS_STOPS_FILE = "data/Swiss/raw/gtfs/stops.txt"
+RAIL_EDGES_FILE = "data/Swiss/processed/rail_edges_named.csv"
+SUMO_NET_FILE = "SUMO/input/april_2025_swiss.net.xml"
+OUTPUT_ADDITIONAL = "SUMO/input/april_2025_swiss.stops.add.xml"
+OUTPUT_MAPPING = "data/Swiss/interim/stop_mappings/stop_id_to_edge.csv"
+
+MAX_SNAP_DISTANCE = 50.0  # metres
+PLATFORM_LENGTH = 100.0   # metres
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Logging setup
+# ─────────────────────────────────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def platform_extent(lane_pos, edge_length, platform_length=PLATFORM_LENGTH):
+    """
+    Start/end positions of a platform centred on lane_pos, shifted to stay within
+    [0, edge_length]. Edges shorter than the platform are covered entirely.
+    """
+    length = np.minimum(platform_length, edge_length)
+    start = np.clip(lane_pos - length / 2, 0.0, edge_length - length)
+    return start, start + length
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+def main(max_distance=MAX_SNAP_DISTANCE, platform_length=PLATFORM_LENGTH):
+    logging.info(f"📥 Reading GTFS stops from {GTFS_STOPS_FILE}...")
+    stops_df = pd.read_csv(GTFS_STOPS_FILE, usecols=["stop_id", "stop_name", "stop_lat", "stop_lon"])
+    logging.info(f"✅ Loaded {len(stops_df):,} GTFS stops.")
+
+    snapper = EdgeSnapper.from_edge_table(RAIL_EDGES_FILE)
+    if os.path.exists(SUMO_NET_FILE):
+        net = load_net_snapshot(SUMO_NET_FILE)
+    else:
+        net = None
+        logging.warning(f"⚠️ {SUMO_NET_FILE} not found — lane positions follow the swissTNE geometry.")
+
+    start = time.time()
+    snapped = snapper.snap_stops(stops_df, max_distance=max_distance, net=net)
+    logging.info(
+        f"📍 Snapped {len(snapped):,} of {len(stops_df):,} stops to rail edges within {max_distance:g} m "
+        f"in {time.time() - start:.2f} seconds."
+    )
+
+    snapped["start_pos"], snapped["end_pos"] = platform_extent(
+        snapped["lane_pos"].to_numpy(), snapped["edge_length"].to_numpy(), platform_length
+    )
+    snapped["stop_name"] = snapped["stop_id"].map(stops_df.drop_duplicates("stop_id").set_index("stop_id")["stop_name"])
+
+    os.makedirs(os.path.dirname(OUTPUT_MAPPING), exist_ok=True)
+    snapped.drop(columns=["start_pos", "end_pos"]).to_csv(OUTPUT_MAPPING, index=False)
+    logging.info(f"💾 Stop → edge mapping saved to: {OUTPUT_MAPPING}")
+
+    trainstops = pd.DataFrame({
+        "id": snapped["stop_id"].astype(str),
+        "lane": snapped["lane_id"],
+        "startPos": snapped["start_pos"].round(2),
+        "endPos": snapped["end_pos"].round(2),
+        "name": snapped["stop_name"],
+        # Lets SUMO correct positions if netconvert changes lane lengths slightly
+        "friendlyPos": "true",
+    })
+    with SumoXmlWriter(OUTPUT_ADDITIONAL, "additional") as xml:
+        xml.dataframe("trainStop", trainstops)
+    logging.info(f"💾 {len(trainstops):,} trainStops written to: {OUTPUT_ADDITIONAL}")
+
+# ─────────────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snap GTFS stops onto rail edges and write SUMO trainStops.")
+    parser.add_argument("--max-distance", type=float, default=MAX_SNAP_DISTANCE, help="Snap radius in metres")
+    parser.add_argument("--platform-length", type=float, default=PLATFORM_LENGTH, help="trainStop length in metres")
+    args = parser.parse_args()
+    main(args.max_distance, args.platform_length)
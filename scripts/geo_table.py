@@ -0,0 +1,88 @@
+"""
+geo_table.py
+
+Shared reader/writer for the rail node and edge tables of the pipeline.
+
+extract_nodes_and_edges.py writes them as GeoParquet: typed columns plus a
+WKB `geometry` column, several times smaller than the WKT-in-CSV files and
+loaded without any text geometry parsing. Readers ask for the `.csv` or
+`.parquet` path (e.g. rail_edges_named.csv) and transparently get the Parquet
+sibling unless the CSV is newer (e.g. re-exported after the Parquet file was
+written); legacy CSV files are still accepted and their WKT is parsed in one
+vectorized shapely call.
+
+Geometries are returned as a column of shapely 2 objects, so readers do not
+need geopandas.
+
+Used by:
+    - extract_nodes_and_edges.py
+    - write_sumo_nodes.py
+    - write_sumo_edges.py
+    - edge_snapper.py
+    - stop_node_matcher.py
+    - diagnostics/visualize_routes.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import logging
+import pandas as pd
+import shapely
+
+GEOMETRY_COLUMN = "geometry"
+PARQUET_COMPRESSION = "zstd"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Paths
+# ─────────────────────────────────────────────────────────────────────────────
+
+def parquet_path_for(path):
+    return os.path.splitext(path)[0] + ".parquet"
+
+def csv_path_for(path):
+    return os.path.splitext(path)[0] + ".csv"
+
+def resolve_geo_table(path):
+    """
+    Returns the GeoParquet sibling of `path` if present and not older than the
+    CSV sibling; otherwise the CSV (or `path` itself if neither exists).
+    """
+    parquet_path, csv_path = parquet_path_for(path), csv_path_for(path)
+    if not os.path.exists(parquet_path):
+        return csv_path if os.path.exists(csv_path) else path
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(parquet_path):
+        return csv_path
+    return parquet_path
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reader / writer
+# ─────────────────────────────────────────────────────────────────────────────
+
+def read_geo_table(path, columns=None, geometry_column=GEOMETRY_COLUMN):
+    """
+    Loads a node/edge table with its geometry column as shapely objects.
+
+    Args:
+        path (str): .parquet or .csv path (resolved with resolve_geo_table).
+        columns (list): Columns to load (None = all). Parquet reads only these.
+    """
+    path = resolve_geo_table(path)
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns)
+        if geometry_column in df.columns:
+            df[geometry_column] = shapely.from_wkb(df[geometry_column].to_numpy())
+    else:
+        df = pd.read_csv(path, usecols=columns)
+        if geometry_column in df.columns:
+            wkt = df[geometry_column].astype(object).where(df[geometry_column].notna(), None)
+            df[geometry_column] = shapely.from_wkt(wkt.to_numpy(), on_invalid="raise")
+
+    logging.info(f"✅ Loaded {len(df):,} rows from {path}")
+    return df
+
+def write_geo_table(gdf, path):
+    """Writes a GeoDataFrame as GeoParquet (WKB geometry, CRS in the metadata)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    gdf.to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
@@ -0,0 +1,234 @@
+"""
+gtfs_feed.py
+
+Columnar GTFS ingestion and vectorized helpers for the GTFS feed.
+
+Ingestion converts every table of the feed once into typed Parquet under
+`<gtfs_dir>/parquet/`. For stop_times.txt:
+    - rows are sorted by (trip_id, stop_sequence)
+    - trip_id / stop_id are dictionary (categorical) encoded
+    - stop_id_clean holds the platform-free stop ID ('8503054:0:1' -> '8503054')
+    - arrival_time / departure_time are integer seconds (may exceed 24h)
+
+read_gtfs_table() / load_stop_times() read from that cache with column
+projection and pyarrow predicate pushdown, converting on first use or when
+the .txt file is newer than its Parquet copy.
+
+Stop sequences are returned as NumPy offsets + values (stop codes into a
+table of cleaned stop IDs) instead of a dict of Python lists.
+
+Run directly to (re)build the cache:
+    python scripts/gtfs_feed.py
+
+Used by:
+    - parse_gtfs_to_route_edge_map.py
+    - preprocessing/stop_times_condenser.py
+    - preprocessing/root_condenser.py
+    - preprocessing/match_route_stops_with_haltestelle.py
+    - diagnostics/dupli_nodes.py
+    - diagnostics/quick_check_stop_coverage.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import glob
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────────────────────────────────────
+GTFS_DIR = "data/Swiss/raw/gtfs"
+PARQUET_SUBDIR = "parquet"
+ROW_GROUP_SIZE = 1_000_000
+
+STOP_TIMES_COLUMNS = ["trip_id", "stop_id", "stop_sequence"]
+TIME_COLUMNS = ["arrival_time", "departure_time"]
+CATEGORICAL_COLUMNS = ["trip_id", "stop_id", "stop_id_clean"]
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stop ID cleaning
+# ─────────────────────────────────────────────────────────────────────────────
+
+def clean_stop_id_codes(stop_ids):
+    """
+    Strips platform suffixes from a column of raw stop IDs.
+
+    Returns:
+        codes (np.ndarray[int32]): per-row index into `uniques`
+        uniques (np.ndarray[object]): cleaned stop IDs
+    """
+    raw_codes, raw_uniques = pd.factorize(pd.Series(stop_ids).astype(str))
+    cleaned = pd.Index(raw_uniques).str.split(":").str[0]
+    clean_codes, uniques = pd.factorize(cleaned)
+    return clean_codes[raw_codes].astype(np.int32), np.asarray(uniques, dtype=object)
+
+def gtfs_time_to_seconds(values):
+    """Converts 'HH:MM:SS' strings (hours may exceed 24) to nullable Int32 seconds."""
+    codes, uniques = pd.factorize(pd.Series(values))
+    seconds = np.zeros(len(uniques), dtype=np.int32)
+    if len(uniques):
+        parts = pd.Series(uniques).astype(str).str.strip().str.split(":", expand=True).astype(np.int32)
+        seconds = (parts[0] * 3600 + parts[1] * 60 + parts[2]).to_numpy(dtype=np.int32)
+
+    result = pd.array(seconds[codes] if len(uniques) else np.zeros(len(codes), dtype=np.int32), dtype="Int32")
+    result[codes < 0] = pd.NA
+    return result
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Parquet ingestion
+# ─────────────────────────────────────────────────────────────────────────────
+
+def parquet_dir_for(gtfs_dir):
+    return os.path.join(gtfs_dir, PARQUET_SUBDIR)
+
+def _is_stale(txt_path, parquet_path):
+    return not os.path.exists(parquet_path) or os.path.getmtime(parquet_path) < os.path.getmtime(txt_path)
+
+def _convert_stop_times(txt_path, parquet_path):
+    df = pd.read_csv(txt_path, dtype={"trip_id": str, "stop_id": str, **{c: str for c in TIME_COLUMNS}})
+
+    codes, uniques = clean_stop_id_codes(df["stop_id"].to_numpy())
+    df["stop_id_clean"] = pd.Categorical.from_codes(codes, categories=uniques)
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            df[col] = gtfs_time_to_seconds(df[col])
+    df["stop_sequence"] = df["stop_sequence"].astype(np.int32)
+
+    # Sorted rows keep each trip in few row groups, so trip filters prune well
+    df = df.sort_values(["trip_id", "stop_sequence"], kind="stable", ignore_index=True)
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+
+    df.to_parquet(parquet_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    return len(df)
+
+def _convert_generic(txt_path, parquet_path):
+    # Keep every *_id column as text so IDs like '8503000' are never turned into numbers
+    header = pd.read_csv(txt_path, nrows=0).columns
+    df = pd.read_csv(txt_path, dtype={c: str for c in header if c.endswith("_id")}, low_memory=False)
+    df.to_parquet(parquet_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    return len(df)
+
+def convert_table(gtfs_dir, table, parquet_dir=None, force=False):
+    """Converts <gtfs_dir>/<table>.txt to Parquet if missing or stale. Returns the Parquet path."""
+    parquet_dir = parquet_dir or parquet_dir_for(gtfs_dir)
+    txt_path = os.path.join(gtfs_dir, f"{table}.txt")
+    parquet_path = os.path.join(parquet_dir, f"{table}.parquet")
+
+    if not force and not _is_stale(txt_path, parquet_path):
+        return parquet_path
+
+    logging.info(f"🧱 Converting {txt_path} → {parquet_path}...")
+    start = time.time()
+    os.makedirs(parquet_dir, exist_ok=True)
+    tmp_path = parquet_path + ".tmp"
+    convert = _convert_stop_times if table == "stop_times" else _convert_generic
+    n_rows = convert(txt_path, tmp_path)
+    os.replace(tmp_path, parquet_path)
+    logging.info(f"💾 Wrote {n_rows:,} rows of '{table}' in {time.time() - start:.1f} seconds.")
+    return parquet_path
+
+def convert_feed_to_parquet(gtfs_dir, parquet_dir=None, force=False):
+    """Converts every .txt table of the feed."""
+    for txt_path in sorted(glob.glob(os.path.join(gtfs_dir, "*.txt"))):
+        table = os.path.splitext(os.path.basename(txt_path))[0]
+        convert_table(gtfs_dir, table, parquet_dir, force)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Loaders
+# ─────────────────────────────────────────────────────────────────────────────
+
+def read_gtfs_table(gtfs_dir, table, columns=None, filters=None, parquet_dir=None):
+    """
+    Reads one GTFS table from the Parquet cache.
+
+    Args:
+        gtfs_dir (str): Folder holding the GTFS .txt files.
+        table (str): Table name without extension, e.g. "stop_times".
+        columns (list): Columns to load (None = all).
+        filters (list): pyarrow filters pushed down to the reader,
+            e.g. [("trip_id", "in", trip_ids)].
+        parquet_dir (str): Cache folder (default: <gtfs_dir>/parquet).
+    """
+    parquet_path = convert_table(gtfs_dir, table, parquet_dir)
+    df = pd.read_parquet(parquet_path, columns=columns, filters=filters)
+    logging.info(f"✅ Loaded {len(df):,} rows × {len(df.columns)} columns of '{table}' from Parquet.")
+    return df
+
+def load_stop_times(gtfs_dir=GTFS_DIR, columns=None, filters=None, parquet_dir=None):
+    return read_gtfs_table(gtfs_dir, "stop_times", columns, filters, parquet_dir)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stop sequences
+# ─────────────────────────────────────────────────────────────────────────────
+
+class StopSequences:
+    """
+    Ordered stop IDs per trip in offsets + values form.
+
+    The stops of trip `i` are `stop_ids[stop_codes[offsets[i]:offsets[i + 1]]]`.
+    Iteration and items() mirror the old `{trip_id: [stop_id, ...]}` dict.
+    """
+
+    def __init__(self, trip_ids, offsets, stop_codes, stop_ids):
+        self.trip_ids = trip_ids
+        self.offsets = offsets
+        self.stop_codes = stop_codes
+        self.stop_ids = stop_ids
+
+    def __len__(self):
+        return len(self.trip_ids)
+
+    def __iter__(self):
+        return iter(self.trip_ids)
+
+    def keys(self):
+        return iter(self.trip_ids)
+
+    def codes(self, i):
+        return self.stop_codes[self.offsets[i]:self.offsets[i + 1]]
+
+    def stops(self, i):
+        return self.stop_ids[self.codes(i)].tolist()
+
+    def items(self):
+        for i, trip_id in enumerate(self.trip_ids):
+            yield trip_id, self.stops(i)
+
+def stop_sequences_from_frame(df, stop_column="stop_id"):
+    """
+    Builds StopSequences from a stop_times frame (trip_id, <stop_column>, stop_sequence).
+
+    One global sort by (trip_id, stop_sequence) replaces the per-trip sort;
+    trip boundaries come from the change points of the sorted trip codes.
+    Trips are returned in sorted trip_id order, as groupby would.
+    """
+    trip_codes, trip_uniques = pd.factorize(df["trip_id"], sort=True)
+    stop_codes, stop_ids = clean_stop_id_codes(df[stop_column].to_numpy())
+    sequence = df["stop_sequence"].to_numpy()
+
+    order = np.lexsort((sequence, trip_codes))
+    trip_codes = trip_codes[order]
+
+    starts = np.flatnonzero(np.r_[True, trip_codes[1:] != trip_codes[:-1]]) if len(order) else np.array([], dtype=np.int64)
+    offsets = np.append(starts, len(order)).astype(np.int64)
+
+    return StopSequences(
+        trip_ids=np.asarray(trip_uniques, dtype=object)[trip_codes[starts]],
+        offsets=offsets,
+        stop_codes=stop_codes[order],
+        stop_ids=stop_ids,
+    )
+
+# ─────────────────────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    convert_feed_to_parquet(GTFS_DIR, force=True)
@@ -0,0 +1,187 @@
+"""
+net_snapshot.py
+
+Binary snapshot cache for compiled SUMO .net.xml files.
+The first load streams the network through sumo_net_reader and writes its
+junctions, edges, lane lengths and shapes as plain .npy arrays into a
+`<net_file>.snapshot/` directory next to the net file. Later loads memory-map
+those arrays instead of re-parsing the XML.
+
+A snapshot is reused while the net file's size and mtime match its manifest;
+if only the mtime changed, the SHA-1 content hash decides.
+
+Used by:
+    - parse_gtfs_to_route_edge_map.py
+    - summarize_network_contents.py
+    - diagnostics/validate_stop_node_ids.py
+    - generate_train_stops.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import numpy as np
+
+from file_hash import file_sha1
+from sumo_net_reader import iter_net, NetJunction
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+ARRAY_NAMES = [
+    "junction_id", "junction_type", "junction_x", "junction_y",
+    "edge_id", "edge_from", "edge_to", "edge_function", "edge_length",
+    "edge_shape_offsets", "edge_shape_xy",
+]
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Snapshot container
+# ─────────────────────────────────────────────────────────────────────────────
+
+class NetSnapshot:
+    """
+    Column arrays of one .net.xml (internal elements included).
+
+    Missing string attributes are stored as "". Edge shapes are flattened:
+    the vertices of edge `i` are `edge_shape_xy[edge_shape_offsets[i]:edge_shape_offsets[i + 1]]`.
+    """
+
+    def __init__(self, arrays):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+
+    def junction_mask(self, include_internal=False):
+        if include_internal:
+            return np.ones(len(self.junction_id), dtype=bool)
+        return self.junction_type != "internal"
+
+    def edge_mask(self, include_internal=False):
+        if include_internal:
+            return np.ones(len(self.edge_id), dtype=bool)
+        return self.edge_function != "internal"
+
+    def edge_shape(self, i):
+        return self.edge_shape_xy[self.edge_shape_offsets[i]:self.edge_shape_offsets[i + 1]]
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def snapshot_dir_for(net_file):
+    return f"{net_file}.snapshot"
+
+def _parse_shape(shape):
+    """Parses a SUMO shape string ('x,y x,y' or 'x,y,z ...') into (x, y) pairs."""
+    if not shape:
+        return []
+    return [tuple(map(float, point.split(",")[:2])) for point in shape.split()]
+
+def _read_manifest(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(snapshot_dir, manifest):
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def _is_current(net_file, snapshot_dir, manifest):
+    if not manifest or manifest.get("version") != SNAPSHOT_VERSION:
+        return False
+
+    stat = os.stat(net_file)
+    if manifest["size"] != stat.st_size:
+        return False
+    if manifest["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    # Touched but possibly unchanged: fall back to the content hash
+    if manifest["sha1"] == file_sha1(net_file):
+        manifest["mtime_ns"] = stat.st_mtime_ns
+        _write_manifest(snapshot_dir, manifest)
+        return True
+    return False
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Build / load
+# ─────────────────────────────────────────────────────────────────────────────
+
+def build_net_snapshot(net_file, snapshot_dir=None):
+    """Parses net_file once and writes its snapshot arrays. Returns the snapshot directory."""
+    snapshot_dir = snapshot_dir or snapshot_dir_for(net_file)
+    logging.info(f"🧱 Building binary snapshot of {net_file}...")
+    start = time.time()
+
+    junctions, edges = [], []
+    for record in iter_net(net_file, include_internal=True):
+        (junctions if isinstance(record, NetJunction) else edges).append(record)
+
+    shape_offsets = np.zeros(len(edges) + 1, dtype=np.int64)
+    shape_xy = []
+    for i, edge in enumerate(edges):
+        points = _parse_shape(edge.shape)
+        shape_xy.extend(points)
+        shape_offsets[i + 1] = shape_offsets[i] + len(points)
+
+    arrays = {
+        "junction_id": np.array([j.id for j in junctions], dtype=str),
+        "junction_type": np.array([j.type or "" for j in junctions], dtype=str),
+        "junction_x": np.array([j.x for j in junctions], dtype=np.float64),
+        "junction_y": np.array([j.y for j in junctions], dtype=np.float64),
+        "edge_id": np.array([e.id for e in edges], dtype=str),
+        "edge_from": np.array([e.from_node or "" for e in edges], dtype=str),
+        "edge_to": np.array([e.to_node or "" for e in edges], dtype=str),
+        "edge_function": np.array([e.function or "" for e in edges], dtype=str),
+        "edge_length": np.array([e.length for e in edges], dtype=np.float64),
+        "edge_shape_offsets": shape_offsets,
+        "edge_shape_xy": np.array(shape_xy, dtype=np.float64).reshape(-1, 2),
+    }
+
+    # Write into a temporary directory and swap it in, so readers never see a partial snapshot
+    tmp_dir = f"{snapshot_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+
+    stat = os.stat(net_file)
+    _write_manifest(tmp_dir, {
+        "version": SNAPSHOT_VERSION,
+        "net_file": os.path.abspath(net_file),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": file_sha1(net_file),
+        "junctions": len(junctions),
+        "edges": len(edges),
+    })
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+    logging.info(
+        f"💾 Snapshot with {len(junctions):,} junctions and {len(edges):,} edges "
+        f"written to {snapshot_dir} in {time.time() - start:.1f} seconds."
+    )
+    return snapshot_dir
+
+def load_net_snapshot(net_file, rebuild=False):
+    """
+    Returns a NetSnapshot for net_file, building it first if missing or stale.
+    Arrays are memory-mapped read-only.
+    """
+    snapshot_dir = snapshot_dir_for(net_file)
+    if rebuild or not _is_current(net_file, snapshot_dir, _read_manifest(snapshot_dir)):
+        build_net_snapshot(net_file, snapshot_dir)
+
+    arrays = {
+        name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r")
+        for name in ARRAY_NAMES
+    }
+    logging.info(f"⚡ Memory-mapped network snapshot from {snapshot_dir}")
+    return NetSnapshot(arrays)
@@ -0,0 +1,168 @@
+"""
+netconvert_build.py
+
+Incremental netconvert runs.
+The SHA-1 of every input file (.nod.xml, .edg.xml, .con.xml, ...) and the
+full netconvert command line are combined into a fingerprint and stored in a
+manifest next to the output (`<output>.build.json`). When the fingerprint
+still matches and the output file is the one recorded in the manifest, the
+build is skipped.
+
+Every real build appends its wall time and peak RSS to the manifest's build
+history. Peak RSS is the resource usage of this netconvert process, collected
+with os.wait4 when it is reaped (POSIX only; elsewhere it is recorded as null).
+
+Used by:
+    - generate_net_with_netconvert.py
+    - simple_network_creators/generate_sumo_network.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import subprocess
+from collections import namedtuple
+
+from file_hash import file_sha1
+
+MANIFEST_VERSION = 1
+MAX_BUILD_HISTORY = 20
+
+NetconvertResult = namedtuple("NetconvertResult", ["skipped", "returncode", "wall_time", "peak_rss_mb", "stdout", "stderr"])
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Manifest
+# ─────────────────────────────────────────────────────────────────────────────
+
+def manifest_path_for(output_file):
+    return f"{output_file}.build.json"
+
+def _read_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def build_fingerprint(cmd, input_hashes):
+    digest = hashlib.sha1()
+    digest.update(json.dumps(cmd).encode("utf-8"))
+    for path in sorted(input_hashes):
+        digest.update(f"{path}\0{input_hashes[path]}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+def _output_state(output_file):
+    stat = os.stat(output_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def is_up_to_date(output_file, fingerprint, manifest):
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return False
+    if manifest.get("fingerprint") != fingerprint or not os.path.exists(output_file):
+        return False
+    return manifest.get("output") == _output_state(output_file)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Measured child process
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _run_measured(cmd, capture_output=False):
+    """
+    Runs cmd and returns (returncode, peak_rss_mb, stdout, stderr).
+    The peak RSS is that of this child alone: it is reaped with os.wait4,
+    which reports its own rusage. Captured output goes through temporary
+    files, so the child can be waited on without draining pipes.
+    """
+    if not hasattr(os, "wait4"):  # Windows
+        completed = subprocess.run(cmd, capture_output=capture_output, text=capture_output)
+        return completed.returncode, None, completed.stdout, completed.stderr
+
+    with tempfile.TemporaryFile("w+") as out, tempfile.TemporaryFile("w+") as err:
+        process = subprocess.Popen(cmd, stdout=out if capture_output else None, stderr=err if capture_output else None)
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stdout = stderr = None
+        if capture_output:
+            out.seek(0)
+            err.seek(0)
+            stdout, stderr = out.read(), err.read()
+
+    # Linux reports KiB, macOS bytes
+    peak = usage.ru_maxrss
+    peak_rss_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return process.returncode, peak_rss_mb, stdout, stderr
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Build
+# ─────────────────────────────────────────────────────────────────────────────
+
+def run_netconvert(inputs, output_file, options=(), binary="netconvert", force=False, capture_output=False):
+    """
+    Runs netconvert unless the inputs and options are unchanged since the last build.
+
+    Args:
+        inputs (dict): netconvert input option → file, e.g. {"node-files": "a.nod.xml"}.
+        output_file (str): The .net.xml to produce.
+        options (list): Additional command-line options, e.g. ["--no-turnarounds"].
+        force (bool): Rebuild even if the manifest says the output is current.
+        capture_output (bool): Capture stdout/stderr instead of streaming them.
+
+    Returns:
+        NetconvertResult
+
+    Raises:
+        subprocess.CalledProcessError: if netconvert fails (no manifest is written).
+    """
+    cmd = [binary] + [f"--{option}={path}" for option, path in inputs.items()]
+    cmd += [f"--output-file={output_file}"] + list(options)
+
+    input_hashes = {os.path.abspath(path): file_sha1(path) for path in inputs.values()}
+    fingerprint = build_fingerprint(cmd, input_hashes)
+    manifest_path = manifest_path_for(output_file)
+    manifest = _read_manifest(manifest_path)
+
+    if not force and is_up_to_date(output_file, fingerprint, manifest):
+        logging.info(f"⏭️ {output_file} is up to date (inputs and options unchanged) — skipping netconvert.")
+        return NetconvertResult(True, 0, 0.0, None, None, None)
+
+    logging.info("🔧 Executing netconvert command:")
+    logging.info(" ".join(cmd))
+    start = time.perf_counter()
+    returncode, peak_rss_mb, stdout, stderr = _run_measured(cmd, capture_output)
+    wall_time = time.perf_counter() - start
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stdout, stderr)
+
+    rss_text = f"{peak_rss_mb:,.0f} MB" if peak_rss_mb is not None else "n/a"
+    logging.info(f"⏱️ netconvert finished in {wall_time:.1f}s (peak RSS {rss_text})")
+
+    history = (manifest or {}).get("builds", [])
+    history.append({
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "wall_time_s": round(wall_time, 2),
+        "peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb is not None else None,
+    })
+    if os.path.exists(output_file):
+        _write_manifest(manifest_path, {
+            "version": MANIFEST_VERSION,
+            "fingerprint": fingerprint,
+            "command": cmd,
+            "inputs": input_hashes,
+            "output": _output_state(output_file),
+            "builds": history[-MAX_BUILD_HISTORY:],
+        })
+
+    return NetconvertResult(False, returncode, wall_time, peak_rss_mb, stdout, stderr)
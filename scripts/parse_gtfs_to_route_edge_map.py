@@ -2,21 +2,35 @@
 parse_gtfs_to_route_edge_map.py
 
 Parses GTFS stop_times and maps each trip_id to an ordered sequence of SUMO edge IDs,
-based on shortest paths between matched SUMO nodes.
+based on shortest paths between matched SUMO nodes. Paths minimize the total
+lane length by default (--weight hops restores fewest-edges routing). For
+repeated runs on the same network, --ch answers them on a precomputed
+contraction hierarchy, and --contract-chains routes on a graph whose degree-2
+track chains are collapsed into super-edges (expanded back before writing).
 
-Outputs `route_edge_map.csv` for later use in .rou.xml generation.
+Trips sharing the same stop-node sequence are collapsed into one stop pattern,
+routed once, and fanned back out to their trip IDs.
+
+Outputs `route_edge_map.csv` (trip_id, pattern_id, edge_sequence) for later use
+in .rou.xml generation; writers can emit one shared <route> per pattern_id.
 
 Author: Onur Deniz
 Date: 2025-05
 """
 
-import os
 import csv
+import argparse
+import hashlib
 import logging
-import xml.etree.ElementTree as ET
-import networkx as nx
 import pandas as pd
 
+from routing_graph import RoutingGraph, NoPathError, WEIGHTS
+from path_cache import PathCache, cache_file_for, network_signature
+from net_snapshot import load_net_snapshot
+from contraction_hierarchy import load_contraction_hierarchy
+from chain_contraction import contract_degree2_chains
+from gtfs_feed import load_stop_times, stop_sequences_from_frame
+
 # ────────────────────────────────────────────────────────────────────────────────
 # CONFIG
 # ────────────────────────────────────────────────────────────────────────────────
@@ -25,6 +39,7 @@ GTFS_DIR = "data/Swiss/raw/gtfs"
 SUMO_NET_FILE = "SUMO/input/april_2025_swiss.net.xml"
 NODE_MAPPING_FILE = "data/Swiss/interim/stop_mappings/stop_id_to_node_id_refined.csv"
 OUTPUT_FILE = "data/Swiss/processed/routes/route_edge_map.csv"
+PATH_CACHE_FILE = "data/Swiss/interim/cache/stop_pair_paths.pkl"  # one file per weight/search mode; None = in-memory only
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,22 +51,16 @@ logging.basicConfig(
 # LOAD SUMO NETWORK
 # ────────────────────────────────────────────────────────────────────────────────
 
-def load_sumo_network(net_file):
-    logging.info("🔁 Loading SUMO network into directed graph...")
-    tree = ET.parse(net_file)
-    root = tree.getroot()
-
-    G = nx.DiGraph()
-    for edge in root.findall("edge"):
-        if edge.get("function") == "internal":
-            continue
-        from_node = edge.get("from")
-        to_node = edge.get("to")
-        edge_id = edge.get("id")
-        G.add_edge(from_node, to_node, id=edge_id)
-
-    logging.info(f"✅ Loaded SUMO network with {G.number_of_nodes():,} nodes and {G.number_of_edges():,} edges.")
-    sample_nodes = list(G.nodes)[:5]
+def load_sumo_network(net_file, weight="length", use_astar=False):
+    logging.info(f"🔁 Loading SUMO network into CSR routing graph (weight: {weight})...")
+    net = load_net_snapshot(net_file)
+    G = RoutingGraph.from_net_snapshot(net, weight=weight, with_coordinates=use_astar)
+
+    if use_astar and weight == "length" and not G.uses_astar():
+        logging.warning("⚠️ A* unavailable (missing junction coordinates or weak heuristic), routing with Dijkstra instead.")
+    search = "A*" if G.uses_astar() else ("BFS" if weight == "hops" else "Dijkstra")
+    logging.info(f"✅ Loaded SUMO network with {G.number_of_nodes():,} nodes and {G.number_of_edges():,} edges ({search}).")
+    sample_nodes = G.node_ids[:5]
     logging.info(f"🧪 Sample node IDs in SUMO graph: {sample_nodes}")
     return G
 
@@ -61,16 +70,9 @@ def load_sumo_network(net_file):
 
 def load_stop_sequences(gtfs_dir):
     logging.info("📅 Parsing GTFS stop_times.txt...")
-    df = pd.read_csv(os.path.join(gtfs_dir, "stop_times.txt"))
+    df = load_stop_times(gtfs_dir, columns=["trip_id", "stop_id_clean", "stop_sequence"])
 
-    trip_to_stops = {}
-    for trip_id, group in df.groupby("trip_id"):
-        ordered_stops = (
-            group.sort_values("stop_sequence")["stop_id"]
-            .apply(lambda s: str(s).split(":")[0])  # strip suffix
-            .tolist()
-        )
-        trip_to_stops[trip_id] = ordered_stops
+    trip_to_stops = stop_sequences_from_frame(df, stop_column="stop_id_clean")
 
     logging.info(f"✅ Found {len(trip_to_stops):,} unique trips in GTFS.")
     return trip_to_stops
@@ -87,51 +89,98 @@ def load_stop_node_mapping(mapping_file):
 # MAP TRIPS TO EDGE SEQUENCES
 # ────────────────────────────────────────────────────────────────────────────────
 
-def map_trips_to_edges(trip_to_stops, stop_node_map, sumo_graph):
-    logging.info("🔧 Mapping trips to edge sequences...")
-    trip_to_edges = {}
-    total_trips = len(trip_to_stops)
-    failed_trips = 0
-    mapped_trips = 0
+def pattern_id_for(node_sequence):
+    digest = hashlib.sha1("\x1f".join(node_sequence).encode("utf-8")).hexdigest()
+    return f"p_{digest[:12]}"
+
+def build_stop_patterns(trip_to_stops, stop_node_map):
+    """
+    Collapses trips into unique stop-node patterns.
+
+    Returns:
+        pattern_nodes (dict): pattern_id → ordered tuple of SUMO node IDs
+        trip_to_pattern (dict): trip_id → pattern_id (trips with < 2 distinct nodes are left out)
+    """
+    pattern_nodes = {}
+    trip_to_pattern = {}
+    stops_to_pattern = {}  # identical stop lists are mapped and hashed only once
 
     for trip_id, stops in trip_to_stops.items():
-        try:
-            node_sequence = [stop_node_map[s] for s in stops if s in stop_node_map]
+        stops = tuple(stops)
+        if stops not in stops_to_pattern:
+            node_sequence = tuple(stop_node_map[s] for s in stops if s in stop_node_map)
             if len(set(node_sequence)) < 2:
-                failed_trips += 1
-                continue
-
-            full_edge_list = []
-            success = True
-
-            for i in range(len(node_sequence) - 1):
-                try:
-                    path = nx.shortest_path(sumo_graph, source=node_sequence[i], target=node_sequence[i + 1])
-                    for u, v in zip(path[:-1], path[1:]):
-                        edge_data = sumo_graph.get_edge_data(u, v)
-                        if edge_data:
-                            full_edge_list.append(edge_data['id'])
-                except nx.NetworkXNoPath:
-                    logging.debug(f"❌ Trip {trip_id}: No path between {node_sequence[i]} and {node_sequence[i + 1]}")
-                    success = False
-                    break
-
-            if success and full_edge_list:
-                trip_to_edges[trip_id] = full_edge_list
-                mapped_trips += 1
+                stops_to_pattern[stops] = None
             else:
-                failed_trips += 1
+                pattern_id = pattern_id_for(node_sequence)
+                pattern_nodes.setdefault(pattern_id, node_sequence)
+                stops_to_pattern[stops] = pattern_id
+
+        if stops_to_pattern[stops] is not None:
+            trip_to_pattern[trip_id] = stops_to_pattern[stops]
+
+    return pattern_nodes, trip_to_pattern
 
+def route_pattern(pattern_id, node_sequence, sumo_graph, path_cache):
+    full_edge_list = []
+    for i in range(len(node_sequence) - 1):
+        try:
+            full_edge_list.extend(
+                path_cache.shortest_path_edges(sumo_graph, node_sequence[i], node_sequence[i + 1])
+            )
+        except NoPathError:
+            logging.debug(f"❌ Pattern {pattern_id}: No path between {node_sequence[i]} and {node_sequence[i + 1]}")
+            return None
+    return full_edge_list or None
+
+def map_trips_to_edges(trip_to_stops, stop_node_map, sumo_graph, path_cache=None, workers=1):
+    logging.info("🔧 Mapping trips to edge sequences...")
+    if path_cache is None:
+        path_cache = PathCache()
+    total_trips = len(trip_to_stops)
+
+    pattern_nodes, trip_to_pattern = build_stop_patterns(trip_to_stops, stop_node_map)
+    logging.info(f"🧩 Collapsed {len(trip_to_pattern):,} routable trips into {len(pattern_nodes):,} stop patterns.")
+
+    # Route every distinct consecutive stop pair up front, one traversal per source node
+    stop_pairs = {
+        (node_sequence[i], node_sequence[i + 1])
+        for node_sequence in pattern_nodes.values()
+        for i in range(len(node_sequence) - 1)
+    }
+    path_cache.prefetch(sumo_graph, stop_pairs, workers=workers)
+
+    pattern_to_edges = {}
+    for pattern_id, node_sequence in pattern_nodes.items():
+        try:
+            edge_list = route_pattern(pattern_id, node_sequence, sumo_graph, path_cache)
         except Exception as e:
-            logging.error(f"❌ Trip {trip_id}: Unexpected error: {e}")
-            failed_trips += 1
+            logging.error(f"❌ Pattern {pattern_id}: Unexpected error: {e}")
+            edge_list = None
+        if edge_list:
+            pattern_to_edges[pattern_id] = edge_list
+
+    # Fan pattern results back out to trips (in GTFS trip order)
+    trip_to_edges = {}
+    for trip_id in trip_to_stops:
+        pattern_id = trip_to_pattern.get(trip_id)
+        if pattern_id in pattern_to_edges:
+            trip_to_edges[trip_id] = (pattern_id, pattern_to_edges[pattern_id])
+
+    mapped_trips = len(trip_to_edges)
+    failed_trips = total_trips - mapped_trips
 
     # Summary
     logging.info("\n📋 Mapping Summary")
     logging.info(f"• Total GTFS trips:         {total_trips:,}")
+    logging.info(f"• Unique stop patterns:     {len(pattern_nodes):,}")
+    logging.info(f"• Patterns routed:          {len(pattern_to_edges):,}")
     logging.info(f"• Successfully mapped:      {mapped_trips:,}")
     logging.info(f"• Failed to map:            {failed_trips:,}")
-    logging.info(f"• Coverage rate:            {100 * mapped_trips / total_trips:.2f}%\n")
+    logging.info(f"• Coverage rate:            {100 * mapped_trips / total_trips:.2f}%")
+    logging.info(f"• Path cache hits:          {path_cache.hits:,}")
+    logging.info(f"• Path cache misses:        {path_cache.misses:,}")
+    logging.info(f"• Path cache hit rate:      {path_cache.hit_rate():.2f}%\n")
 
     return trip_to_edges
 
@@ -143,18 +192,63 @@ def write_route_edge_map(output_path, trip_to_edges):
     logging.info(f"📂 Writing route-edge mappings to {output_path}...")
     with open(output_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["trip_id", "edge_sequence"])
-        for trip_id, edge_list in trip_to_edges.items():
-            writer.writerow([trip_id, " ".join(edge_list)])
+        writer.writerow(["trip_id", "pattern_id", "edge_sequence"])
+        for trip_id, (pattern_id, edge_list) in trip_to_edges.items():
+            writer.writerow([trip_id, pattern_id, " ".join(edge_list)])
     logging.info("✅ route_edge_map.csv successfully written.")
 
 # ────────────────────────────────────────────────────────────────────────────────
 # MAIN
 # ────────────────────────────────────────────────────────────────────────────────
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Map GTFS trips to SUMO edge sequences.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes for stop-pair routing (default: 1 = serial)"
+    )
+    parser.add_argument(
+        "--weight", choices=WEIGHTS, default="length",
+        help="Minimize total lane length (default) or the number of edges"
+    )
+    parser.add_argument(
+        "--astar", action="store_true",
+        help="Try A* with a straight-line heuristic for length-weighted routing (default: scipy Dijkstra)"
+    )
+    speedup = parser.add_mutually_exclusive_group()
+    speedup.add_argument(
+        "--ch", action="store_true",
+        help="Route on the contraction hierarchy stored next to the net file (built on first use)"
+    )
+    speedup.add_argument(
+        "--contract-chains", action="store_true",
+        help="Route on a copy of the graph with degree-2 chains (except stop nodes) contracted"
+    )
+    args = parser.parse_args()
+    if args.ch and args.astar:
+        # CH queries never use junction coordinates
+        parser.error("argument --astar: not allowed with argument --ch")
+    return args
+
 if __name__ == "__main__":
-    sumo_graph = load_sumo_network(SUMO_NET_FILE)
+    args = parse_args()
+    if args.ch:
+        sumo_graph = load_contraction_hierarchy(SUMO_NET_FILE, weight=args.weight)
+        routing_mode = "ch"
+    else:
+        sumo_graph = load_sumo_network(SUMO_NET_FILE, weight=args.weight, use_astar=args.astar)
+        routing_mode = "astar" if sumo_graph.uses_astar() else "csgraph"
     trip_to_stops = load_stop_sequences(GTFS_DIR)
     stop_node_map = load_stop_node_mapping(NODE_MAPPING_FILE)
-    trip_to_edges = map_trips_to_edges(trip_to_stops, stop_node_map, sumo_graph)
+    if args.contract_chains:
+        # Stop nodes are route endpoints, so they must survive the contraction
+        sumo_graph = contract_degree2_chains(sumo_graph, keep=set(stop_node_map.values()))
+        routing_mode += "+chains"
+    # Paths depend on the weighting and, among equal-cost paths, on the search: each
+    # combination keeps its own cache file and records both in its signature
+    cache_file = cache_file_for(PATH_CACHE_FILE, args.weight, routing_mode) if PATH_CACHE_FILE else None
+    path_cache = PathCache.load(cache_file, network_signature(SUMO_NET_FILE) + (args.weight, routing_mode))
+    trip_to_edges = map_trips_to_edges(trip_to_stops, stop_node_map, sumo_graph, path_cache, workers=args.workers)
+    if cache_file:
+        path_cache.save(cache_file)
     write_route_edge_map(OUTPUT_FILE, trip_to_edges)
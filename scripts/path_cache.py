@@ -0,0 +1,195 @@
+"""
+path_cache.py
+
+Memoizes stop-pair shortest paths for trip-to-edge mapping.
+Results are keyed by (source_node, target_node) and hold the resolved SUMO
+edge-ID tuple (or None when no path exists). The cache can be persisted next
+to the other interim files so reruns after a GTFS refresh only route new pairs.
+Uncached pairs can be routed in bulk, optionally on a process pool.
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import math
+import time
+import pickle
+import logging
+import multiprocessing as mp
+from collections import defaultdict
+
+from routing_graph import NoPathError
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def network_signature(net_file):
+    """Identifies a network file version by its size and modification time."""
+    stat = os.stat(net_file)
+    return (os.path.abspath(net_file), stat.st_size, int(stat.st_mtime))
+
+def cache_file_for(cache_file, *variant):
+    """
+    Per-variant cache file name, e.g. stop_pair_paths.length-ch.pkl, so runs
+    with different weightings or searches keep separate caches side by side.
+    """
+    root, ext = os.path.splitext(cache_file)
+    return f"{root}.{'-'.join(str(part) for part in variant)}{ext}" if variant else cache_file
+
+def route_source_chunk(graph, tasks):
+    """Runs one-to-many routing for a list of (source, targets) tasks."""
+    return [(source, graph.shortest_paths_from(source, targets)) for source, targets in tasks]
+
+# ── Process-pool workers ─────────────────────────────────────────────────────
+
+_worker_graph = None
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+def _route_source_chunk_in_worker(tasks):
+    start = time.perf_counter()
+    results = route_source_chunk(_worker_graph, tasks)
+    n_pairs = sum(len(paths) for _, paths in results)
+    return os.getpid(), n_pairs, time.perf_counter() - start, results
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Path cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+class PathCache:
+    """Stop-pair path memo with hit/miss counters."""
+
+    def __init__(self, signature=None, paths=None):
+        self.signature = signature
+        self.paths = paths if paths is not None else {}
+        self.hits = 0
+        self.misses = 0
+        self._prefetched = set()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def shortest_path_edges(self, graph, source, target):
+        """
+        Returns the cached edge IDs for source → target, routing on a miss.
+
+        Raises NoPathError for unreachable pairs (also cached) and lets
+        KeyError for unknown node IDs propagate uncached.
+        """
+        key = (source, target)
+        if key in self._prefetched:
+            self._prefetched.discard(key)
+            self.misses += 1
+            path = self.paths[key]
+        elif key in self.paths:
+            self.hits += 1
+            path = self.paths[key]
+        else:
+            self.misses += 1
+            try:
+                path = tuple(graph.shortest_path_edges(source, target))
+            except NoPathError:
+                path = None
+            self.paths[key] = path
+
+        if path is None:
+            raise NoPathError(f"No path between {source} and {target}")
+        return path
+
+    def prefetch(self, graph, pairs, workers=1):
+        """
+        Routes all uncached (source, target) pairs with one traversal per source.
+
+        With workers > 1 the sources are sharded across a process pool. The
+        graph is handed to each worker once at start-up (inherited through
+        fork where available) rather than pickled per task, and results are
+        merged in sorted source order so the cache matches a serial run.
+
+        Pairs involving unknown nodes are skipped so that the later lookup
+        raises KeyError as usual. Prefetched pairs count as misses on their
+        first lookup.
+
+        Returns:
+            int: number of pairs routed
+        """
+        targets_by_source = defaultdict(set)
+        for source, target in pairs:
+            if (source, target) not in self.paths and source in graph and target in graph:
+                targets_by_source[source].add(target)
+        tasks = sorted((source, sorted(targets)) for source, targets in targets_by_source.items())
+
+        if workers > 1 and len(tasks) > 1:
+            chunk_results = self._route_parallel(graph, tasks, workers)
+        else:
+            chunk_results = [route_source_chunk(graph, tasks)]
+
+        routed = 0
+        for results in chunk_results:
+            for source, paths in results:
+                for target, path in paths.items():
+                    self.paths[(source, target)] = tuple(path) if path is not None else None
+                    self._prefetched.add((source, target))
+                    routed += 1
+
+        logging.info(f"🚀 Batched routing: {routed:,} new stop pairs from {len(tasks):,} source nodes.")
+        return routed
+
+    @staticmethod
+    def _route_parallel(graph, tasks, workers):
+        chunk_size = max(1, math.ceil(len(tasks) / (workers * 8)))
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        start_methods = mp.get_all_start_methods()
+        ctx = mp.get_context("fork") if "fork" in start_methods else mp.get_context()
+
+        logging.info(f"🧵 Routing {len(tasks):,} source nodes in {len(chunks):,} chunks on {workers} workers...")
+        worker_stats = defaultdict(lambda: [0, 0.0])
+        chunk_results = []
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(graph,)) as pool:
+            # imap keeps chunk order, so the merge is deterministic
+            for pid, n_pairs, elapsed, results in pool.imap(_route_source_chunk_in_worker, chunks):
+                worker_stats[pid][0] += n_pairs
+                worker_stats[pid][1] += elapsed
+                chunk_results.append(results)
+
+        for pid, (n_pairs, elapsed) in sorted(worker_stats.items()):
+            rate = n_pairs / elapsed if elapsed else 0.0
+            logging.info(f"👷 Worker {pid}: {n_pairs:,} pairs in {elapsed:.1f}s ({rate:,.0f} pairs/s)")
+        return chunk_results
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return 100 * self.hits / lookups if lookups else 0.0
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    @classmethod
+    def load(cls, cache_file, signature):
+        """Loads a cache file; starts empty if it is missing or built for another network."""
+        if not cache_file or not os.path.exists(cache_file):
+            return cls(signature)
+
+        try:
+            with open(cache_file, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"⚠️ Ignoring unreadable path cache {cache_file}: {e}")
+            return cls(signature)
+
+        if payload.get("signature") != signature:
+            logging.info(f"♻️ Path cache {cache_file} was built for another network version — starting fresh.")
+            return cls(signature)
+
+        logging.info(f"✅ Loaded {len(payload['paths']):,} cached stop-pair paths from {cache_file}")
+        return cls(signature, payload["paths"])
+
+    def save(self, cache_file):
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        tmp_file = cache_file + ".tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump({"signature": self.signature, "paths": self.paths}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+        logging.info(f"💾 Saved {len(self.paths):,} stop-pair paths → {cache_file}")
@@ -1,7 +1,11 @@
 import os
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table
+
 # -----------------------------------------------------------------------------
 # Logging configuration
 # -----------------------------------------------------------------------------
@@ -61,13 +65,14 @@ def main():
 
     # File paths
     base_path = "D:/PhD/prog_report_2025_June_project"
-    routes_path = os.path.join(base_path, "data/Swiss/interim/routes_with_metadata.csv")
+    routes_path = os.path.join(base_path, "data/Swiss/interim/routes_with_metadata.parquet")
     formation_path = os.path.join(base_path, "data/Swiss/raw/jahresformation.csv")
     mapping_path = os.path.join(base_path, "data/Swiss/raw/rollmaterial-matching.csv")
-    output_path = os.path.join(base_path, "data/Swiss/interim/routes_and_vehicles_with_metadata.csv")
+    output_path = os.path.join(base_path, "data/Swiss/interim/routes_and_vehicles_with_metadata.parquet")
 
     # Load data
-    routes_df = load_csv(routes_path)
+    routes_df = read_route_table(routes_path)
+    logging.info(f"✅ Loaded route table: {routes_path} with shape: {routes_df.shape}")
     formation_df = load_csv(formation_path)
     mapping_df = load_csv(mapping_path)
 
@@ -105,7 +110,7 @@ def main():
         })
 
     result_df = pd.DataFrame(enriched_rows)
-    result_df.to_csv(output_path, sep=';', index=False)
+    write_route_table(result_df, output_path)
 
     # Summary
     logging.info(f"📅 Routes enriched: {len(result_df)}")
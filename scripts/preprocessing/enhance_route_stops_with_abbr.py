@@ -1,8 +1,11 @@
 import os
-import ast
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table, map_route_stops
+
 # ------------------------------------------------------------------------------
 # Logging setup
 # ------------------------------------------------------------------------------
@@ -15,9 +18,9 @@ logging.basicConfig(
 # File paths (LOCAL ONLY)
 # ------------------------------------------------------------------------------
 BASE_PATH = r"D:\PhD\prog_report_2025_June_project"
-ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced.csv")
+ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced.parquet")
 HALTEKANTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "raw", "haltestelle-haltekante.csv")
-OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced_V2.csv")
+OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced_V2.parquet")
 
 # ------------------------------------------------------------------------------
 # Core processing function
@@ -37,7 +40,7 @@ def convert_stop_ids_to_abbr(route_file, haltekante_file, output_file):
     logging.info("🚀 Starting conversion of stop_ids to stop abbreviations...")
 
     try:
-        df = pd.read_csv(route_file, sep=';', encoding='utf-8')
+        df = read_route_table(route_file)
         logging.info(f"✅ Loaded route file: {route_file} with shape: {df.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load route file: {e}")
@@ -61,29 +64,12 @@ def convert_stop_ids_to_abbr(route_file, haltekante_file, output_file):
     if len(stop_map_dict) < 100:
         logging.warning("⚠️ Warning: stop map seems suspiciously small.")
 
-    enriched_stops = []
-    unmapped_count = 0
-    total_stops = 0
-
-    for stops_raw in df['stops']:
-        try:
-            stop_ids = ast.literal_eval(stops_raw)
-            abbrs = []
-            for sid in stop_ids:
-                total_stops += 1
-                abbr = stop_map_dict.get(str(sid).strip(), "UNK")
-                if abbr == "UNK":
-                    unmapped_count += 1
-                abbrs.append(abbr)
-            enriched_stops.append(abbrs)
-        except Exception:
-            enriched_stops.append(["UNK"])
-            unmapped_count += 1
-
+    # One lookup over the flat stop array instead of a loop per route
+    enriched_stops, unmapped_count, total_stops = map_route_stops(df, stop_map_dict, "UNK")
     df['stops'] = enriched_stops
 
     try:
-        df.to_csv(output_file, sep=';', index=False, encoding='utf-8')
+        write_route_table(df, output_file)
         logging.info(f"💾 Saved enriched file to: {output_file}")
     except Exception as e:
         logging.error(f"❌ Failed to save output: {e}")
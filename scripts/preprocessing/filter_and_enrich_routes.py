@@ -1,7 +1,15 @@
 import os
+import sys
 import logging
+import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import (
+    read_route_table, write_route_table, route_stop_arrays, stops_from_arrays,
+    filter_routes_by_stops, log_route_filter_report
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,48 +26,67 @@ def load_csv(filepath, sep=';', encoding='utf-8'):
         logging.error(f"❌ Failed to load file: {filepath}")
         raise e
 
-def clean_stop_id(raw_stop_id):
-    """Extract numeric part from a stop_id, e.g. '8503054:0:1' -> '8503054'."""
-    return str(raw_stop_id).split(':')[0]
+def clean_stop_ids(routes_df):
+    """Strips platform suffixes from every stop of every route, e.g. '8503054:0:1' -> '8503054'."""
+    offsets, values = route_stop_arrays(routes_df)
+    cleaned = pd.Series(values, dtype=object).str.split(':').str[0].to_numpy(dtype=object)
+    return stops_from_arrays(offsets, cleaned)
+
+def build_stop_name_index(stops_df):
+    """
+    Hash index stop_id → logical_stop_name, built once.
+
+    IDs are compared numerically ('08503054' and 8503054 are the same stop).
+    The first row per stop_id wins, like the previous `.values[0]` lookup.
+    """
+    ids = pd.to_numeric(stops_df['stop_id'], errors='coerce').astype(np.float64)
+    index = pd.Series(stops_df['logical_stop_name'].to_numpy(), index=ids)
+    return index[index.index.notna() & ~index.index.duplicated(keep='first')]
+
+def attach_trip_names(routes_df, name_index):
+    """
+    Adds trip_name = '<origin name>-<destination name>' from the first and last stop.
+
+    Both endpoints of every route are resolved with one vectorized index lookup.
+    Routes that are empty or whose endpoints are missing from the index are dropped.
+    """
+    stops = routes_df['stops']
+    nonempty = stops.map(len).to_numpy() > 0
+    first_ids = pd.to_numeric(stops[nonempty].map(lambda route: route[0]), errors='coerce')
+    last_ids = pd.to_numeric(stops[nonempty].map(lambda route: route[-1]), errors='coerce')
+
+    origin_pos = name_index.index.get_indexer(first_ids.astype(np.float64))
+    dest_pos = name_index.index.get_indexer(last_ids.astype(np.float64))
+    named = (origin_pos >= 0) & (dest_pos >= 0)
+
+    names = name_index.to_numpy(dtype=object)
+    trip_names = pd.Series(names[origin_pos[named]], dtype=str) + "-" + pd.Series(names[dest_pos[named]], dtype=str)
+
+    keep = np.flatnonzero(nonempty)[named]
+    result_df = routes_df.iloc[keep].reset_index(drop=True)
+    result_df.insert(list(result_df.columns).index('stops'), 'trip_name', trip_names.to_numpy(dtype=object))
+    return result_df
 
 def enrich_and_filter_routes(routes_df, valid_stop_ids, stops_df, output_path):
     """
     Filter routes that contain only valid stop_ids and enrich with trip names.
     
     Args:
-        routes_df (pd.DataFrame): DataFrame with trip_id and stops (list of stop_ids).
+        routes_df (pd.DataFrame): Route table with trip_id and stops (array of stop_ids).
         valid_stop_ids (set): Set of stop_ids available in the SUMO network.
         stops_df (pd.DataFrame): Reference for mapping stop_id to logical names.
-        output_path (str): Where to save the final enriched CSV.
+        output_path (str): Where to save the final enriched route table (Parquet).
 
     Returns:
         None
     """
-    enriched_data = []
-
-    for _, row in routes_df.iterrows():
-        trip_id = row['trip_id']
-        stop_sequence = row['stops']
-        stop_sequence_clean = [clean_stop_id(sid) for sid in eval(stop_sequence)]  # eval used safely here
-
-        # Filter out routes with any unknown stops
-        if not set(stop_sequence_clean).issubset(valid_stop_ids):
-            continue
-
-        origin_id = stop_sequence_clean[0]
-        dest_id = stop_sequence_clean[-1]
-
-        try:
-            origin_name = stops_df.loc[stops_df['stop_id'] == int(origin_id), 'logical_stop_name'].values[0]
-            dest_name = stops_df.loc[stops_df['stop_id'] == int(dest_id), 'logical_stop_name'].values[0]
-        except IndexError:
-            continue  # Skip if either ID is not found in the mapping
-
-        trip_name = f"{origin_name}-{dest_name}"
-        enriched_data.append({'trip_id': trip_id, 'trip_name': trip_name, 'stops': stop_sequence_clean})
+    # Filter out routes with any unknown stops (one vectorized pass over all stops)
+    routes_df = routes_df.assign(stops=clean_stop_ids(routes_df))
+    routes_df, report = filter_routes_by_stops(routes_df, valid_stop_ids)
+    log_route_filter_report(report, "Stop Coverage Filter Summary")
 
-    result_df = pd.DataFrame(enriched_data)
-    result_df.to_csv(output_path, sep=';', index=False)
+    result_df = attach_trip_names(routes_df[['trip_id', 'stops']], build_stop_name_index(stops_df))
+    write_route_table(result_df, output_path)
     logging.info(f"💾 Saved {len(result_df)} filtered routes to: {output_path}")
     print(f"\n✅ Done! {len(result_df)} routes written to file.\n")
 
@@ -68,12 +95,13 @@ def main():
 
     # Define paths
     base_path = "D:/PhD/prog_report_2025_June_project"
-    condensed_path = os.path.join(base_path, "data/Swiss/interim/routes_condensed.csv")
+    condensed_path = os.path.join(base_path, "data/Swiss/interim/routes_condensed.parquet")
     stop_map_path = os.path.join(base_path, "data/Swiss/interim/corrected_stops_with_mapping.csv")
-    output_path = os.path.join(base_path, "data/Swiss/interim/routes_with_metadata.csv")
+    output_path = os.path.join(base_path, "data/Swiss/interim/routes_with_metadata.parquet")
 
     # Load input files
-    routes_df = load_csv(condensed_path, sep=';')
+    routes_df = read_route_table(condensed_path)
+    logging.info(f"✅ Loaded route table: {condensed_path} with shape: {routes_df.shape}")
     stops_df = load_csv(stop_map_path, sep=';')
 
     # Prepare set of valid stop_ids for filtering
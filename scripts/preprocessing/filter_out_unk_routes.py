@@ -1,8 +1,11 @@
 import os
-import ast
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table
+
 # ------------------------------------------------------------------------------
 # Logging setup
 # ------------------------------------------------------------------------------
@@ -14,8 +17,8 @@ logging.basicConfig(
 # ------------------------------------------------------------------------------
 # File paths (LOCAL ONLY)
 # ------------------------------------------------------------------------------
-INPUT_FILE = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_and_vehicles_only_train_abbr.csv"
-OUTPUT_FILE = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_and_vehicles_only_train_abbr_clean.csv"
+INPUT_FILE = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_and_vehicles_only_train_abbr.parquet"
+OUTPUT_FILE = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_and_vehicles_only_train_abbr_clean.parquet"
 
 # ------------------------------------------------------------------------------
 # Filtering Function
@@ -25,8 +28,8 @@ def filter_routes_without_unk(input_file, output_file):
     Filters out routes that contain 'UNK' in their stop abbreviation list.
 
     Args:
-        input_file (str): Path to the input CSV with stop abbreviation lists.
-        output_file (str): Path to save the cleaned CSV.
+        input_file (str): Path to the input route table with stop abbreviation lists.
+        output_file (str): Path to save the cleaned route table.
 
     Returns:
         None
@@ -34,24 +37,20 @@ def filter_routes_without_unk(input_file, output_file):
     logging.info("🧹 Starting filtering of routes with 'UNK' stops...")
 
     try:
-        df = pd.read_csv(input_file, sep=';', encoding='utf-8')
+        df = read_route_table(input_file)
         logging.info(f"✅ Loaded route file with shape: {df.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load route file: {e}")
         return
 
-    def is_valid_stop_list(stops_raw):
-        try:
-            stop_list = ast.literal_eval(stops_raw)
-            return all(abbr != "UNK" for abbr in stop_list)
-        except Exception:
-            return False
+    def is_valid_stop_list(stop_list):
+        return len(stop_list) > 0 and all(abbr != "UNK" for abbr in stop_list)
 
     df_clean = df[df['stops'].apply(is_valid_stop_list)].copy()
     removed_count = len(df) - len(df_clean)
 
     try:
-        df_clean.to_csv(output_file, sep=';', index=False, encoding='utf-8')
+        write_route_table(df_clean, output_file)
         logging.info(f"💾 Saved cleaned file to: {output_file}")
     except Exception as e:
         logging.error(f"❌ Failed to save cleaned output: {e}")
@@ -1,8 +1,11 @@
 import os
-import ast
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table, filter_routes_by_stops, log_route_filter_report
+
 # ------------------------------------------------------------------------------
 # Logging setup
 # ------------------------------------------------------------------------------
@@ -15,9 +18,9 @@ logging.basicConfig(
 # File paths (LOCAL ONLY)
 # ------------------------------------------------------------------------------
 BASE_PATH = r"D:\PhD\prog_report_2025_June_project"
-ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train_abbr_clean.csv")
+ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train_abbr_clean.parquet")
 SUMO_STOP_FILE = os.path.join(BASE_PATH, "data", "Swiss", "processed", "simpler_network", "simple_stops_edges_cleaned.csv")
-OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_fully_covered_by_sumo.csv")
+OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_fully_covered_by_sumo.parquet")
 
 # ------------------------------------------------------------------------------
 # Filtering Logic
@@ -30,7 +33,7 @@ def filter_routes_covered_by_sumo():
 
     # Load route file
     try:
-        df_routes = pd.read_csv(ROUTE_FILE, sep=';', encoding='utf-8')
+        df_routes = read_route_table(ROUTE_FILE)
         logging.info(f"✅ Loaded route file with shape: {df_routes.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load route file: {e}")
@@ -46,35 +49,18 @@ def filter_routes_covered_by_sumo():
         return
 
     # Filter out any route that contains unmatched stop_abbr
-    valid_rows = []
-    total_routes = len(df_routes)
-    discarded = 0
-
-    for _, row in df_routes.iterrows():
-        try:
-            stop_abbrs = ast.literal_eval(row['stops'])
-            if all(abbr in valid_abbrs for abbr in stop_abbrs):
-                valid_rows.append(row)
-            else:
-                discarded += 1
-        except Exception:
-            discarded += 1  # also discard malformed rows
-
-    filtered_df = pd.DataFrame(valid_rows)
+    filtered_df, report = filter_routes_by_stops(df_routes, valid_abbrs)
 
     # Save result
     try:
-        filtered_df.to_csv(OUTPUT_FILE, sep=';', index=False, encoding='utf-8')
+        write_route_table(filtered_df, OUTPUT_FILE)
         logging.info(f"💾 Saved filtered routes to: {OUTPUT_FILE}")
     except Exception as e:
         logging.error(f"❌ Failed to save filtered routes: {e}")
         return
 
     # Report
-    logging.info("\n📊 SUMO Route Coverage Filter Summary:")
-    logging.info(f"  • Original routes         : {total_routes}")
-    logging.info(f"  • Clean routes retained   : {len(filtered_df)}")
-    logging.info(f"  • Routes removed          : {discarded}")
+    log_route_filter_report(report, "SUMO Route Coverage Filter Summary")
     logging.info("✅ Filtering complete.")
 
 # ------------------------------------------------------------------------------
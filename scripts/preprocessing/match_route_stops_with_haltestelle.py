@@ -1,7 +1,11 @@
 import os
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gtfs_feed import load_stop_times
+
 # ----------------------------------------------------------------------------
 # Configuration
 # ----------------------------------------------------------------------------
@@ -17,13 +21,6 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# ----------------------------------------------------------------------------
-# Utility
-# ----------------------------------------------------------------------------
-def clean_stop_id(raw_stop_id):
-    """Extract numeric part from a stop_id, e.g. '8503054:0:1' -> '8503054'."""
-    return str(raw_stop_id).split(':')[0]
-
 # ----------------------------------------------------------------------------
 # Main logic
 # ----------------------------------------------------------------------------
@@ -46,19 +43,19 @@ def find_matched_stop_ids(haltestelle_path: str, gtfs_stop_times_path: str, outp
         return
 
     try:
-        df_gtfs = pd.read_csv(gtfs_stop_times_path, sep=',', dtype=str)
+        # Only the cleaned stop_id column is needed from the Parquet cache
+        df_gtfs = load_stop_times(os.path.dirname(gtfs_stop_times_path), columns=["stop_id_clean"])
         logging.info(f"✅ Loaded stop_times.txt with shape: {df_gtfs.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load GTFS stop_times.txt: {e}")
         return
 
-    if 'number' not in df_halt.columns or 'stop_id' not in df_gtfs.columns:
-        logging.error("❌ Required columns 'number' in haltestelle or 'stop_id' in stop_times are missing.")
+    if 'number' not in df_halt.columns:
+        logging.error("❌ Required column 'number' in haltestelle is missing.")
         return
 
     halt_ids = set(df_halt['number'].dropna().astype(str).str.strip())
-    gtfs_raw_ids = df_gtfs['stop_id'].dropna().astype(str).apply(clean_stop_id)
-    gtfs_ids = set(gtfs_raw_ids)
+    gtfs_ids = set(df_gtfs['stop_id_clean'].dropna().unique().astype(str))
 
     matched_ids = sorted(halt_ids & gtfs_ids)
 
@@ -1,7 +1,10 @@
 import os
+import sys
 import logging
 import pandas as pd
-from ast import literal_eval
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table, filter_routes_by_stops, log_route_filter_report
 
 # ----------------------------------------------------------------------------
 # Logging Configuration
@@ -42,16 +45,13 @@ def enrich_routes(routes_df, stop_map_df, matched_ids_set):
     Filter and enrich routes with readable origin-destination names.
 
     Args:
-        routes_df (pd.DataFrame): DataFrame with 'trip_id' and 'stops'.
+        routes_df (pd.DataFrame): Route table with 'trip_id' and 'stops' (arrays of stop IDs).
         stop_map_df (pd.DataFrame): DataFrame with stop_id to name mapping.
         matched_ids_set (set): Set of valid stop IDs.
 
     Returns:
         (pd.DataFrame, int): Tuple of enriched DataFrame and count of discarded routes.
     """
-    enriched_data = []
-    discarded_count = 0
-
     # Build lookup dictionary for stop_id to name
     stop_map_df['number'] = stop_map_df['number'].astype(str).str.strip()
     stop_map_df['offizielle Haltestellen Bezeichnung'] = stop_map_df[
@@ -59,35 +59,25 @@ def enrich_routes(routes_df, stop_map_df, matched_ids_set):
     stop_name_lookup = stop_map_df.set_index('number')[
         'offizielle Haltestellen Bezeichnung'].to_dict()
 
-    for _, row in routes_df.iterrows():
-        trip_id = row['trip_id']
-        try:
-            stop_list = literal_eval(row['stops'])
-        except Exception as e:
-            logging.warning(f"⚠️ Could not parse stops for trip {trip_id}: {e}")
-            discarded_count += 1
-            continue
-
-        if not set(stop_list).issubset(matched_ids_set):
-            discarded_count += 1
-            continue
-
-        origin_id, dest_id = stop_list[0], stop_list[-1]
-
-        try:
-            origin_name = stop_name_lookup[origin_id]
-            dest_name = stop_name_lookup[dest_id]
-        except KeyError:
-            discarded_count += 1
-            continue
-
-        enriched_data.append({
-            'trip_id': trip_id,
-            'trip_name': f"{origin_name}-{dest_name}",
-            'stops': stop_list
-        })
-
-    enriched_df = pd.DataFrame(enriched_data)
+    # Empty routes carry no origin/destination
+    empty = routes_df['stops'].map(len).to_numpy() == 0
+    for trip_id in routes_df.loc[empty, 'trip_id']:
+        logging.warning(f"⚠️ Empty stop list for trip {trip_id}")
+
+    # Subset check for all routes at once
+    kept_df, report = filter_routes_by_stops(routes_df[~empty], matched_ids_set)
+    log_route_filter_report(report, "Matched Stop Filter Summary")
+
+    origin_names = kept_df['stops'].map(lambda stops: stops[0]).map(stop_name_lookup)
+    dest_names = kept_df['stops'].map(lambda stops: stops[-1]).map(stop_name_lookup)
+    named = (origin_names.notna() & dest_names.notna()).to_numpy()
+
+    enriched_df = pd.DataFrame({
+        'trip_id': kept_df['trip_id'].to_numpy()[named],
+        'trip_name': (origin_names + "-" + dest_names).to_numpy()[named],
+        'stops': kept_df['stops'].to_numpy()[named],
+    })
+    discarded_count = len(routes_df) - len(enriched_df)
     return enriched_df, discarded_count
 
 # ----------------------------------------------------------------------------
@@ -98,13 +88,14 @@ def main():
 
     # File paths
     base_path = r"D:/PhD/prog_report_2025_June_project"
-    ROUTES_PATH = os.path.join(base_path, "data/Swiss/interim/routes_condensed.csv")
+    ROUTES_PATH = os.path.join(base_path, "data/Swiss/interim/routes_condensed.parquet")
     HALTESTELLE_PATH = os.path.join(base_path, "data/Swiss/raw/haltestelle-haltekante.csv")
     MATCHED_STOP_IDS_PATH = os.path.join(base_path, "data/Swiss/interim/matched_stop_ids.txt")
-    OUTPUT_PATH = os.path.join(base_path, "data/Swiss/interim/routes_with_metadata.csv")
+    OUTPUT_PATH = os.path.join(base_path, "data/Swiss/interim/routes_with_metadata.parquet")
 
     # Load datasets
-    routes_df = load_csv(ROUTES_PATH, sep=';')
+    routes_df = read_route_table(ROUTES_PATH)
+    logging.info(f"✅ Loaded route table: {ROUTES_PATH} with shape: {routes_df.shape}")
     stop_map_df = load_csv(HALTESTELLE_PATH, sep=';')
     
     with open(MATCHED_STOP_IDS_PATH, 'r') as f:
@@ -113,7 +104,7 @@ def main():
 
     # Enrich
     enriched_df, discarded = enrich_routes(routes_df, stop_map_df, matched_ids)
-    enriched_df.to_csv(OUTPUT_PATH, sep=';', index=False)
+    write_route_table(enriched_df, OUTPUT_PATH)
 
     logging.info(f"\U0001F4BE Saved {len(enriched_df)} enriched routes to: {OUTPUT_PATH}")
     print(f"\n✅ Done! {len(enriched_df)} routes written to file. {discarded} routes were discarded.\n")
@@ -1,7 +1,12 @@
 import os
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gtfs_feed import load_stop_times, stop_sequences_from_frame
+from route_table import stops_from_arrays, routes_within_stop_set, route_filter_report, log_route_filter_report, write_route_table
+
 # ----------------------------------------------------------------------------
 # Logging Configuration
 # ----------------------------------------------------------------------------
@@ -15,21 +20,14 @@ logging.basicConfig(
 # ----------------------------------------------------------------------------
 STOP_TIMES_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\raw\gtfs\stop_times.txt"
 MATCHED_IDS_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\matched_stop_ids.txt"
-OUTPUT_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_condensed.csv"
-
-# ----------------------------------------------------------------------------
-# Utility Functions
-# ----------------------------------------------------------------------------
-def clean_stop_id(raw_stop_id: str) -> str:
-    """Extract numeric portion of stop_id (e.g. '8503054:0:1' -> '8503054')."""
-    return str(raw_stop_id).split(":")[0]
+OUTPUT_PATH = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_condensed.parquet"
 
 # ----------------------------------------------------------------------------
 # Main Processing Function
 # ----------------------------------------------------------------------------
 def create_condensed_routes():
     """
-    Process stop_times.txt to generate routes_condensed.csv
+    Process stop_times.txt to generate routes_condensed.parquet
     including only routes whose all stop_ids are matched with Haltestelle data.
     """
     logging.info("✨ Starting condensed route creation...")
@@ -43,35 +41,33 @@ def create_condensed_routes():
         logging.error(f"Failed to load matched stop IDs: {e}")
         return
 
-    # Load stop_times.txt
+    # Load stop_times (Parquet cache: stop_ids already cleaned, rows sorted by trip/sequence)
     try:
-        df = pd.read_csv(STOP_TIMES_PATH, dtype=str)
+        df = load_stop_times(
+            os.path.dirname(STOP_TIMES_PATH),
+            columns=["trip_id", "stop_id_clean", "stop_sequence"]
+        )
         logging.info(f"✅ Loaded stop_times.txt with shape: {df.shape}")
     except Exception as e:
         logging.error(f"Failed to load stop_times.txt: {e}")
         return
 
-    # Clean stop_ids and convert stop_sequence to int
-    df['stop_id_clean'] = df['stop_id'].apply(clean_stop_id)
-    df['stop_sequence'] = df['stop_sequence'].astype(int)
-
-    # Group by trip_id and sort by stop_sequence
-    grouped = df.sort_values(['trip_id', 'stop_sequence']).groupby('trip_id')
-
-    valid_routes = []
-    discarded_count = 0
+    # Stops per trip as flat offsets + values, then one membership test for all trips
+    sequences = stop_sequences_from_frame(df, stop_column="stop_id_clean")
+    stop_values = sequences.stop_ids[sequences.stop_codes]
+    route_mask, stop_valid = routes_within_stop_set(sequences.offsets, stop_values, matched_ids)
+    report = route_filter_report(sequences.offsets, stop_values, route_mask, stop_valid)
+    log_route_filter_report(report, "Condensed Route Filtering Summary")
 
-    for trip_id, group in grouped:
-        stops = list(group['stop_id_clean'])
-        if all(sid in matched_ids for sid in stops):
-            valid_routes.append({'trip_id': trip_id, 'stops': stops})
-        else:
-            discarded_count += 1
+    result_df = pd.DataFrame({
+        'trip_id': sequences.trip_ids[route_mask],
+        'stops': stops_from_arrays(sequences.offsets, stop_values)[route_mask],
+    })
+    discarded_count = report.discarded
 
     # Save the result
-    result_df = pd.DataFrame(valid_routes)
     try:
-        result_df.to_csv(OUTPUT_PATH, sep=';', index=False)
+        write_route_table(result_df, OUTPUT_PATH)
         logging.info(f"📅 Saved {len(result_df)} valid routes to: {OUTPUT_PATH}")
         print(f"\n✅ Done! {len(result_df)} routes written to file. {discarded_count} routes were discarded.\n")
     except Exception as e:
@@ -1,15 +1,18 @@
 import os
-import ast
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table, filter_routes_by_stops, log_route_filter_report
+
 # ------------------------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------------------------
 BASE_PATH = r"D:\PhD\prog_report_2025_June_project"
-ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced.csv")
+ROUTE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced.parquet")
 HALTESTELLE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "raw", "haltestelle-haltekante.csv")
-OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train.csv")
+OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train.parquet")
 
 # ------------------------------------------------------------------------------
 # Logging Setup
@@ -27,7 +30,7 @@ def filter_train_only_routes(route_file, haltestelle_file, output_file):
     Filters the route file to include only routes where all stops are train stops.
 
     Args:
-        route_file (str): Path to routes CSV with stop_id sequences.
+        route_file (str): Path to route table with stop_id sequences.
         haltestelle_file (str): Path to haltestelle-haltekante.csv.
         output_file (str): Path to save the filtered routes.
     """
@@ -35,7 +38,7 @@ def filter_train_only_routes(route_file, haltestelle_file, output_file):
 
     # Load route metadata
     try:
-        routes_df = pd.read_csv(route_file, sep=';', encoding='utf-8')
+        routes_df = read_route_table(route_file)
         logging.info(f"✅ Loaded route file with shape: {routes_df.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load route file: {e}")
@@ -55,31 +58,16 @@ def filter_train_only_routes(route_file, haltestelle_file, output_file):
     logging.info(f"✅ Identified {len(train_stop_ids)} TRAIN stop_ids from haltestelle")
 
     # Filter routes
-    kept = []
-    discarded = 0
-    for _, row in routes_df.iterrows():
-        try:
-            stop_ids = ast.literal_eval(row['stops'])
-            if all(str(sid).strip() in train_stop_ids for sid in stop_ids):
-                kept.append(row)
-            else:
-                discarded += 1
-        except Exception:
-            discarded += 1
-
-    filtered_df = pd.DataFrame(kept)
+    filtered_df, report = filter_routes_by_stops(routes_df, train_stop_ids, strip=True)
     try:
-        filtered_df.to_csv(output_file, sep=';', index=False, encoding='utf-8')
+        write_route_table(filtered_df, output_file)
         logging.info(f"💾 Saved filtered routes to: {output_file}")
     except Exception as e:
         logging.error(f"❌ Failed to save filtered file: {e}")
         return
 
     # Summary
-    logging.info("\n📊 Route Filtering Summary:")
-    logging.info(f"  • Total routes analyzed      : {len(routes_df)}")
-    logging.info(f"  • Routes kept (train only)  : {len(filtered_df)}")
-    logging.info(f"  • Routes discarded (non-train): {discarded}")
+    log_route_filter_report(report, "Route Filtering Summary (train only)")
     logging.info("✅ Filtering complete.")
 
 # ------------------------------------------------------------------------------
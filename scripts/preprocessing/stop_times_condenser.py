@@ -1,6 +1,11 @@
 import pandas as pd
 import logging
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gtfs_feed import load_stop_times
+from route_table import write_route_table
 
 # Configure logging
 logging.basicConfig(
@@ -11,33 +16,35 @@ logging.basicConfig(
 def extract_routes_condensed(input_path: str, output_path: str) -> None:
     """
     Extracts condensed route sequences from GTFS stop_times.txt by aggregating ordered stop_ids for each trip_id.
+    Reads the feed's Parquet cache (see gtfs_feed.py), which already holds cleaned stop IDs.
 
     Args:
         input_path (str): Path to the GTFS stop_times.txt file.
-        output_path (str): Path to write the condensed output CSV with trip_id and stop_id sequence.
+        output_path (str): Path to write the condensed route table (Parquet) with trip_id and stop_id sequence.
     """
     try:
         logging.info("🚀 Loading stop_times.txt...")
-        df = pd.read_csv(input_path)
+        df = load_stop_times(
+            os.path.dirname(input_path),
+            columns=["trip_id", "stop_id_clean", "stop_sequence"]
+        )
         logging.info(f"✅ File loaded: {input_path} with shape {df.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load file: {e}")
         return
 
     try:
-        logging.info("🔧 Cleaning stop_id values...")
-        df['clean_stop_id'] = df['stop_id'].astype(str).str.split(':').str[0]
+        df['clean_stop_id'] = df['stop_id_clean'].astype(str)
 
-        logging.info("📐 Sorting and grouping stop sequences by trip_id...")
-        df_sorted = df.sort_values(by=['trip_id', 'stop_sequence'])
-        grouped = df_sorted.groupby('trip_id')['clean_stop_id'].apply(list).reset_index()
+        logging.info("📐 Grouping stop sequences by trip_id (cache is pre-sorted)...")
+        grouped = df.groupby('trip_id', observed=True, sort=True)['clean_stop_id'].apply(list).reset_index()
         grouped.columns = ['trip_id', 'stops']
 
         logging.info(f"💾 Saving condensed route data to: {output_path}")
-        grouped.to_csv(output_path, sep=';', index=False)
+        write_route_table(grouped, output_path)
 
         logging.info(f"🎉 Done! Saved {len(grouped)} unique trip routes.")
-        print("\n🔍 Preview of saved routes_condensed.csv:")
+        print("\n🔍 Preview of saved routes_condensed.parquet:")
         print(grouped.head(5).to_string(index=False))
 
     except Exception as e:
@@ -46,6 +53,6 @@ def extract_routes_condensed(input_path: str, output_path: str) -> None:
 # === Run the Script ===
 
 input_file = r"D:\PhD\prog_report_2025_June_project\data\Swiss\raw\gtfs\stop_times.txt"
-output_file = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_condensed.csv"
+output_file = r"D:\PhD\prog_report_2025_June_project\data\Swiss\interim\routes_condensed.parquet"
 
 extract_routes_condensed(input_file, output_file)
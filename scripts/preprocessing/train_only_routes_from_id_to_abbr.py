@@ -1,15 +1,18 @@
 import os
-import ast
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table, map_route_stops
+
 # ------------------------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------------------------
 BASE_PATH = r"D:\PhD\prog_report_2025_June_project"
-INPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train.csv")
+INPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train.parquet")
 HALTESTELLE_FILE = os.path.join(BASE_PATH, "data", "Swiss", "raw", "haltestelle-haltekante.csv")
-OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train_abbr.csv")
+OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_only_train_abbr.parquet")
 
 # ------------------------------------------------------------------------------
 # Logging Setup
@@ -27,7 +30,7 @@ def enrich_with_abbreviations(route_file, haltestelle_file, output_file):
     Replaces stop_ids in each route with their stop abbreviations based on haltestelle-haltekante.csv.
 
     Args:
-        route_file (str): CSV with 'stops' column of stop_id lists.
+        route_file (str): Route table with 'stops' column of stop_id arrays.
         haltestelle_file (str): CSV with stop_id ↔ abbreviation mapping.
         output_file (str): File to save the updated output to.
 
@@ -38,7 +41,7 @@ def enrich_with_abbreviations(route_file, haltestelle_file, output_file):
 
     # Load route file
     try:
-        df = pd.read_csv(route_file, sep=';', encoding='utf-8')
+        df = read_route_table(route_file)
         logging.info(f"✅ Loaded route file: {route_file} with shape: {df.shape}")
     except Exception as e:
         logging.error(f"❌ Failed to load route file: {e}")
@@ -58,31 +61,12 @@ def enrich_with_abbreviations(route_file, haltestelle_file, output_file):
     abbr_map = halt_df.set_index('number')['abbreviation'].to_dict()
 
     # Replace stop_ids with abbreviations
-    enriched_stops = []
-    total_processed = 0
-    total_unmapped = 0
-
-    for stops_raw in df['stops']:
-        try:
-            stop_ids = ast.literal_eval(stops_raw)
-            abbrs = []
-            for sid in stop_ids:
-                sid_clean = str(sid).strip()
-                abbr = abbr_map.get(sid_clean, "UNK")
-                if abbr == "UNK":
-                    total_unmapped += 1
-                abbrs.append(abbr)
-                total_processed += 1
-            enriched_stops.append(abbrs)
-        except Exception:
-            enriched_stops.append(["UNK"])
-            total_unmapped += 1
-
+    enriched_stops, total_unmapped, total_processed = map_route_stops(df, abbr_map, "UNK")
     df['stops'] = enriched_stops
 
     # Save
     try:
-        df.to_csv(output_file, sep=';', index=False, encoding='utf-8')
+        write_route_table(df, output_file)
         logging.info(f"💾 Saved enhanced file to: {output_file}")
     except Exception as e:
         logging.error(f"❌ Failed to save output: {e}")
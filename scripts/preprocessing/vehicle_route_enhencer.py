@@ -1,14 +1,17 @@
 import os
-import ast
+import sys
 import logging
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from route_table import read_route_table, write_route_table
+
 # ----------------------------------------------------------------------------
 # Configuration
 # ----------------------------------------------------------------------------
 BASE_PATH = "D:/PhD/prog_report_2025_June_project"
-INPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata.csv")
-OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced.csv")
+INPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata.parquet")
+OUTPUT_FILE = os.path.join(BASE_PATH, "data", "Swiss", "interim", "routes_and_vehicles_with_metadata_enhanced.parquet")
 
 # ----------------------------------------------------------------------------
 # Logging setup
@@ -26,13 +29,13 @@ def refine_vehicle_matches(input_path: str, output_path: str):
     Enhance vehicle_id assignments in route metadata by checking for reversed routes.
 
     Args:
-        input_path (str): Path to the original CSV file.
+        input_path (str): Path to the original route table.
         output_path (str): Path to save the enhanced output.
     """
     logging.info("\U0001F680 Starting refinement of vehicle assignments based on full stop reversal...")
 
     # Load dataset
-    df = pd.read_csv(input_path, sep=';', encoding='utf-8')
+    df = read_route_table(input_path)
 
     # Ensure 'vehicle_id' column is string type and unify missing values
     df['vehicle_id'] = df['vehicle_id'].astype(str).replace({'nan': 'N/A', '': 'N/A'})
@@ -41,11 +44,7 @@ def refine_vehicle_matches(input_path: str, output_path: str):
     stop_seq_to_vehicle = {}
     for _, row in df.iterrows():
         if row['vehicle_id'] != 'N/A':
-            try:
-                stops = tuple(ast.literal_eval(row['stops']))
-                stop_seq_to_vehicle[stops] = row['vehicle_id']
-            except Exception:
-                continue
+            stop_seq_to_vehicle[tuple(row['stops'])] = row['vehicle_id']
 
     # Enhance rows with no vehicle_id by checking for reversed stop sequences
     enhanced_count = 0
@@ -56,19 +55,15 @@ def refine_vehicle_matches(input_path: str, output_path: str):
             new_vehicle_ids.append(row['vehicle_id'])
             continue
 
-        try:
-            stops = tuple(ast.literal_eval(row['stops']))
-            reversed_stops = tuple(reversed(stops))
-            if reversed_stops in stop_seq_to_vehicle:
-                new_vehicle_ids.append(stop_seq_to_vehicle[reversed_stops])
-                enhanced_count += 1
-            else:
-                new_vehicle_ids.append('N/A')
-        except Exception:
+        reversed_stops = tuple(row['stops'][::-1])
+        if reversed_stops in stop_seq_to_vehicle:
+            new_vehicle_ids.append(stop_seq_to_vehicle[reversed_stops])
+            enhanced_count += 1
+        else:
             new_vehicle_ids.append('N/A')
 
     df['vehicle_id'] = new_vehicle_ids
-    df.to_csv(output_path, sep=';', index=False)
+    write_route_table(df, output_path)
 
     # Logging summary
     total = len(df)
@@ -0,0 +1,78 @@
+"""
+projection.py
+
+Vectorized coordinate transformation shared by the network builders.
+Whole coordinate arrays are projected in a single pyproj call instead of one
+`transformer.transform` per point. Linestrings are flattened into one (N, 2)
+vertex array plus an offsets array, projected together and split back per
+geometry: the vertices of line `i` are `xy[offsets[i]:offsets[i + 1]]`.
+
+Transformers are cached per CRS pair and always use (x, y) = (lon, lat) order.
+
+Used by:
+    - simple_network_creators/generate_nodes_from_simple_stops.py
+    - simple_network_creators/generate_simplified_edges_xml.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from pyproj import Transformer
+
+WGS84 = "epsg:4326"
+UTM_32N = "epsg:32632"
+LV95 = "epsg:2056"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Transformers
+# ─────────────────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def get_transformer(src_crs=WGS84, dst_crs=UTM_32N):
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+def transform_xy(x, y, src_crs=WGS84, dst_crs=UTM_32N):
+    """Projects coordinate arrays in one call. Returns (x, y) as float64 arrays."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if not len(x):
+        return x.copy(), y.copy()
+    tx, ty = get_transformer(src_crs, dst_crs).transform(x, y)
+    return np.asarray(tx, dtype=np.float64), np.asarray(ty, dtype=np.float64)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Linestrings (offsets + flat vertices)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _vertices(line):
+    arr = np.asarray(line, dtype=np.float64)
+    return arr[:, :2] if arr.ndim == 2 else np.empty((0, 2), dtype=np.float64)
+
+def flatten_linestrings(lines):
+    """
+    Flattens an iterable of coordinate sequences ([[lon, lat], ...]) into
+    (offsets, xy). Only the first two ordinates of each vertex are kept.
+    """
+    lines = [_vertices(line) for line in lines]
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum([len(line) for line in lines], out=offsets[1:])
+    xy = np.concatenate(lines) if offsets[-1] else np.empty((0, 2), dtype=np.float64)
+    return offsets, xy
+
+def split_linestrings(offsets, xy):
+    """Inverse of flatten_linestrings: one (n_i, 2) array per line."""
+    return np.split(xy, offsets[1:-1]) if len(offsets) > 1 else []
+
+def transform_linestrings(lines, src_crs=WGS84, dst_crs=UTM_32N):
+    """
+    Projects many linestrings with a single transform over all their vertices.
+
+    Returns:
+        (np.ndarray, np.ndarray): offsets and projected (N, 2) vertices
+    """
+    offsets, xy = flatten_linestrings(lines)
+    x, y = transform_xy(xy[:, 0], xy[:, 1], src_crs, dst_crs)
+    return offsets, np.column_stack([x, y])
@@ -0,0 +1,187 @@
+"""
+route_table.py
+
+Shared on-disk format for the route preprocessing chain.
+Route tables (trip_id, trip_name, stops, vehicle_id, ...) are stored as Parquet
+with `stops` as a native list<string> column, instead of a semicolon CSV with
+`str(list)` cells that every stage had to `eval` back row by row.
+
+In memory the `stops` column holds one NumPy array per route. Stages that
+work on all stops at once use the flat offsets + values form
+(route_stop_arrays / stops_from_arrays), e.g. to map stop IDs to
+abbreviations with one dictionary lookup per distinct stop.
+
+filter_routes_by_stops() is the shared "are all stops of this route in set S"
+filter: one vectorized membership test over the flat stop array, reduced per
+route, with kept/discarded counts and the stops responsible for rejections.
+
+Legacy `.csv` route files are still readable; their list cells are split with
+vectorized string operations, never evaluated.
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import namedtuple
+
+STOPS_COLUMN = "stops"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Offsets + values
+# ─────────────────────────────────────────────────────────────────────────────
+
+def route_stop_arrays(df, column=STOPS_COLUMN):
+    """
+    Flattens a stops column into (offsets, values).
+
+    The stops of route `i` (positional) are `values[offsets[i]:offsets[i + 1]]`.
+    """
+    stops = df[column].tolist()
+    lengths = np.fromiter((len(s) for s in stops), dtype=np.int64, count=len(stops))
+    offsets = np.zeros(len(stops) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if offsets[-1]:
+        values = np.concatenate([np.asarray(s, dtype=object) for s in stops]).astype(str).astype(object)
+    else:
+        values = np.array([], dtype=object)
+    return offsets, values
+
+def stops_from_arrays(offsets, values):
+    """Inverse of route_stop_arrays: object array holding one array of stops per route."""
+    routes = np.empty(max(len(offsets) - 1, 0), dtype=object)
+    if len(routes):
+        routes[:] = np.split(np.asarray(values, dtype=object), offsets[1:-1])
+    return routes
+
+def map_route_stops(df, mapping, default, column=STOPS_COLUMN):
+    """
+    Replaces every stop in the stops column via `mapping` (missing → default).
+
+    Returns:
+        (np.ndarray, int, int): new per-route stop arrays, number of stops that
+        ended up as `default`, total number of stops
+    """
+    offsets, values = route_stop_arrays(df, column)
+    stripped = pd.Series(values, dtype=object).str.strip()
+    mapped = stripped.map(mapping).fillna(default).to_numpy(dtype=object)
+    unmapped = int((mapped == default).sum())
+    return stops_from_arrays(offsets, mapped), unmapped, len(values)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Stop-set filter engine
+# ─────────────────────────────────────────────────────────────────────────────
+
+RouteFilterReport = namedtuple(
+    "RouteFilterReport", ["total", "kept", "discarded", "empty", "top_missing_stops"]
+)
+
+def routes_within_stop_set(offsets, values, valid_stops):
+    """
+    Answers "are all stops of route i in valid_stops" for every route at once.
+
+    Membership is tested once per distinct stop value, broadcast back to the
+    flat stop array and reduced per route by counting invalid stops.
+    Routes without stops count as covered (like `all([])`).
+
+    Returns:
+        (np.ndarray[bool], np.ndarray[bool]): per-route mask, per-stop validity
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    unique_valid = pd.Index(uniques).isin(list(valid_stops))
+    stop_valid = np.where(codes >= 0, unique_valid[np.maximum(codes, 0)], False)
+
+    n_routes = len(offsets) - 1
+    route_idx = np.repeat(np.arange(n_routes), np.diff(offsets))
+    invalid_per_route = np.bincount(route_idx[~stop_valid], minlength=n_routes)
+    return invalid_per_route == 0, stop_valid
+
+def route_filter_report(offsets, values, route_mask, stop_valid, top_n=10):
+    """Summarizes a stop-set filter: counts plus the stops that caused most rejections."""
+    missing = pd.Series(np.asarray(values, dtype=object)[~stop_valid], dtype=object)
+    return RouteFilterReport(
+        total=len(route_mask),
+        kept=int(route_mask.sum()),
+        discarded=int((~route_mask).sum()),
+        empty=int((np.diff(offsets) == 0).sum()),
+        top_missing_stops=missing.value_counts().head(top_n).to_dict(),
+    )
+
+def filter_routes_by_stops(df, valid_stops, column=STOPS_COLUMN, strip=False):
+    """
+    Keeps the routes of `df` whose stops all belong to `valid_stops`.
+
+    Returns:
+        (pd.DataFrame, RouteFilterReport)
+    """
+    offsets, values = route_stop_arrays(df, column)
+    if strip:
+        values = pd.Series(values, dtype=object).str.strip().to_numpy(dtype=object)
+    route_mask, stop_valid = routes_within_stop_set(offsets, values, valid_stops)
+    return df[route_mask], route_filter_report(offsets, values, route_mask, stop_valid)
+
+def log_route_filter_report(report, title="Route Filtering Summary"):
+    logging.info(f"\n📊 {title}:")
+    logging.info(f"  • Total routes analyzed      : {report.total}")
+    logging.info(f"  • Routes kept                : {report.kept}")
+    logging.info(f"  • Routes discarded           : {report.discarded}")
+    logging.info(f"  • Empty routes               : {report.empty}")
+    if report.top_missing_stops:
+        logging.info("  • Most frequent reasons (stop not in valid set → occurrences):")
+        for stop, count in report.top_missing_stops.items():
+            logging.info(f"      - {stop}: {count}")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Legacy CSV support
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _parse_legacy_stop_lists(series):
+    """Splits "['a', 'b']" cells into arrays without eval."""
+    inner = series.reset_index(drop=True).fillna("").astype(str).str.strip().str.strip("[]")
+    tokens = inner.str.split(",").explode().str.strip().str.strip("'\"")
+    tokens = tokens[tokens.ne("") & tokens.notna()]
+
+    counts = np.bincount(tokens.index.to_numpy(dtype=np.int64), minlength=len(inner))
+    offsets = np.zeros(len(inner) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return stops_from_arrays(offsets, tokens.to_numpy(dtype=object))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reader / writer
+# ─────────────────────────────────────────────────────────────────────────────
+
+def read_route_table(path, column=STOPS_COLUMN, **read_kwargs):
+    """
+    Loads a route table. `.parquet` files are read natively; legacy `.csv`
+    files (sep=';') have their stringified stop lists split into arrays.
+    """
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        return pd.read_parquet(path, **read_kwargs)
+
+    read_kwargs.setdefault("sep", ";")
+    read_kwargs.setdefault("encoding", "utf-8")
+    df = pd.read_csv(path, **read_kwargs)
+    if column in df.columns:
+        df[column] = _parse_legacy_stop_lists(df[column])
+    return df
+
+def write_route_table(df, path, column=STOPS_COLUMN):
+    """Writes a route table to Parquet with `stops` as list<string>."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if column not in df.columns:
+        df.to_parquet(path, index=False)
+        return
+
+    offsets, values = route_stop_arrays(df, column)
+    stops = pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()),
+        pa.array(values, type=pa.string()),
+    )
+    table = pa.Table.from_pandas(df.drop(columns=[column]), preserve_index=False)
+    table = table.add_column(list(df.columns).index(column), column, stops)
+    pq.write_table(table, path)
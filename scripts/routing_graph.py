@@ -0,0 +1,358 @@
+"""
+routing_graph.py
+
+Compact routing graph for the SUMO Swiss network.
+Node and edge IDs are interned to integers and the adjacency is stored as
+NumPy CSR arrays (offsets, targets, edge index, length). Shortest-path queries
+run on scipy.sparse.csgraph instead of a pure-Python networkx traversal.
+
+Two weightings are supported:
+    - "hops":   fewest edges (breadth-first search)
+    - "length": shortest lane length (Dijkstra on the contiguous length array)
+With junction coordinates attached (opt-in), point-to-point "length" queries
+use A* with a straight-line heuristic, which only expands the neighbourhood
+between two nearby stops. The A* loop is pure Python, so it only pays off on
+large networks with nearby stops; scipy's Dijkstra stays the default.
+
+Used by:
+    - parse_gtfs_to_route_edge_map.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import heapq
+import math
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, connected_components, dijkstra
+
+WEIGHTS = ("hops", "length")
+MIN_EDGE_WEIGHT = 1e-6     # csgraph drops zero entries, so zero-length edges get a tiny weight
+ASTAR_MAX_TARGETS = 8      # one-to-many queries with more targets run a single Dijkstra instead
+ASTAR_MIN_SCALE = 0.5      # weaker heuristics expand about as much as Dijkstra, which is faster in scipy
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Errors
+# ─────────────────────────────────────────────────────────────────────────────
+
+class NoPathError(Exception):
+    """Raised when no directed path exists between two nodes."""
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Routing graph
+# ─────────────────────────────────────────────────────────────────────────────
+
+class RoutingGraph:
+    """
+    Directed graph in CSR form.
+
+    Row `u` of the adjacency spans `offsets[u]:offsets[u + 1]` of `targets`,
+    `edge_index` and `length`. Targets are sorted within each row so the edge
+    between two nodes can be found with a binary search.
+
+    `weight` selects what shortest paths minimize (see WEIGHTS). Optional
+    `node_x`/`node_y` arrays (one per node index) enable A*.
+    """
+
+    def __init__(self, node_ids, edge_ids, offsets, targets, edge_index, length, weight="hops"):
+        if weight not in WEIGHTS:
+            raise ValueError(f"Unknown weight {weight!r}, expected one of {WEIGHTS}")
+        self.node_ids = list(node_ids)
+        self.edge_ids = list(edge_ids)
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_index = edge_index
+        self.length = length
+        self.weight = weight
+        self.node_x = None
+        self.node_y = None
+        self._node_lookup = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self._csgraph = None
+        self._astar_scale = None
+        self._astar_state = None
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Builds the graph from an iterable of (edge_id, from_node, to_node, length)."""
+        edge_ids, from_nodes, to_nodes, lengths = [], [], [], []
+        for edge_id, from_node, to_node, length in edges:
+            edge_ids.append(edge_id)
+            from_nodes.append(from_node)
+            to_nodes.append(to_node)
+            lengths.append(length)
+        return cls.from_arrays(edge_ids, from_nodes, to_nodes, lengths)
+
+    @classmethod
+    def from_arrays(cls, edge_ids, from_nodes, to_nodes, lengths, weight="hops"):
+        """
+        Builds the graph from parallel edge columns.
+
+        Node IDs are interned in sorted order. Only one edge is kept per
+        (from_node, to_node) pair: under "length" weighting the shortest one,
+        otherwise (and among equally long ones) the last, as with
+        networkx.DiGraph.add_edge.
+        """
+        from_nodes = np.asarray(from_nodes, dtype=str)
+        to_nodes = np.asarray(to_nodes, dtype=str)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        n_edges = len(from_nodes)
+
+        node_ids, inverse = np.unique(np.concatenate([from_nodes, to_nodes]), return_inverse=True)
+        src = inverse[:n_edges].astype(np.int32)
+        dst = inverse[n_edges:].astype(np.int32)
+        position = np.arange(n_edges, dtype=np.int32)
+        n_nodes = len(node_ids)
+
+        # Sort by (src, dst, descending weight, insertion order) and keep the last edge per node pair
+        if weight == "length":
+            pair_weight = np.maximum(np.nan_to_num(lengths, nan=0.0), MIN_EDGE_WEIGHT)
+        else:
+            pair_weight = np.zeros(n_edges)
+        order = np.lexsort((position, -pair_weight, dst, src))
+        if len(order):
+            pair_src, pair_dst = src[order], dst[order]
+            is_last = np.ones(len(order), dtype=bool)
+            is_last[:-1] = (pair_src[1:] != pair_src[:-1]) | (pair_dst[1:] != pair_dst[:-1])
+            order = order[is_last]
+
+        offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src[order], minlength=n_nodes), out=offsets[1:])
+
+        return cls(
+            node_ids=node_ids.tolist(),
+            edge_ids=np.asarray(edge_ids, dtype=str).tolist(),
+            offsets=offsets,
+            targets=dst[order],
+            edge_index=position[order],
+            length=lengths[order],
+            weight=weight,
+        )
+
+    @classmethod
+    def from_net_snapshot(cls, net, weight="hops", with_coordinates=False):
+        """
+        Builds the graph from the non-internal edges of a NetSnapshot and,
+        optionally, attaches the junction coordinates used by A*.
+        """
+        edges = net.edge_mask()
+        graph = cls.from_arrays(
+            net.edge_id[edges], net.edge_from[edges], net.edge_to[edges], net.edge_length[edges], weight=weight
+        )
+        if with_coordinates:
+            junctions = net.junction_mask()
+            graph.set_node_coordinates(net.junction_id[junctions], net.junction_x[junctions], net.junction_y[junctions])
+        return graph
+
+    # ── Basic properties ─────────────────────────────────────────────────────
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.targets)
+
+    def __contains__(self, node_id):
+        return node_id in self._node_lookup
+
+    def node_index(self, node_id):
+        """Returns the integer index of a node ID (KeyError if unknown)."""
+        return self._node_lookup[node_id]
+
+    def edge_weights(self):
+        """Per-CSR-entry weights for the configured weighting (missing lengths count as 0)."""
+        if self.weight == "hops":
+            return np.ones(len(self.targets), dtype=np.float64)
+        length = np.nan_to_num(np.asarray(self.length, dtype=np.float64), nan=0.0)
+        return np.maximum(length, MIN_EDGE_WEIGHT)
+
+    def csgraph(self):
+        """Returns (and caches) the weighted adjacency as a scipy CSR matrix."""
+        if self._csgraph is None:
+            n = self.number_of_nodes()
+            self._csgraph = csr_matrix((self.edge_weights(), self.targets, self.offsets), shape=(n, n))
+        return self._csgraph
+
+    def set_node_coordinates(self, node_ids, x, y):
+        """
+        Attaches junction coordinates (e.g. from the net snapshot) for A*.
+        Nodes without coordinates get NaN, which disables A* for the graph.
+        """
+        self.node_x = np.full(self.number_of_nodes(), np.nan)
+        self.node_y = np.full(self.number_of_nodes(), np.nan)
+        for node_id, node_x, node_y in zip(node_ids, x, y):
+            i = self._node_lookup.get(node_id)
+            if i is not None:
+                self.node_x[i] = node_x
+                self.node_y[i] = node_y
+        self._astar_scale = None
+        self._astar_state = None
+
+    def uses_astar(self):
+        """
+        A* runs for "length" queries when every node has finite coordinates and
+        the heuristic scale is at least ASTAR_MIN_SCALE.
+        """
+        return (
+            self.weight == "length"
+            and self.node_x is not None
+            and bool(np.isfinite(self.node_x).all() and np.isfinite(self.node_y).all())
+            and self.heuristic_scale() >= ASTAR_MIN_SCALE
+        )
+
+    def heuristic_scale(self):
+        """
+        The largest factor c <= 1 with c * straight-line distance <= weight on
+        every edge, which keeps the A* heuristic consistent even where SUMO lane
+        lengths are shorter than the junction distance. Missing or zero lengths
+        between distinct junctions drive it towards 0.
+        """
+        if self._astar_scale is None:
+            weights = self.edge_weights()
+            sources = np.repeat(np.arange(self.number_of_nodes()), np.diff(self.offsets))
+            straight = np.hypot(
+                self.node_x[self.targets] - self.node_x[sources],
+                self.node_y[self.targets] - self.node_y[sources],
+            )
+            positive = straight > 0
+            self._astar_scale = min(1.0, float((weights[positive] / straight[positive]).min())) if positive.any() else 1.0
+        return self._astar_scale
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def edge_position(self, u, v):
+        """Returns the CSR position of the edge u → v (integer node indices)."""
+        start, end = self.offsets[u], self.offsets[u + 1]
+        pos = start + np.searchsorted(self.targets[start:end], v)
+        if pos == end or self.targets[pos] != v:
+            raise KeyError((u, v))
+        return pos
+
+    def path_to_edge_ids(self, node_path):
+        """Converts a sequence of integer node indices to SUMO edge IDs."""
+        return [
+            self.edge_ids[self.edge_index[self.edge_position(u, v)]]
+            for u, v in zip(node_path[:-1], node_path[1:])
+        ]
+
+    def _predecessors_from(self, s):
+        if self.weight == "hops":
+            _, predecessors = breadth_first_order(
+                self.csgraph(), s, directed=True, return_predecessors=True
+            )
+        else:
+            _, predecessors = dijkstra(self.csgraph(), directed=True, indices=s, return_predecessors=True)
+        return predecessors
+
+    # ── A* ───────────────────────────────────────────────────────────────────
+
+    def _astar_arrays(self):
+        """
+        Plain-list copies of the adjacency for the Python A* loop, plus the
+        heuristic scale and the weakly connected components.
+        """
+        if self._astar_state is None:
+            weights = self.edge_weights()
+            # Targets outside the source's weakly connected component are answered
+            # up front instead of by exhausting the search
+            _, component = connected_components(self.csgraph(), directed=True, connection="weak")
+            self._astar_state = (
+                self.offsets.tolist(), self.targets.tolist(), weights.tolist(),
+                self.node_x.tolist(), self.node_y.tolist(), self.heuristic_scale(), component,
+            )
+        return self._astar_state
+
+    def _astar_node_path(self, s, t):
+        offsets, targets, weights, node_x, node_y, scale, component = self._astar_arrays()
+        if component[s] != component[t]:
+            return None
+        tx, ty = node_x[t], node_y[t]
+        dist = {s: 0.0}
+        predecessors = {s: -1}
+        closed = set()
+        heap = [(scale * math.hypot(node_x[s] - tx, node_y[s] - ty), s)]
+
+        while heap:
+            _, u = heapq.heappop(heap)
+            if u == t:
+                break
+            if u in closed:
+                continue
+            closed.add(u)
+            du = dist[u]
+            for pos in range(offsets[u], offsets[u + 1]):
+                v = targets[pos]
+                dv = du + weights[pos]
+                if dv < dist.get(v, math.inf):
+                    dist[v] = dv
+                    predecessors[v] = u
+                    heapq.heappush(heap, (dv + scale * math.hypot(node_x[v] - tx, node_y[v] - ty), v))
+        else:
+            return None
+
+        node_path = [t]
+        while node_path[-1] != s:
+            node_path.append(predecessors[node_path[-1]])
+        node_path.reverse()
+        return node_path
+
+    def _unwind(self, predecessors, s, t):
+        node_path = [t]
+        while node_path[-1] != s:
+            node_path.append(predecessors[node_path[-1]])
+        node_path.reverse()
+        return self.path_to_edge_ids(node_path)
+
+    def shortest_path_edges(self, source, target):
+        """
+        Returns the SUMO edge IDs of a shortest path (by the graph's weight)
+        from source to target.
+
+        Raises KeyError for unknown node IDs and NoPathError if the target is
+        not reachable from the source.
+        """
+        s, t = self.node_index(source), self.node_index(target)
+        if s == t:
+            return []
+
+        if self.uses_astar():
+            node_path = self._astar_node_path(s, t)
+            if node_path is None:
+                raise NoPathError(f"No path between {source} and {target}")
+            return self.path_to_edge_ids(node_path)
+
+        predecessors = self._predecessors_from(s)
+        if predecessors[t] < 0:
+            raise NoPathError(f"No path between {source} and {target}")
+        return self._unwind(predecessors, s, t)
+
+    def shortest_paths_from(self, source, targets):
+        """
+        One-to-many variant of shortest_path_edges: a single traversal from
+        `source` answers every target. With A* enabled and only a few targets,
+        each target is searched separately instead.
+
+        Returns:
+            dict: target → list of edge IDs, or None if unreachable
+        """
+        s = self.node_index(source)
+        target_index = {target: self.node_index(target) for target in targets}
+
+        if self.uses_astar() and len(target_index) <= ASTAR_MAX_TARGETS:
+            paths = {}
+            for target, t in target_index.items():
+                node_path = [s] if t == s else self._astar_node_path(s, t)
+                paths[target] = self.path_to_edge_ids(node_path) if node_path is not None else None
+            return paths
+
+        predecessors = self._predecessors_from(s)
+
+        paths = {}
+        for target, t in target_index.items():
+            if t == s:
+                paths[target] = []
+            elif predecessors[t] < 0:
+                paths[target] = None
+            else:
+                paths[target] = self._unwind(predecessors, s, t)
+        return paths
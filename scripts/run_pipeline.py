@@ -0,0 +1,363 @@
+"""
+run_pipeline.py
+
+Runs the SUMO Swiss network pipeline as a dependency graph of stages
+(see the README's core workflow) instead of one script at a time.
+
+Every stage declares its script, the files it reads and writes, and the stages
+it runs after. A stage is re-run only if it is stale:
+    - one of its outputs is missing or was changed since it was produced, or
+    - the content hash of its script, of a local module the script imports
+      (directly or transitively, from scripts/), or of any input differs
+      from its last run.
+File hashes are cached by (size, mtime) in the state file, so unchanged
+inputs are not re-read. Because staleness is decided on content, an upstream
+stage that re-runs but produces identical outputs does not invalidate the
+stages below it.
+
+Independent branches (network build, stop mapping, vehicle merge) run
+concurrently; a per-stage timing table is printed at the end.
+
+Usage (from the project root):
+    python scripts/run_pipeline.py                 # run stale stages
+    python scripts/run_pipeline.py --dry-run       # only report what is stale
+    python scripts/run_pipeline.py --only netconvert routes
+    python scripts/run_pipeline.py --force --jobs 2
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import argparse
+import hashlib
+import logging
+import subprocess
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from geo_table import resolve_geo_table
+from file_hash import file_sha1
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────────────────────────────────────
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SCRIPTS_DIR)
+STATE_FILE = "data/.pipeline_state.json"
+STATE_VERSION = 1
+
+# Named rail tables (edge_id_human etc.) derived from the extract outputs; read as
+# their .parquet sibling unless the .csv is newer (see geo_table.resolve_geo_table)
+RAIL_NODES_NAMED = "data/Swiss/processed/rail_nodes_named.csv"
+RAIL_EDGES_NAMED = "data/Swiss/processed/rail_edges_named.csv"
+GEO_TABLE_INPUTS = (RAIL_NODES_NAMED, RAIL_EDGES_NAMED)
+
+Stage = namedtuple("Stage", ["name", "script", "inputs", "outputs", "after"])
+
+STAGES = [
+    Stage("extract", "extract_nodes_and_edges.py",
+          inputs=["data/Swiss/raw/swissTNE_Base_20240507.gpkg"],
+          outputs=["data/Swiss/processed/rail_nodes.parquet", "data/Swiss/processed/rail_edges.parquet"],
+          after=[]),
+    Stage("write_nodes", "write_sumo_nodes.py",
+          inputs=[RAIL_NODES_NAMED],
+          outputs=["SUMO/input/april_2025_swiss.nod.xml"],
+          after=["extract"]),
+    Stage("write_edges", "write_sumo_edges.py",
+          inputs=[RAIL_EDGES_NAMED],
+          outputs=["SUMO/input/april_2025_swiss.edg.xml"],
+          after=["extract"]),
+    Stage("write_connections", "write_empty_connections.py",
+          inputs=[],
+          outputs=["SUMO/input/april_2025_swiss.con.xml"],
+          after=[]),
+    Stage("netconvert", "generate_net_with_netconvert.py",
+          inputs=["SUMO/input/april_2025_swiss.nod.xml", "SUMO/input/april_2025_swiss.edg.xml",
+                  "SUMO/input/april_2025_swiss.con.xml"],
+          outputs=["SUMO/input/april_2025_swiss.net.xml"],
+          after=["write_nodes", "write_edges", "write_connections"]),
+    Stage("stop_mapping", "generate_stop_node_mapping.py",
+          inputs=["data/Swiss/raw/gtfs/stops.txt", RAIL_NODES_NAMED],
+          outputs=["data/Swiss/interim/stop_mappings/stop_id_to_node_id.csv",
+                   "data/Swiss/interim/stop_mappings/stop_id_to_node_candidates.csv"],
+          after=["extract"]),
+    Stage("refine_stop_mapping", "diagnostics/refine_stop_node_mapping_and_debug.py",
+          inputs=["data/Swiss/interim/stop_mappings/stop_id_to_node_id.csv", "data/Swiss/raw/gtfs/stops.txt",
+                  "data/Swiss/raw/haltestellen_2025.csv", RAIL_NODES_NAMED],
+          outputs=["data/Swiss/interim/stop_mappings/stop_id_to_node_id_refined.csv"],
+          after=["stop_mapping"]),
+    Stage("train_stops", "generate_train_stops.py",
+          inputs=["data/Swiss/raw/gtfs/stops.txt", RAIL_EDGES_NAMED, "SUMO/input/april_2025_swiss.net.xml"],
+          outputs=["SUMO/input/april_2025_swiss.stops.add.xml",
+                   "data/Swiss/interim/stop_mappings/stop_id_to_edge.csv"],
+          after=["extract", "netconvert"]),
+    Stage("vehicles", "merge_vehicle_data.py",
+          inputs=["data/raw/swiss/jahresformation.csv", "data/raw/swiss/rollmaterial.csv",
+                  "data/raw/swiss/rollmaterial-matching.csv"],
+          outputs=["data/processed/merged_jahresformation_with_vehicles.csv"],
+          after=[]),
+    Stage("routes", "parse_gtfs_to_route_edge_map.py",
+          inputs=["SUMO/input/april_2025_swiss.net.xml",
+                  "data/Swiss/interim/stop_mappings/stop_id_to_node_id_refined.csv",
+                  "data/Swiss/raw/gtfs/stop_times.txt"],
+          outputs=["data/Swiss/processed/routes/route_edge_map.csv"],
+          after=["netconvert", "refine_stop_mapping"]),
+]
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Logging setup
+# ─────────────────────────────────────────────────────────────────────────────
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# State + hashing
+# ─────────────────────────────────────────────────────────────────────────────
+
+class PipelineState:
+    """Per-stage fingerprints and a (size, mtime)-keyed file hash cache, persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        data = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if data.get("version") != STATE_VERSION:
+            data = {}
+        self.stages = data.get("stages", {})
+        self.hashes = data.get("hashes", {})
+
+    def file_hash(self, path):
+        """Content hash of path (None if missing), reusing the cached hash while size and mtime match."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self.hashes.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha1"]
+        digest = file_sha1(path)
+        with self._lock:
+            self.hashes[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest}
+        return digest
+
+    def record(self, name, fingerprint, output_hashes):
+        with self._lock:
+            self.stages[name] = {"fingerprint": fingerprint, "outputs": output_hashes}
+
+    def save(self):
+        """Writes the state atomically; the lock is held until the file is in place."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            payload = json.dumps({"version": STATE_VERSION, "stages": self.stages, "hashes": self.hashes}, indent=2)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+
+def input_file(path):
+    """
+    The file a stage actually reads for a declared input: the named rail
+    tables resolve to their .parquet or .csv sibling as in read_geo_table.
+    """
+    return resolve_geo_table(path) if path in GEO_TABLE_INPUTS else path
+
+def local_modules(script_path):
+    """
+    Source files of the modules script_path imports from scripts/ (or its own
+    folder), followed transitively. Imports are read from the AST, so nothing
+    is executed; third-party and standard-library modules are ignored.
+    """
+    found, pending = [], [script_path]
+    while pending:
+        path = pending.pop()
+        try:
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError):
+            continue
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.add(node.module.split(".")[0])
+        for name in sorted(names):
+            for folder in (SCRIPTS_DIR, os.path.dirname(path)):
+                module_path = os.path.join(folder, f"{name}.py")
+                if os.path.isfile(module_path) and module_path != script_path and module_path not in found:
+                    found.append(module_path)
+                    pending.append(module_path)
+                    break
+    return sorted(found)
+
+def stage_fingerprint(stage, state):
+    """
+    Hash over the stage script, the local modules it imports and all of its
+    inputs (missing inputs hash as None).
+    """
+    digest = hashlib.sha1()
+    script_path = os.path.join(SCRIPTS_DIR, stage.script)
+    sources = [script_path] + local_modules(script_path)
+    for path in sources + [input_file(path) for path in stage.inputs]:
+        digest.update(f"{path}\0{state.file_hash(path)}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+def stale_reason(stage, state, fingerprint):
+    """Returns why the stage must run, or None if it is up to date."""
+    previous = state.stages.get(stage.name)
+    if previous is None:
+        return "never run"
+    if previous["fingerprint"] != fingerprint:
+        return "script, imported modules or inputs changed"
+    for path in stage.outputs:
+        if state.file_hash(path) is None:
+            return f"missing output {path}"
+        if previous["outputs"].get(path) != state.file_hash(path):
+            return f"output {path} modified"
+    return None
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Execution
+# ─────────────────────────────────────────────────────────────────────────────
+
+StageResult = namedtuple("StageResult", ["name", "status", "seconds", "detail"])
+
+def run_stage(stage, state, force=False, dry_run=False):
+    """Checks staleness and runs the stage script as a subprocess. Returns a StageResult."""
+    missing = [path for path in stage.inputs if not os.path.exists(input_file(path))]
+    if missing:
+        return StageResult(stage.name, "failed", 0.0, f"missing input {missing[0]}")
+
+    fingerprint = stage_fingerprint(stage, state)
+    reason = "forced" if force else stale_reason(stage, state, fingerprint)
+    if reason is None:
+        return StageResult(stage.name, "up to date", 0.0, "")
+    if dry_run:
+        return StageResult(stage.name, "stale", 0.0, reason)
+
+    logging.info(f"▶️ {stage.name}: running {stage.script} ({reason})")
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, stage.script)])
+    seconds = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        return StageResult(stage.name, "failed", seconds, f"exit code {completed.returncode}")
+    missing = [path for path in stage.outputs if not os.path.exists(path)]
+    if missing:
+        return StageResult(stage.name, "failed", seconds, f"did not produce {missing[0]}")
+
+    state.record(stage.name, fingerprint, {path: state.file_hash(path) for path in stage.outputs})
+    return StageResult(stage.name, "ran", seconds, reason)
+
+def select_stages(stages, only):
+    """Restricts the graph to the named stages; their upstream stages are still checked."""
+    if not only:
+        return stages
+    by_name = {stage.name: stage for stage in stages}
+    unknown = set(only) - set(by_name)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+
+    selected, pending = set(), list(only)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].after)
+    return [stage for stage in stages if stage.name in selected]
+
+def run_pipeline(stages=STAGES, jobs=3, force=False, dry_run=False, only=None):
+    """
+    Runs stages in dependency order, independent stages concurrently.
+    A stage whose upstream failed is reported as blocked.
+
+    Returns:
+        list[StageResult] in declaration order
+    """
+    stages = select_stages(stages, only)
+    state = PipelineState(STATE_FILE)
+    names = {stage.name for stage in stages}
+    waiting = {stage.name: stage for stage in stages}
+    results = {}
+    running = {}
+
+    def ready(stage):
+        return all(dep in results or dep not in names for dep in stage.after)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while waiting or running:
+            for name, stage in list(waiting.items()):
+                if not ready(stage):
+                    continue
+                del waiting[name]
+                failed_dep = next((dep for dep in stage.after
+                                   if dep in results and results[dep].status in ("failed", "blocked")), None)
+                if failed_dep:
+                    results[name] = StageResult(name, "blocked", 0.0, f"upstream {failed_dep} failed")
+                    continue
+                stale_dep = next((dep for dep in stage.after
+                                  if dep in results and results[dep].status == "stale"), None)
+                if dry_run and stale_dep:
+                    results[name] = StageResult(name, "stale", 0.0, f"upstream {stale_dep} stale")
+                    continue
+                # Forcing applies to the stages that were asked for (all, if none were named)
+                stage_force = force and (not only or name in only)
+                running[pool.submit(run_stage, stage, state, stage_force, dry_run)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results[running.pop(future)] = result
+                if result.status == "ran":
+                    # Saved from the scheduler thread only, after each finished stage
+                    state.save()
+                if result.status == "failed":
+                    logging.error(f"❌ {result.name}: {result.detail}")
+
+    return [results[stage.name] for stage in stages]
+
+def print_timing_table(results):
+    print("\n📊 Pipeline summary:\n")
+    width = max(len(result.name) for result in results)
+    print(f"  {'stage'.ljust(width)}  {'status':<10}  {'seconds':>8}  detail")
+    for result in results:
+        print(f"  {result.name.ljust(width)}  {result.status:<10}  {result.seconds:>8.1f}  {result.detail}")
+    print(f"\n  Total stage time: {sum(result.seconds for result in results):.1f}s\n")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Main
+# ─────────────────────────────────────────────────────────────────────────────
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the SUMO Swiss network pipeline, re-running only stale stages.")
+    parser.add_argument("--only", nargs="+", metavar="STAGE",
+                        help=f"Run only these stages (and check their upstream). Stages: {', '.join(s.name for s in STAGES)}")
+    parser.add_argument("--jobs", type=int, default=3, help="Stages to run concurrently (default: 3)")
+    parser.add_argument("--force", action="store_true", help="Re-run the selected stages even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.chdir(PROJECT_ROOT)  # stage scripts use project-relative paths
+    start = time.perf_counter()
+    results = run_pipeline(jobs=args.jobs, force=args.force, dry_run=args.dry_run, only=args.only)
+    print_timing_table(results)
+    logging.info(f"🏁 Pipeline finished in {time.perf_counter() - start:.1f}s")
+    sys.exit(1 if any(result.status in ("failed", "blocked") for result in results) else 0)
@@ -15,6 +15,7 @@ Author: Onur Deniz
 """
 import os
 import logging
+import numpy as np
 import pandas as pd
 from shapely.geometry import LineString, Point
 
@@ -43,6 +44,29 @@ def extract_midpoint_coords(geo_shape_str):
         logger.warning(f"Failed to parse geometry: {e}")
         return None, None
 
+def build_candidate_index(df_nodes):
+    """
+    Groups the node table once into {(Linie, stop_abbr): (xy, physical_node_ids)}
+    so each segment looks up its candidates by hash instead of filtering df_nodes.
+    """
+    df_nodes = df_nodes.dropna(subset=['Linie', 'stop_abbr'])
+    xy = df_nodes[['x', 'y']].astype(float).to_numpy()
+    node_ids = df_nodes['physical_node_id'].to_numpy(dtype=object)
+
+    index = {}
+    for key, positions in df_nodes.groupby(['Linie', 'stop_abbr'], sort=False).indices.items():
+        index[key] = (xy[positions], node_ids[positions])
+    return index
+
+def find_nearest(candidate_index, linie, stop_abbr, mid_x, mid_y):
+    """Closest candidate node to the segment midpoint (None if the line has no such stop)."""
+    candidates = candidate_index.get((linie, stop_abbr))
+    if candidates is None:
+        return None
+    xy, node_ids = candidates
+    dist = np.hypot(xy[:, 0] - mid_x, xy[:, 1] - mid_y)
+    return node_ids[np.argmin(np.where(np.isnan(dist), np.inf, dist))]
+
 def main():
     logger.info("\U0001F4C5 Loading input files...")
 
@@ -57,30 +81,17 @@ def main():
     df_nodes['Linie'] = df_nodes['Linie'].astype(str)
 
     logger.info("\U0001F517 Finding closest anchor nodes for each segment...")
+    candidate_index = build_candidate_index(df_nodes)
     records = []
 
-    for idx, row in df_segments.iterrows():
-        start_op, end_op, linie, shape_str = row['START_OP'], row['END_OP'], str(row['Linie']), row['Geo shape']
+    for start_op, end_op, linie, shape_str in df_segments[['START_OP', 'END_OP', 'Linie', 'Geo shape']].itertuples(index=False):
+        linie = str(linie)
         mid_x, mid_y = extract_midpoint_coords(shape_str)
         if mid_x is None:
             continue
 
-        # Candidates filtered by Linie number
-        candidates = df_nodes[df_nodes['Linie'] == linie]
-        if candidates.empty:
-            continue
-
-        start_candidates = candidates[candidates['stop_abbr'] == start_op]
-        end_candidates = candidates[candidates['stop_abbr'] == end_op]
-
-        def find_nearest(candidates_df):
-            candidates_df = candidates_df.copy()
-            candidates_df[['x', 'y']] = candidates_df[['x', 'y']].astype(float)
-            candidates_df['dist'] = ((candidates_df['x'] - mid_x)**2 + (candidates_df['y'] - mid_y)**2)**0.5
-            return candidates_df.sort_values('dist').iloc[0]['physical_node_id'] if not candidates_df.empty else None
-
-        node_start = find_nearest(start_candidates)
-        node_end = find_nearest(end_candidates)
+        node_start = find_nearest(candidate_index, linie, start_op, mid_x, mid_y)
+        node_end = find_nearest(candidate_index, linie, end_op, mid_x, mid_y)
 
         if node_start and node_end:
             records.append({
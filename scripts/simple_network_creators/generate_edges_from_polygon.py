@@ -18,11 +18,14 @@ Author: Onur Deniz
 """
 
 import os
+import sys
 import logging
 import pandas as pd
 import json
 from shapely.geometry import LineString
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sumo_xml_writer import SumoXmlWriter
 
 # =============================
 # CONFIGURATION
@@ -45,6 +48,51 @@ def parse_geometry(geo_str):
         logger.warning(f"Failed to parse geometry: {e}")
         return None
 
+def build_anchor_index(df_anchor):
+    """Maps (Linie, START_OP, END_OP) → (START_NODE, END_NODE); the first anchor row wins."""
+    keys = ['Linie', 'START_OP', 'END_OP']
+    df_anchor = df_anchor.dropna(subset=keys).drop_duplicates(subset=keys, keep='first')
+    return {
+        (linie, start_op, end_op): (start_node, end_node)
+        for linie, start_op, end_op, start_node, end_node
+        in df_anchor[keys + ['START_NODE', 'END_NODE']].itertuples(index=False)
+    }
+
+def segment_edges(linie, start_op, end_op, start_node, end_node, coords):
+    """Yields the edge attributes for one polygon segment, first to last."""
+    coord_count = len(coords)
+
+    # First edge (start node)
+    yield {
+        'id': start_node,
+        'from': start_node,
+        'to': f"{linie}_{start_op}_{end_op}_1",
+        'priority': '1',
+        'type': 'rail',
+        'shape': f"{coords[0][0]},{coords[0][1]} {coords[1][0]},{coords[1][1]}"
+    }
+
+    # Intermediate edges
+    for i in range(1, coord_count - 2):
+        yield {
+            'id': f"{linie}_{start_op}_{end_op}_{i}",
+            'from': f"{linie}_{start_op}_{end_op}_{i}",
+            'to': f"{linie}_{start_op}_{end_op}_{i+1}",
+            'priority': '1',
+            'type': 'rail',
+            'shape': f"{coords[i][0]},{coords[i][1]} {coords[i+1][0]},{coords[i+1][1]}"
+        }
+
+    # Last edge (end node)
+    yield {
+        'id': end_node,
+        'from': f"{linie}_{start_op}_{end_op}_{coord_count - 2}",
+        'to': end_node,
+        'priority': '1',
+        'type': 'rail',
+        'shape': f"{coords[-2][0]},{coords[-2][1]} {coords[-1][0]},{coords[-1][1]}"
+    }
+
 def generate_edges():
     logger.info("📥 Reading input files...")
     df_poly = pd.read_csv(POLYGON_CSV, sep=';', dtype=str)
@@ -53,85 +101,38 @@ def generate_edges():
     df_poly['Linie'] = df_poly['Linie'].astype(str)
     df_anchor['Linie'] = df_anchor['Linie'].astype(str)
 
-    edge_elem = Element('edges')
+    anchor_index = build_anchor_index(df_anchor)
+
     edge_count = 0
     skipped = 0
 
     logger.info("🧠 Generating edge XML...")
-    for _, row in df_poly.iterrows():
-        linie = row['Linie']
-        start_op = row['START_OP']
-        end_op = row['END_OP']
-        shape = parse_geometry(row['Geo shape'])
-
-        if shape is None or len(shape.coords) < 2:
-            skipped += 1
-            continue
-
-        match = df_anchor[(df_anchor['Linie'] == linie) &
-                          (df_anchor['START_OP'] == start_op) &
-                          (df_anchor['END_OP'] == end_op)]
-
-        if match.empty:
-            logger.warning(f"⚠️ No anchor match for {linie} {start_op}->{end_op}")
-            skipped += 1
-            continue
-
-        start_node = match.iloc[0]['START_NODE']
-        end_node = match.iloc[0]['END_NODE']
-
-        coords = list(shape.coords)
-        coord_count = len(coords)
-
-        # First edge (start node)
-        edge_id = start_node
-        edge_shape = f"{coords[0][0]},{coords[0][1]} {coords[1][0]},{coords[1][1]}"
-        SubElement(edge_elem, 'edge', {
-            'id': edge_id,
-            'from': start_node,
-            'to': f"{linie}_{start_op}_{end_op}_1",
-            'priority': '1',
-            'type': 'rail',
-            'shape': edge_shape
-        })
-        edge_count += 1
-
-        # Intermediate edges
-        for i in range(1, coord_count - 2):
-            edge_id = f"{linie}_{start_op}_{end_op}_{i}"
-            edge_shape = f"{coords[i][0]},{coords[i][1]} {coords[i+1][0]},{coords[i+1][1]}"
-            SubElement(edge_elem, 'edge', {
-                'id': edge_id,
-                'from': f"{linie}_{start_op}_{end_op}_{i}",
-                'to': f"{linie}_{start_op}_{end_op}_{i+1}",
-                'priority': '1',
-                'type': 'rail',
-                'shape': edge_shape
-            })
-            edge_count += 1
-
-        # Last edge (end node)
-        last_intermediate = f"{linie}_{start_op}_{end_op}_{coord_count - 2}"
-        edge_id = end_node
-        edge_shape = f"{coords[-2][0]},{coords[-2][1]} {coords[-1][0]},{coords[-1][1]}"
-        SubElement(edge_elem, 'edge', {
-            'id': edge_id,
-            'from': last_intermediate,
-            'to': end_node,
-            'priority': '1',
-            'type': 'rail',
-            'shape': edge_shape
-        })
-        edge_count += 1
-
-    logger.info(f"✅ Edges written: {edge_count}")
-    logger.info(f"⚠️ Skipped segments due to missing data: {skipped}")
-
     try:
-        ElementTree(edge_elem).write(OUTPUT_EDGE_XML, encoding='utf-8', xml_declaration=True)
-        logger.info(f"📄 SUMO edge XML saved to: {OUTPUT_EDGE_XML}")
+        with SumoXmlWriter(OUTPUT_EDGE_XML, 'edges') as xml:
+            for linie, start_op, end_op, geo_shape in df_poly[['Linie', 'START_OP', 'END_OP', 'Geo shape']].itertuples(index=False):
+                shape = parse_geometry(geo_shape)
+
+                if shape is None or len(shape.coords) < 2:
+                    skipped += 1
+                    continue
+
+                anchor = anchor_index.get((linie, start_op, end_op))
+                if anchor is None:
+                    logger.warning(f"⚠️ No anchor match for {linie} {start_op}->{end_op}")
+                    skipped += 1
+                    continue
+
+                start_node, end_node = anchor
+                for attrib in segment_edges(linie, start_op, end_op, start_node, end_node, list(shape.coords)):
+                    xml.element('edge', attrib)
+                    edge_count += 1
     except Exception as e:
         logger.error(f"Failed to write edge XML: {e}")
+        return
+
+    logger.info(f"✅ Edges written: {edge_count}")
+    logger.info(f"⚠️ Skipped segments due to missing data: {skipped}")
+    logger.info(f"📄 SUMO edge XML saved to: {OUTPUT_EDGE_XML}")
 
 if __name__ == "__main__":
     generate_edges()
@@ -23,10 +23,13 @@ Author: Onur Deniz
 """
 
 import os
+import sys
 import logging
 import pandas as pd
-from pyproj import Transformer
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from projection import transform_xy, WGS84, UTM_32N
+from sumo_xml_writer import SumoXmlWriter
 
 # =============================
 # CONFIGURATION
@@ -37,21 +40,14 @@ OUTPUT_NOD_XML = r"D:/PhD/prog_report_2025_June_project/SUMO/input/simpler Swiss
 OUTPUT_CSV_ENRICHED = r"D:/PhD/prog_report_2025_June_project/SUMO/input/simpler Swiss/simple_stops_edges_with_linie.csv"
 OUTPUT_CSV_CLEANED = r"D:/PhD/prog_report_2025_June_project/SUMO/input/simpler Swiss/simple_stops_edges_cleaned.csv"
 
-# Set up coordinate transformer (WGS84 -> UTM Zone 32N)
-transformer = Transformer.from_crs("epsg:4326", "epsg:32632", always_xy=True)
-
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def convert_to_utm(lon: float, lat: float) -> tuple:
-    """Convert WGS84 lat/lon to UTM (zone 32N)."""
-    try:
-        x, y = transformer.transform(lon, lat)
-        return round(x, 2), round(y, 2)
-    except Exception as e:
-        logger.error(f"Coordinate conversion failed for ({lat}, {lon}): {e}")
-        raise
+def convert_to_utm(lon, lat):
+    """Convert WGS84 lon/lat arrays to UTM (zone 32N) in one call, rounded to cm."""
+    x, y = transform_xy(lon, lat, WGS84, UTM_32N)
+    return x.round(2), y.round(2)
 
 def generate_nodes():
     """
@@ -96,7 +92,7 @@ def generate_nodes():
     logger.info(f"✅ Linie values merged into simple_stops_edges.csv (non-null: {df['Linie'].notna().sum()})")
 
     logger.info("🧭 Converting WGS84 coordinates to UTM...")
-    df[['x', 'y']] = df.apply(lambda row: pd.Series(convert_to_utm(row['lon'], row['lat'])), axis=1)
+    df['x'], df['y'] = convert_to_utm(df['lon'].to_numpy(), df['lat'].to_numpy())
 
     logger.info(f"✍️ Writing enriched CSV to: {OUTPUT_CSV_ENRICHED}")
     df.to_csv(OUTPUT_CSV_ENRICHED, index=False)
@@ -113,17 +109,10 @@ def generate_nodes():
 
     logger.info("🧱 Creating .nod.xml for SUMO with unique nodes...")
     unique_nodes = df_exploded.drop_duplicates(subset=['physical_node_id', 'x', 'y'])
-    nodes_elem = Element('nodes')
-    for _, row in unique_nodes.iterrows():
-        SubElement(nodes_elem, 'node', {
-            'id': row['physical_node_id'],
-            'x': str(row['x']),
-            'y': str(row['y']),
-            'type': 'priority'
-        })
-
     try:
-        ElementTree(nodes_elem).write(OUTPUT_NOD_XML, encoding='utf-8', xml_declaration=True)
+        with SumoXmlWriter(OUTPUT_NOD_XML, 'nodes') as xml:
+            xml.dataframe('node', unique_nodes.assign(type='priority'),
+                          {'id': 'physical_node_id', 'x': 'x', 'y': 'y', 'type': 'type'})
         logger.info(f"📄 Node file written to: {OUTPUT_NOD_XML}")
     except Exception as e:
         logger.error(f"Failed to write .nod.xml file: {e}")
@@ -17,11 +17,15 @@ Author: Onur Deniz
 """
 
 import os
+import sys
 import logging
+import numpy as np
 import pandas as pd
 import json
-from pyproj import Transformer
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from projection import transform_linestrings, split_linestrings, WGS84, UTM_32N
+from sumo_xml_writer import SumoXmlWriter
 
 # =============================
 # CONFIGURATION
@@ -30,20 +34,31 @@ INPUT_ANCHORS = r"D:/PhD/prog_report_2025_June_project/data/Swiss/processed/simp
 INPUT_POLYGONS = r"D:/PhD/prog_report_2025_June_project/data/Swiss/raw/linie_mit_polygon.csv"
 OUTPUT_EDGES = r"D:/PhD/prog_report_2025_June_project/SUMO/input/simpler Swiss/simplified_network.edg.xml"
 
-# Set up coordinate transformer (WGS84 -> UTM Zone 32N)
-transformer = Transformer.from_crs("epsg:4326", "epsg:32632", always_xy=True)
-
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def convert_linestring_to_utm(coords):
-    """Convert a list of [lon, lat] pairs to UTM"""
-    utm_coords = []
-    for lon, lat in coords:
-        x, y = transformer.transform(lon, lat)
-        utm_coords.append(f"{round(x, 2)},{round(y, 2)}")
-    return utm_coords
+def parse_coordinates(geo_shape):
+    """Extract the [lon, lat] vertex list from a GeoJSON-style shape string."""
+    geo = json.loads(geo_shape.replace("'", '"'))
+    coords = geo.get('coordinates', [])
+
+    # Fix cases where nested lists are returned
+    if isinstance(coords[0][0], list):
+        coords = coords[0]
+
+    coords = np.asarray(coords, dtype=float)
+    if coords.ndim != 2 or coords.shape[1] != 2:
+        raise ValueError(f"expected [lon, lat] pairs, got array of shape {coords.shape}")
+    return coords
+
+def convert_linestrings_to_utm(coord_lists):
+    """Convert many lists of [lon, lat] pairs to UTM shape strings with one projection call."""
+    offsets, xy = transform_linestrings(coord_lists, WGS84, UTM_32N)
+    return [
+        " ".join(f"{round(x, 2)},{round(y, 2)}" for x, y in part.tolist())
+        for part in split_linestrings(offsets, xy)
+    ]
 
 def generate_edges():
     logger.info("\U0001F4C5 Reading anchor and polygon datasets...")
@@ -64,36 +79,30 @@ def generate_edges():
     df = pd.merge(df_poly, df_anchor, on=['Linie', 'START_OP', 'END_OP'], how='inner')
     logger.info(f"✅ Total segments to export: {len(df)}")
 
-    # Start XML
-    edges_elem = Element('edges')
-
-    for _, row in df.iterrows():
-        edge_id = f"{row['Linie']}_{row['START_NODE']}_{row['END_NODE']}"
-
+    # Parse every shape first, then project all vertices at once
+    segments, coord_lists = [], []
+    for linie, start_node, end_node, geo_shape in df[['Linie', 'START_NODE', 'END_NODE', 'Geo shape']].itertuples(index=False):
+        edge_id = f"{linie}_{start_node}_{end_node}"
         try:
-            geo = json.loads(row['Geo shape'].replace("'", '"'))
-            coords = geo.get('coordinates', [])
-
-            # Fix cases where nested lists are returned
-            if isinstance(coords[0][0], list):
-                coords = coords[0]
-
-            shape = convert_linestring_to_utm(coords)
-            shape_str = " ".join(shape)
-
-            SubElement(edges_elem, 'edge', {
-                'id': edge_id,
-                'from': row['START_NODE'],
-                'to': row['END_NODE'],
-                'priority': "1",
-                'type': "rail",
-                'shape': shape_str
-            })
+            coord_lists.append(parse_coordinates(geo_shape))
+            segments.append((edge_id, start_node, end_node))
         except Exception as e:
             logger.warning(f"⚠️ Failed to parse shape for {edge_id}: {e}")
 
+    logger.info(f"\U0001F9ED Projecting {len(coord_lists)} shapes to UTM...")
+    shape_strs = convert_linestrings_to_utm(coord_lists)
+
     try:
-        ElementTree(edges_elem).write(OUTPUT_EDGES, encoding='utf-8', xml_declaration=True)
+        with SumoXmlWriter(OUTPUT_EDGES, 'edges') as xml:
+            for (edge_id, start_node, end_node), shape_str in zip(segments, shape_strs):
+                xml.element('edge', {
+                    'id': edge_id,
+                    'from': start_node,
+                    'to': end_node,
+                    'priority': "1",
+                    'type': "rail",
+                    'shape': shape_str
+                })
         logger.info(f"📄 Edge file written to: {OUTPUT_EDGES}")
     except Exception as e:
         logger.error(f"❌ Failed to write .edg.xml file: {e}")
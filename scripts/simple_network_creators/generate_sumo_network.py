@@ -10,14 +10,22 @@ Inputs:
 
 Output:
 - simplified_network.net.xml: Final SUMO network file
+- simplified_network.net.xml.build.json: input hashes and build timings
+
+netconvert is skipped when nodes, edges and options are unchanged.
 
 Author: Onur Deniz
 """
 
 import os
+import sys
+import argparse
 import subprocess
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from netconvert_build import run_netconvert
+
 # ==========================
 # CONFIGURATION
 # ==========================
@@ -30,22 +38,23 @@ OUTPUT_NET = os.path.join(INPUT_DIR, "simplified_network.net.xml")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def run_netconvert():
-    """Runs the netconvert command to generate SUMO network from nodes and edges."""
+NETCONVERT_OPTIONS = [
+    "--geometry.remove",               # Optional cleanup of redundant geometry
+    "--junctions.corner-detail=1",     # Simplify junction geometry
+    "--verbose"
+]
+
+def generate_network(force=False):
+    """Runs netconvert (if inputs changed) to generate SUMO network from nodes and edges."""
     logger.info("🚀 Starting SUMO network generation via netconvert...")
 
-    cmd = [
-        "netconvert",
-        f"--node-files={NODES_FILE}",
-        f"--edge-files={EDGES_FILE}",
-        f"--output-file={OUTPUT_NET}",
-        "--geometry.remove",               # Optional cleanup of redundant geometry
-        "--junctions.corner-detail=1",     # Simplify junction geometry
-        "--verbose"
-    ]
+    inputs = {"node-files": NODES_FILE, "edge-files": EDGES_FILE}
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        result = run_netconvert(inputs, OUTPUT_NET, NETCONVERT_OPTIONS, force=force, capture_output=True)
+        if result.skipped:
+            logger.info("✅ Network is up to date — nothing to do.")
+            return
         logger.info("✅ Network generation completed successfully.")
         print(result.stdout)
     except subprocess.CalledProcessError as e:
@@ -53,5 +62,10 @@ def run_netconvert():
         print("--- NETCONVERT ERROR ---")
         print(e.stderr)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the simplified SUMO network with netconvert.")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if inputs are unchanged")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    run_netconvert()
+    generate_network(force=parse_args().force)
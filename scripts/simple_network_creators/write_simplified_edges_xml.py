@@ -3,10 +3,12 @@
 
 import pandas as pd
 import logging
-import xml.etree.ElementTree as ET
 import os
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sumo_xml_writer import SumoXmlWriter
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Configuration
 # ──────────────────────────────────────────────────────────────────────────────
@@ -44,28 +46,19 @@ def main():
 
     logging.info(f"✅ Loaded {len(df)} simplified edge records")
 
-    # Create XML structure
-    edges_el = ET.Element("edges")
-
-    for _, row in df.iterrows():
-        edge_id = row["edge_id"]
-        from_node = row["from_stop_id"]
-        to_node = row["to_stop_id"]
-        geometry = row["geometry_wkt"]
-
-        edge_el = ET.SubElement(edges_el, "edge", {
-            "id": edge_id,
-            "from": from_node,
-            "to": to_node,
-            "priority": "1",
-            "type": "rail",
-            "shape": _wkt_to_shape(geometry)
-        })
-
-    # Save to XML
-    tree = ET.ElementTree(edges_el)
+    # Stream edges to XML
+    columns = ["edge_id", "from_stop_id", "to_stop_id", "geometry_wkt"]
     try:
-        tree.write(OUTPUT_XML, encoding="utf-8", xml_declaration=True)
+        with SumoXmlWriter(OUTPUT_XML, "edges") as xml:
+            for edge_id, from_node, to_node, geometry in df[columns].itertuples(index=False):
+                xml.element("edge", {
+                    "id": edge_id,
+                    "from": from_node,
+                    "to": to_node,
+                    "priority": "1",
+                    "type": "rail",
+                    "shape": _wkt_to_shape(geometry)
+                })
         logging.info(f"✅ XML written successfully to: {OUTPUT_XML}")
     except Exception as e:
         logging.error(f"❌ Failed to write XML file: {e}")
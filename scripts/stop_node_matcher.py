@@ -0,0 +1,183 @@
+"""
+stop_node_matcher.py
+
+Matches GTFS stops to rail network nodes in the network CRS (LV95 metres).
+Stop lon/lat are projected in one vectorized pyproj call, so distances are
+true metric distances instead of degrees scaled by a constant.
+
+The KD-tree over the node x/y is built once per node table and cached next
+to it in `<node_file>.kdtree/` (node ids and coordinates as .npy, the tree
+pickled). Later runs memory-map the arrays and unpickle the tree instead of
+rebuilding it; the cache is reused while the node file's size and mtime
+match its manifest, falling back to the SHA-1 content hash.
+
+All stops are resolved with a single batched k-nearest query, so callers
+get several candidate nodes per stop at once.
+
+Used by:
+    - generate_stop_node_mapping.py
+    - map_gtfs_stops_to_sumo_nodes.py
+    - diagnostics/refine_stop_node_mapping_and_debug.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+import json
+import time
+import pickle
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from geo_table import resolve_geo_table, read_geo_table
+from file_hash import file_sha1
+from projection import WGS84, LV95, transform_xy
+
+INDEX_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+NODE_CRS = LV95
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Index cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+def index_dir_for(node_file):
+    return f"{node_file}.kdtree"
+
+def _read_manifest(index_dir):
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(index_dir, manifest):
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def _is_current(node_file, index_dir, manifest):
+    if not manifest or manifest.get("version") != INDEX_VERSION:
+        return False
+
+    stat = os.stat(node_file)
+    if manifest["size"] != stat.st_size:
+        return False
+    if manifest["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    if manifest["sha1"] == file_sha1(node_file):
+        manifest["mtime_ns"] = stat.st_mtime_ns
+        _write_manifest(index_dir, manifest)
+        return True
+    return False
+
+def build_node_index(node_file, index_dir=None):
+    """Builds the KD-tree over the node table and writes it to the cache. Returns the cache directory."""
+    index_dir = index_dir or index_dir_for(node_file)
+    logging.info(f"🧱 Building KD-tree over rail nodes from {node_file}...")
+    start = time.time()
+
+    nodes = read_geo_table(node_file, columns=["node_id", "x", "y"]).dropna(subset=["x", "y"])
+    node_ids = nodes["node_id"].astype(str).to_numpy(dtype=str)
+    xy = nodes[["x", "y"]].to_numpy(dtype=np.float64)
+    tree = cKDTree(xy)
+
+    tmp_dir = f"{index_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "node_id.npy"), node_ids)
+    np.save(os.path.join(tmp_dir, "node_xy.npy"), xy)
+    with open(os.path.join(tmp_dir, "tree.pkl"), "wb") as f:
+        pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    stat = os.stat(node_file)
+    _write_manifest(tmp_dir, {
+        "version": INDEX_VERSION,
+        "node_file": os.path.abspath(node_file),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": file_sha1(node_file),
+        "nodes": len(node_ids),
+    })
+
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+    logging.info(f"💾 KD-tree over {len(node_ids):,} nodes written to {index_dir} in {time.time() - start:.1f} seconds.")
+    return index_dir
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Matcher
+# ─────────────────────────────────────────────────────────────────────────────
+
+class StopNodeMatcher:
+    """k-nearest node lookup for points in the network CRS."""
+
+    def __init__(self, node_ids, node_xy, tree):
+        self.node_ids = node_ids
+        self.node_xy = node_xy
+        self.tree = tree
+
+    @classmethod
+    def from_node_table(cls, node_file, rebuild=False):
+        """
+        Loads the cached index of node_file (resolved to its .parquet or .csv
+        sibling as in read_geo_table), building it first if missing or stale.
+        """
+        node_file = resolve_geo_table(node_file)
+        index_dir = index_dir_for(node_file)
+        if rebuild or not _is_current(node_file, index_dir, _read_manifest(index_dir)):
+            build_node_index(node_file, index_dir)
+
+        node_ids = np.load(os.path.join(index_dir, "node_id.npy"), mmap_mode="r")
+        node_xy = np.load(os.path.join(index_dir, "node_xy.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "tree.pkl"), "rb") as f:
+            tree = pickle.load(f)
+        logging.info(f"⚡ Loaded KD-tree over {len(node_ids):,} rail nodes from {index_dir}")
+        return cls(node_ids, node_xy, tree)
+
+    def query(self, x, y, k=1, max_distance=np.inf):
+        """
+        Batched k-nearest query for coordinates in the network CRS.
+
+        Returns:
+            (np.ndarray, np.ndarray): (n, k) distances in metres and (n, k) node ids,
+            nearest first. Slots without a node within max_distance hold inf and "".
+        """
+        points = np.column_stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+        distances, indices = self.tree.query(points, k=k, distance_upper_bound=max_distance)
+        distances = distances.reshape(len(points), k)
+        indices = indices.reshape(len(points), k)
+
+        found = indices < len(self.node_ids)
+        node_ids = np.full(indices.shape, "", dtype=self.node_ids.dtype)
+        node_ids[found] = self.node_ids[indices[found]]
+        return distances, node_ids
+
+    def match_stops(self, stops_df, k=1, max_distance=np.inf):
+        """
+        Projects GTFS stops (stop_lon/stop_lat, WGS84) and finds their k nearest nodes.
+
+        Returns:
+            pd.DataFrame: one row per (stop, candidate) with columns
+            stop_id, rank (1 = nearest), node_id, distance_m. Stops without
+            coordinates and candidates beyond max_distance are left out.
+        """
+        stops = stops_df.dropna(subset=["stop_lat", "stop_lon"])
+        x, y = transform_xy(stops["stop_lon"].astype(float), stops["stop_lat"].astype(float), WGS84, NODE_CRS)
+        distances, node_ids = self.query(x, y, k=k, max_distance=max_distance)
+
+        candidates = pd.DataFrame({
+            "stop_id": np.repeat(stops["stop_id"].to_numpy(), k),
+            "rank": np.tile(np.arange(1, k + 1), len(stops)),
+            "node_id": node_ids.ravel(),
+            "distance_m": distances.ravel(),
+        })
+        return candidates[np.isfinite(candidates["distance_m"])].reset_index(drop=True)
+
+def nearest_candidates(candidates):
+    """Keeps the rank-1 candidate of every stop: the classic stop_id → node_id mapping."""
+    return candidates.loc[candidates["rank"] == 1, ["stop_id", "node_id", "distance_m"]].reset_index(drop=True)
@@ -22,6 +22,8 @@ from collections import Counter
 import pandas as pd
 import logging
 
+from net_snapshot import load_net_snapshot
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
 # ─────────────────────────────────────────────────────────────────────────────
@@ -46,22 +48,18 @@ def main():
         return
 
     try:
-        tree = ET.parse(INPUT_NET_PATH)
-        root = tree.getroot()
+        # Internal junctions/edges are kept so the counts cover the full net
+        net = load_net_snapshot(INPUT_NET_PATH)
     except ET.ParseError as e:
         logging.error(f"❌ Failed to parse .net.xml: {e}")
         return
 
-    nodes, edges = [], []
-
-    for elem in root:
-        if elem.tag == "junction":
-            nodes.append(elem.attrib)
-        elif elem.tag == "edge" and "id" in elem.attrib:
-            edges.append(elem.attrib)
-
-    df_nodes = pd.DataFrame(nodes)
-    df_edges = pd.DataFrame(edges)
+    df_nodes = pd.DataFrame({"id": net.junction_id, "type": net.junction_type})
+    df_edges = pd.DataFrame({
+        "id": net.edge_id,
+        "from": pd.Series(net.edge_from).replace("", None),
+        "to": pd.Series(net.edge_to).replace("", None),
+    })
 
     # ─────────────────────────────────────────────────────────────────────────
     # Summary
@@ -0,0 +1,25 @@
+"""
+sumo_ids.py
+
+SUMO-safe element IDs shared by the network writers and the stop snapper.
+Import-only: no logging setup or other side effects at import time.
+
+Used by:
+    - write_sumo_edges.py
+    - edge_snapper.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import re
+
+def sanitize_edge_id(edge_id: str) -> str:
+    """
+    Makes edge IDs safe for SUMO by replacing or removing invalid characters.
+    """
+    edge_id = str(edge_id)
+    edge_id = edge_id.replace("&", "and")
+    edge_id = re.sub(r"[ ,:()\.\\/\"']", "_", edge_id)
+    edge_id = re.sub(r"__+", "_", edge_id)  # Collapse multiple underscores
+    return edge_id.strip("_")
@@ -0,0 +1,104 @@
+"""
+sumo_net_reader.py
+
+Streaming reader for compiled SUMO .net.xml files.
+Walks the file with ElementTree.iterparse and yields junctions and edges as
+lightweight records, clearing each element once it has been read. Peak memory
+stays flat regardless of network size because the DOM is never built.
+
+Internal edges (function="internal") and internal junctions are skipped unless
+explicitly requested.
+
+Used by:
+    - net_snapshot.py (which the routing and validation scripts load from)
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Records
+# ─────────────────────────────────────────────────────────────────────────────
+
+NetJunction = namedtuple("NetJunction", ["id", "type", "x", "y"])
+NetEdge = namedtuple("NetEdge", ["id", "from_node", "to_node", "function", "length", "shape"])
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _to_float(value):
+    return float(value) if value is not None else float("nan")
+
+def _junction_record(elem):
+    return NetJunction(
+        id=elem.get("id"),
+        type=elem.get("type"),
+        x=_to_float(elem.get("x")),
+        y=_to_float(elem.get("y")),
+    )
+
+def _edge_record(elem):
+    # Length lives on the lanes; the first lane is representative for rail edges
+    lane = elem.find("lane")
+    length = _to_float(lane.get("length")) if lane is not None else float("nan")
+    shape = elem.get("shape")
+    if shape is None and lane is not None:
+        shape = lane.get("shape")
+    return NetEdge(
+        id=elem.get("id"),
+        from_node=elem.get("from"),
+        to_node=elem.get("to"),
+        function=elem.get("function"),
+        length=length,
+        shape=shape,
+    )
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Readers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def iter_net(net_file, include_internal=False):
+    """
+    Yields NetJunction and NetEdge records in document order.
+
+    Only top-level <junction> and <edge> elements are reported; lanes,
+    connections and other children are discarded as soon as they close.
+    """
+    context = ET.iterparse(net_file, events=("start", "end"))
+    _, root = next(context)
+    depth = 1
+
+    for event, elem in context:
+        if event == "start":
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue  # still inside a top-level element (e.g. <lane>)
+
+        if elem.tag == "edge" and "id" in elem.attrib:
+            if include_internal or elem.get("function") != "internal":
+                yield _edge_record(elem)
+        elif elem.tag == "junction" and "id" in elem.attrib:
+            if include_internal or elem.get("type") != "internal":
+                yield _junction_record(elem)
+
+        # Drop the finished subtree so the root never accumulates children
+        root.clear()
+
+def iter_edges(net_file, include_internal=False):
+    """Yields NetEdge records only."""
+    for record in iter_net(net_file, include_internal):
+        if isinstance(record, NetEdge):
+            yield record
+
+def iter_junctions(net_file, include_internal=False):
+    """Yields NetJunction records only."""
+    for record in iter_net(net_file, include_internal):
+        if isinstance(record, NetJunction):
+            yield record
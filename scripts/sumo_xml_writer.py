@@ -0,0 +1,146 @@
+"""
+sumo_xml_writer.py
+
+Streaming writer for SUMO XML input files (.nod.xml, .edg.xml, .rou.xml, ...).
+Elements are escaped and written to a buffered file as soon as they are
+produced, so a writer script never holds more than one element in memory
+instead of building a full ElementTree first.
+
+The output is written to `<path>.tmp` and moved into place when the root
+element is closed, so a failed run never leaves a truncated file behind.
+
+Example:
+    with SumoXmlWriter(path, "routes") as xml:
+        with xml.subelement("vehicle", {"id": "v0", "depart": 0}):
+            xml.element("route", {"edges": "e1 e2"})
+
+Used by:
+    - write_sumo_nodes.py
+    - write_sumo_edges.py
+    - write_empty_connections.py
+    - simple_network_creators/generate_nodes_from_simple_stops.py
+    - simple_network_creators/generate_edges_from_polygon.py
+    - simple_network_creators/generate_simplified_edges_xml.py
+    - simple_network_creators/write_simplified_edges_xml.py
+
+Author: Onur Deniz
+Date: 2025-06
+"""
+
+import os
+from contextlib import contextmanager
+
+BUFFER_SIZE = 1 << 20
+INDENT = "    "
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Escaping
+# ─────────────────────────────────────────────────────────────────────────────
+
+_ATTR_ESCAPES = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "\n": "&#10;",
+    "\r": "&#13;",
+    "\t": "&#09;",
+})
+
+def escape_attr(value):
+    """Escapes an attribute value the way ElementTree does."""
+    return str(value).translate(_ATTR_ESCAPES)
+
+def format_attrs(attrib):
+    """Renders ' key="value"' pairs in insertion order; None values are omitted."""
+    return "".join(
+        f' {key}="{escape_attr(value)}"'
+        for key, value in attrib.items()
+        if value is not None
+    )
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Writer
+# ─────────────────────────────────────────────────────────────────────────────
+
+class SumoXmlWriter:
+    """Incremental XML writer with a single root element."""
+
+    def __init__(self, path, root_tag, root_attrib=None, buffer_size=BUFFER_SIZE):
+        self.path = path
+        self.root_tag = root_tag
+        self.root_attrib = root_attrib or {}
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path + ".tmp", "w", encoding="utf-8", buffering=self.buffer_size)
+        self._file.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+        self._file.write(f"<{self.root_tag}{format_attrs(self.root_attrib)}>\n")
+        self._depth = 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._file.write(f"</{self.root_tag}>\n")
+        finally:
+            self._file.close()
+        if exc_type is None:
+            os.replace(self.path + ".tmp", self.path)
+        else:
+            os.remove(self.path + ".tmp")
+        return False
+
+    def element(self, tag, attrib=None):
+        """Writes one self-closing element, e.g. <node id="..." x="..." y="..."/>."""
+        self._file.write(f"{INDENT * self._depth}<{tag}{format_attrs(attrib or {})}/>\n")
+        self.count += 1
+
+    @contextmanager
+    def subelement(self, tag, attrib=None):
+        """Opens an element whose children are written inside the `with` block."""
+        self._file.write(f"{INDENT * self._depth}<{tag}{format_attrs(attrib or {})}>\n")
+        self.count += 1
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+        self._file.write(f"{INDENT * self._depth}</{tag}>\n")
+
+    def elements(self, tag, records):
+        """Writes one element per attribute dict from any iterable."""
+        for attrib in records:
+            self.element(tag, attrib)
+
+    def dataframe(self, tag, df, columns=None):
+        """
+        Writes one element per DataFrame row.
+
+        Args:
+            columns (dict): attribute name → column name (default: all columns as-is).
+                Missing values (NaN/None) are left out of the element.
+        """
+        columns = columns or {col: col for col in df.columns}
+        names = list(columns)
+        frame = df[list(columns.values())]
+        missing = frame.isna().to_numpy()
+        for row, row_missing in zip(frame.itertuples(index=False, name=None), missing):
+            self.element(tag, {
+                name: None if is_missing else value
+                for name, value, is_missing in zip(names, row, row_missing)
+            })
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Convenience
+# ─────────────────────────────────────────────────────────────────────────────
+
+def write_sumo_xml(path, root_tag, tag, records, root_attrib=None):
+    """Streams an iterable of attribute dicts into a one-level SUMO XML file. Returns the element count."""
+    with SumoXmlWriter(path, root_tag, root_attrib) as xml:
+        xml.elements(tag, records)
+    return xml.count
@@ -15,8 +15,10 @@ Date: 2025-05
 """
 
 import os
+import sys
 import logging
-from xml.etree.ElementTree import Element, ElementTree
+
+from sumo_xml_writer import SumoXmlWriter
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
@@ -39,13 +41,13 @@ def main():
 
     try:
         os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-        root = Element("connections")  # No children — SUMO will infer
-        tree = ElementTree(root)
-        tree.write(OUTPUT_PATH, encoding="UTF-8", xml_declaration=True)
+        with SumoXmlWriter(OUTPUT_PATH, "connections"):
+            pass  # No children — SUMO will infer
         logging.info(f"💾 Saved: {OUTPUT_PATH}")
         logging.info("✅ Phase 4 complete. You're ready for Phase 5: netconvert.")
     except Exception as e:
         logging.error(f"❌ Failed to create .con.xml file: {e}")
+        sys.exit(1)
 
 # ─────────────────────────────────────────────────────────────────────────────
 if __name__ == "__main__":
@@ -10,7 +10,7 @@ Each edge includes:
 - Shape derived from LineString geometry (WKT)
 
 Input:
-    - data/Swiss/processed/rail_edges_named.csv
+    - data/Swiss/processed/rail_edges_named.parquet (or the legacy .csv, if newer)
 
 Output:
     - SUMO/input/april_2025_swiss.edg.xml
@@ -19,13 +19,15 @@ Author: Onur Deniz
 Date: 2025-05
 """
 
-import pandas as pd
 import os
+import sys
 import logging
-import re
-from shapely import wkt
-from shapely.geometry import LineString
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+import numpy as np
+import shapely
+
+from geo_table import read_geo_table, resolve_geo_table
+from sumo_ids import sanitize_edge_id
+from sumo_xml_writer import SumoXmlWriter
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
@@ -45,21 +47,37 @@ logging.basicConfig(
 # Helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
-def linestring_to_shape(line: LineString) -> str:
-    """
-    Converts a Shapely LineString to a SUMO shape string (x1,y1 x2,y2 ...).
+def shapes_from_geometries(geometries) -> np.ndarray:
     """
-    return " ".join([f"{x:.3f},{y:.3f}" for x, y, *_ in line.coords])
+    Builds SUMO shape strings ("x1,y1 x2,y2 ...", coordinates rounded to
+    '%.3f', Z dropped) for a whole geometry array at once.
 
-def sanitize_edge_id(edge_id: str) -> str:
+    All vertices are pulled out with one get_coordinates call and formatted
+    with one printf template per vertex count. Non-LineString entries get None.
     """
-    Makes edge IDs safe for SUMO by replacing or removing invalid characters.
-    """
-    edge_id = str(edge_id)
-    edge_id = edge_id.replace("&", "and")
-    edge_id = re.sub(r"[ ,:()\.\\/\"']", "_", edge_id)
-    edge_id = re.sub(r"__+", "_", edge_id)  # Collapse multiple underscores
-    return edge_id.strip("_")
+    geometries = np.asarray(geometries, dtype=object)
+    shapes = np.full(len(geometries), None, dtype=object)
+    is_line = np.isin(shapely.get_type_id(geometries), [shapely.GeometryType.LINESTRING, shapely.GeometryType.LINEARRING])
+    lines = geometries[is_line]
+
+    coords, index = shapely.get_coordinates(lines, return_index=True)
+    counts = np.bincount(index, minlength=len(lines))
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    # One printf template per vertex count formats a whole line in a single call
+    line_shapes = np.empty(len(lines), dtype=object)
+    for n in np.unique(counts):
+        selected = np.flatnonzero(counts == n)
+        if n == 0:
+            line_shapes[selected] = ""
+            continue
+        rows = coords[(offsets[selected][:, None] + np.arange(n)).ravel()].reshape(len(selected), 2 * n)
+        template = " ".join(["%.3f,%.3f"] * n)
+        line_shapes[selected] = [template % tuple(row) for row in rows.tolist()]
+
+    shapes[is_line] = line_shapes
+    return shapes
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Main
@@ -68,50 +86,48 @@ def sanitize_edge_id(edge_id: str) -> str:
 def main():
     logging.info("🚀 Phase 3: Generating SUMO .edg.xml from rail_edges_named.csv...")
 
-    if not os.path.exists(INPUT_PATH):
-        logging.error(f"❌ Input file not found: {INPUT_PATH}")
-        return
+    input_path = resolve_geo_table(INPUT_PATH)
+    if not os.path.exists(input_path):
+        logging.error(f"❌ Input file not found: {input_path}")
+        sys.exit(1)
 
     os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 
     try:
-        df = pd.read_csv(INPUT_PATH)
-        if not {"edge_id_human", "from_node", "to_node", "geometry"}.issubset(df.columns):
-            raise ValueError("Missing one or more required columns.")
-        df["geometry"] = df["geometry"].apply(wkt.loads)
+        # GeoParquet geometries arrive as WKB; legacy CSV WKT is parsed in one call
+        df = read_geo_table(input_path, columns=["edge_id_human", "from_node", "to_node", "geometry"])
     except Exception as e:
         logging.error(f"❌ Failed to load or parse input file: {e}")
-        return
+        sys.exit(1)
 
-    logging.info(f"✅ Loaded {len(df):,} edges from: {INPUT_PATH}")
+    logging.info(f"✅ Loaded {len(df):,} edges from: {input_path}")
 
-    root = Element("edges")
+    shapes = shapes_from_geometries(df["geometry"].to_numpy())
     failed_count = 0
 
-    for i, row in df.iterrows():
-        try:
-            edge_id = sanitize_edge_id(row["edge_id_human"])
-            attrib = {
-                "id": edge_id,
-                "from": row["from_node"],
-                "to": row["to_node"]
-            }
-
-            if isinstance(row["geometry"], LineString):
-                attrib["shape"] = linestring_to_shape(row["geometry"])
-            else:
-                raise ValueError("Invalid geometry")
-
-            SubElement(root, "edge", attrib)
-
-        except Exception as e:
-            failed_count += 1
-            logging.debug(f"⚠️ Skipping edge at row {i} due to error: {e}")
-            continue
-
-    # Write to .edg.xml
-    tree = ElementTree(root)
-    tree.write(OUTPUT_PATH, encoding="UTF-8", xml_declaration=True)
+    # Stream edges straight to .edg.xml
+    with SumoXmlWriter(OUTPUT_PATH, "edges") as xml:
+        rows = zip(df["edge_id_human"], df["from_node"], df["to_node"], shapes)
+        for i, (edge_id_human, from_node, to_node, shape) in zip(df.index, rows):
+            try:
+                edge_id = sanitize_edge_id(edge_id_human)
+                attrib = {
+                    "id": edge_id,
+                    "from": from_node,
+                    "to": to_node
+                }
+
+                if shape is not None:
+                    attrib["shape"] = shape
+                else:
+                    raise ValueError("Invalid geometry")
+
+                xml.element("edge", attrib)
+
+            except Exception as e:
+                failed_count += 1
+                logging.debug(f"⚠️ Skipping edge at row {i} due to error: {e}")
+                continue
 
     logging.info(f"💾 Saved edge XML to: {OUTPUT_PATH}")
     logging.info(f"✅ Phase 3 complete. {len(df) - failed_count:,} edges written, {failed_count:,} skipped.")
@@ -5,7 +5,7 @@ Phase 2 of the SUMO Swiss Network Pipeline (April 2025 edition).
 Converts named rail nodes into SUMO .nod.xml format.
 
 Input:
-    - data/Swiss/processed/rail_nodes_named.csv
+    - data/Swiss/processed/rail_nodes_named.parquet (or the legacy .csv, if newer)
 
 Output:
     - SUMO/input/april_2025_swiss.nod.xml
@@ -14,10 +14,12 @@ Author: Onur Deniz
 Date: 2025-05
 """
 
-import pandas as pd
 import os
+import sys
 import logging
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+
+from geo_table import read_geo_table, resolve_geo_table
+from sumo_xml_writer import SumoXmlWriter
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
@@ -39,38 +41,24 @@ logging.basicConfig(
 def main():
     logging.info("🚀 Phase 2: Generating SUMO .nod.xml from rail_nodes_named.csv...")
 
-    if not os.path.exists(INPUT_PATH):
-        logging.error(f"❌ Input file not found: {INPUT_PATH}")
-        return
+    input_path = resolve_geo_table(INPUT_PATH)
+    if not os.path.exists(input_path):
+        logging.error(f"❌ Input file not found: {input_path}")
+        sys.exit(1)
 
     os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 
     try:
-        df = pd.read_csv(INPUT_PATH)
-        required_cols = {"node_id", "x", "y"}
-        if not required_cols.issubset(df.columns):
-            raise ValueError(f"Missing required columns: {required_cols - set(df.columns)}")
+        df = read_geo_table(input_path, columns=["node_id", "x", "y"])
     except Exception as e:
         logging.error(f"❌ Failed to read input file: {e}")
-        return
-
-    logging.info(f"✅ Loaded {len(df):,} nodes from: {INPUT_PATH}")
-
-    # Build XML tree
-    root = Element("nodes")
+        sys.exit(1)
 
-    for _, row in df.iterrows():
-        SubElement(
-            root,
-            "node",
-            id=row["node_id"],
-            x=str(row["x"]),
-            y=str(row["y"])
-        )
+    logging.info(f"✅ Loaded {len(df):,} nodes from: {input_path}")
 
-    # Write to file
-    tree = ElementTree(root)
-    tree.write(OUTPUT_PATH, encoding="UTF-8", xml_declaration=True)
+    # Stream nodes straight to file
+    with SumoXmlWriter(OUTPUT_PATH, "nodes") as xml:
+        xml.dataframe("node", df, {"id": "node_id", "x": "x", "y": "y"})
     logging.info(f"💾 Saved node XML to: {OUTPUT_PATH}")
     logging.info("✅ Phase 2 complete. Ready for Phase 3: write_sumo_edges.py")
 